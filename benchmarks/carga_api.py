@@ -0,0 +1,80 @@
+import time
+import asyncio
+import argparse
+import statistics
+import httpx
+
+ROTAS = [
+    "/programas/?limit=20",
+    "/municipios/?uf=PB&limit=20",
+    "/transferencias/?limit=50",
+    "/transferencias/?limit=50&include_total=false",
+    "/analises/total-transferencias-por-estado",
+]
+
+
+async def cliente(http, fim, latencias, erros, deslocamento):
+    i = deslocamento
+    while time.perf_counter() < fim:
+        rota = ROTAS[i % len(ROTAS)]
+        i += 1
+        inicio = time.perf_counter()
+        try:
+            resposta = await http.get(rota)
+            if resposta.status_code >= 400:
+                erros.append(resposta.status_code)
+                continue
+        except httpx.HTTPError as erro:
+            erros.append(type(erro).__name__)
+            continue
+        latencias.append(time.perf_counter() - inicio)
+
+
+async def medir(url, concorrencia, segundos):
+    latencias, erros = [], []
+    limites = httpx.Limits(max_connections=concorrencia)
+
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=60) as http:
+        await http.get(ROTAS[0])
+        inicio = time.perf_counter()
+        fim = inicio + segundos
+        await asyncio.gather(
+            *(
+                cliente(http, fim, latencias, erros, deslocamento)
+                for deslocamento in range(concorrencia)
+            )
+        )
+        duracao = time.perf_counter() - inicio
+
+    quantis = statistics.quantiles(latencias, n=100) if len(latencias) > 1 else [0] * 99
+    return {
+        "concorrencia": concorrencia,
+        "req_s": len(latencias) / duracao,
+        "p50_ms": quantis[49] * 1000,
+        "p95_ms": quantis[94] * 1000,
+        "erros": len(erros),
+    }
+
+
+async def main(url, niveis, segundos):
+    print(
+        f"{'clientes':>9} {'req/s':>9} {'p50 (ms)':>10} {'p95 (ms)':>10} {'erros':>7}"
+    )
+    for concorrencia in niveis:
+        r = await medir(url, concorrencia, segundos)
+        print(
+            f"{r['concorrencia']:>9} {r['req_s']:>9.1f} {r['p50_ms']:>10.1f} "
+            f"{r['p95_ms']:>10.1f} {r['erros']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mede req/s da API sob clientes simultâneos"
+    )
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--clientes", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--segundos", type=float, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.url, args.clientes, args.segundos))
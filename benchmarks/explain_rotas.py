@@ -0,0 +1,148 @@
+import json
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel, func, select
+from src.database.infra import engine
+from src.database.migrations import criar_indices
+from src.models import (
+    Favorecido,
+    Municipio,
+    ProgramaTransferencia,
+    Transferencia,
+    UnidadeGestora,
+)
+
+
+def parametros(session):
+    def mais_frequente(coluna):
+        return session.exec(
+            select(coluna).group_by(coluna).order_by(func.count().desc()).limit(1)
+        ).first()
+
+    return {
+        "unidade_gestora": mais_frequente(Transferencia.unidade_gestora_codigo),
+        "favorecido": mais_frequente(Transferencia.favorecido_codigo),
+        "municipio": mais_frequente(Favorecido.municipio_codigo),
+        "programa": mais_frequente(ProgramaTransferencia.programa_codigo),
+        "uf": mais_frequente(Municipio.uf),
+        "tipo": mais_frequente(Transferencia.tipo),
+    }
+
+
+def consultas(p):
+    return {
+        "GET /favorecidos/?municipio": select(Favorecido)
+        .where(Favorecido.municipio_codigo == p["municipio"])
+        .limit(10),
+        "GET /municipios/?uf": select(Municipio)
+        .where(Municipio.uf == p["uf"])
+        .limit(10),
+        "GET /transferencias/?tipo": select(Transferencia)
+        .where(Transferencia.tipo.contains(p["tipo"]))
+        .limit(10),
+        "GET /transferencias/{unidade_gestora}/statistics": select(
+            UnidadeGestora.nome,
+            func.max(Transferencia.valor),
+            func.min(Transferencia.valor),
+            func.sum(Transferencia.valor),
+            func.avg(Transferencia.valor),
+            func.count(Transferencia.id),
+        )
+        .join(
+            UnidadeGestora,
+            UnidadeGestora.codigo == Transferencia.unidade_gestora_codigo,
+        )
+        .where(Transferencia.unidade_gestora_codigo == p["unidade_gestora"])
+        .group_by(UnidadeGestora.nome),
+        "transferências de um favorecido": select(Transferencia).where(
+            Transferencia.favorecido_codigo == p["favorecido"]
+        ),
+        "transferências de um programa": select(Transferencia)
+        .join(
+            ProgramaTransferencia,
+            ProgramaTransferencia.transferencia_id == Transferencia.id,
+        )
+        .where(ProgramaTransferencia.programa_codigo == p["programa"]),
+        "GET /analises/total-transferencias-por-estado": select(
+            Municipio.uf,
+            func.count(Transferencia.id),
+            func.sum(Transferencia.valor),
+        )
+        .join(Favorecido, Favorecido.municipio_codigo == Municipio.codigo)
+        .join(Transferencia, Transferencia.favorecido_codigo == Favorecido.codigo)
+        .group_by(Municipio.uf)
+        .order_by(func.count(Transferencia.id).desc()),
+        "GET /analises/total-transferencias-por-unidade-gestora": select(
+            Transferencia.unidade_gestora_codigo,
+            func.count(),
+            func.sum(Transferencia.valor),
+        ).group_by(Transferencia.unidade_gestora_codigo),
+        "GET /municipios/favorecidos/count": select(
+            Favorecido.municipio_codigo, func.count()
+        ).group_by(Favorecido.municipio_codigo),
+        "GET /analises/favorecidos-por-programa": select(
+            ProgramaTransferencia.programa_codigo,
+            func.count(func.distinct(Transferencia.favorecido_codigo)),
+        )
+        .join(Transferencia, Transferencia.id == ProgramaTransferencia.transferencia_id)
+        .group_by(ProgramaTransferencia.programa_codigo),
+        "GET /analises/programas-mais-frequentes": select(
+            ProgramaTransferencia.programa_codigo, func.count()
+        ).group_by(ProgramaTransferencia.programa_codigo),
+    }
+
+
+def tempo_execucao(session, consulta):
+    sql = str(
+        consulta.compile(
+            dialect=session.bind.dialect, compile_kwargs={"literal_binds": True}
+        )
+    )
+    plano = session.exec(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}")).scalar()
+    if isinstance(plano, str):
+        plano = json.loads(plano)
+    return plano[0]["Execution Time"], plano[0]["Plan"]["Node Type"]
+
+
+def medir(session, consultas, repeticoes=3):
+    return {
+        nome: min(
+            (tempo_execucao(session, consulta) for _ in range(repeticoes)),
+            key=lambda resultado: resultado[0],
+        )
+        for nome, consulta in consultas.items()
+    }
+
+
+def remover_indices():
+    with engine.begin() as connection:
+        for tabela in SQLModel.metadata.sorted_tables:
+            for indice in tabela.indexes:
+                indice.drop(connection, checkfirst=True)
+        connection.execute(text("ANALYZE"))
+
+
+def main():
+    if engine.dialect.name != "postgresql":
+        print("Este benchmark usa EXPLAIN ANALYZE e requer PostgreSQL")
+        return
+
+    with Session(engine) as session:
+        p = parametros(session)
+
+    remover_indices()
+    with Session(engine) as session:
+        antes = medir(session, consultas(p))
+
+    criar_indices(engine)
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+    with Session(engine) as session:
+        depois = medir(session, consultas(p))
+
+    print(f"{'consulta':<55} {'sem índices (ms)':>17} {'com índices (ms)':>17}")
+    for nome in antes:
+        print(f"{nome:<55} {antes[nome][0]:>17.2f} {depois[nome][0]:>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
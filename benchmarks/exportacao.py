@@ -0,0 +1,69 @@
+import time
+import argparse
+import httpx
+
+
+def paginando(http, limite):
+    inicio = time.perf_counter()
+    linhas, requisicoes, tamanho, cursor = 0, 0, 0, None
+
+    while True:
+        parametros = {"limit": limite, "include_total": "false"}
+        if cursor:
+            parametros["cursor"] = cursor
+        resposta = http.get("/transferencias/", params=parametros)
+        resposta.raise_for_status()
+        corpo = resposta.json()
+
+        requisicoes += 1
+        tamanho += len(resposta.content)
+        linhas += len(corpo["data"])
+        cursor = corpo["next_cursor"]
+        if not cursor:
+            break
+
+    return linhas, requisicoes, tamanho, time.perf_counter() - inicio
+
+
+def exportando(http, formato):
+    inicio = time.perf_counter()
+    linhas, tamanho = 0, 0
+
+    with http.stream(
+        "GET", "/transferencias/export", params={"formato": formato}
+    ) as resposta:
+        resposta.raise_for_status()
+        for parte in resposta.iter_bytes():
+            tamanho += len(parte)
+            if formato != "parquet":
+                linhas += parte.count(b"\n")
+
+    if formato == "csv":
+        linhas -= 1
+    return linhas, 1, tamanho, time.perf_counter() - inicio
+
+
+def main(url, limite):
+    print(f"{'modo':>22} {'linhas':>9} {'requisições':>12} {'MB':>8} {'segundos':>9}")
+    with httpx.Client(base_url=url, timeout=600) as http:
+        medicoes = [(f"paginação (limit={limite})", paginando(http, limite))]
+        for formato in ("ndjson", "csv", "parquet"):
+            medicoes.append((f"export {formato}", exportando(http, formato)))
+
+    for modo, (linhas, requisicoes, tamanho, segundos) in medicoes:
+        linhas = linhas if linhas else "-"
+        print(
+            f"{modo:>22} {linhas:>9} {requisicoes:>12} "
+            f"{tamanho / 1e6:>8.1f} {segundos:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compara a leitura paginada de transferências com o export"
+    )
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--limite", type=int, default=100)
+    args = parser.parse_args()
+
+    main(args.url, args.limite)
@@ -0,0 +1,72 @@
+import os
+import time
+import tempfile
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.database.bulk import colunas_arquivo, dtypes_colunas, ler_lotes
+from src.database.populate import CARGAS, dataset_path
+from src.dataset.clean_dataset import ESQUEMAS
+
+REPETICOES = 5
+
+
+def converter_para_parquet(modelo, nome, colunas, destino):
+    dtypes = dtypes_colunas(modelo.__table__, colunas)
+    esquema = ESQUEMAS[nome]
+    caminho = os.path.join(destino, f"{nome}.parquet")
+
+    df = pd.read_csv(
+        os.path.join(dataset_path, f"{nome}.csv"),
+        dtype={
+            campo.name: str for campo in esquema if not pa.types.is_integer(campo.type)
+        },
+    )
+    # Arquivos limpos antes da coluna competencia não a trazem
+    esquema = pa.schema([campo for campo in esquema if campo.name in df.columns])
+    tabela = pa.Table.from_pandas(df, preserve_index=False).cast(esquema)
+    pq.write_table(tabela, caminho, compression="zstd")
+
+    return caminho, dtypes
+
+
+def medir(caminho, colunas, dtypes):
+    melhor = float("inf")
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        for _ in ler_lotes(caminho, list(colunas), dtypes):
+            pass
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    print(
+        f"{'arquivo':<30} {'csv (s)':>9} {'parquet (s)':>12} "
+        f"{'csv (KB)':>10} {'parquet (KB)':>13}"
+    )
+
+    with tempfile.TemporaryDirectory() as destino:
+        for modelo, nome, colunas in CARGAS:
+            csv = os.path.join(dataset_path, f"{nome}.csv")
+            if not os.path.exists(csv):
+                print(f"{nome:<30} arquivo não encontrado")
+                continue
+
+            presentes = colunas_arquivo(csv)
+            colunas = {
+                origem: destino
+                for origem, destino in colunas.items()
+                if origem in presentes
+            }
+            parquet, dtypes = converter_para_parquet(modelo, nome, colunas, destino)
+            print(
+                f"{nome:<30} {medir(csv, colunas, dtypes):>9.4f} "
+                f"{medir(parquet, colunas, dtypes):>12.4f} "
+                f"{os.path.getsize(csv) // 1024:>10} "
+                f"{os.path.getsize(parquet) // 1024:>13}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from src.services.desenho import desenhar_barras, desenhar_pizza
+
+GRAFICOS = 24
+
+
+def trabalhos():
+    rotulos = [f"Categoria {i}" for i in range(15)]
+    valores = [1000 - i * 37 for i in range(15)]
+
+    for i in range(GRAFICOS):
+        formato = "svg" if i % 4 == 3 else "png"
+        if i % 2:
+            yield desenhar_pizza, (f"Pizza {i}", rotulos[:10], valores[:10], formato)
+        else:
+            yield desenhar_barras, (f"Barras {i}", rotulos, valores, "Valor", formato)
+
+
+def medir(trabalhadores):
+    with ProcessPoolExecutor(
+        max_workers=trabalhadores, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        # Aquece os processos para não medir a importação do matplotlib
+        list(
+            executor.map(
+                desenhar_barras,
+                ["-"] * trabalhadores,
+                [["-"]] * trabalhadores,
+                [[1]] * trabalhadores,
+                ["-"] * trabalhadores,
+            )
+        )
+
+        inicio = time.perf_counter()
+        futuros = [executor.submit(funcao, *args) for funcao, args in trabalhos()]
+        for futuro in futuros:
+            futuro.result()
+        return time.perf_counter() - inicio
+
+
+def main():
+    nucleos = os.cpu_count() or 1
+    print(f"{GRAFICOS} gráficos, {nucleos} núcleo(s) disponível(is)")
+    print(f"{'processos':>10} {'segundos':>10} {'gráficos/s':>12}")
+
+    for trabalhadores in sorted({1, 2, 4, nucleos}):
+        segundos = medir(trabalhadores)
+        print(f"{trabalhadores:>10} {segundos:>10.2f} {GRAFICOS / segundos:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
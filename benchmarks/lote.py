@@ -0,0 +1,58 @@
+import time
+import argparse
+import httpx
+
+
+def individual(http, codigos):
+    inicio = time.perf_counter()
+    for codigo in codigos:
+        resposta = http.post(
+            "/programas/", json={"codigo": codigo, "nome": f"Programa {codigo}"}
+        )
+        resposta.raise_for_status()
+    return time.perf_counter() - inicio
+
+
+def em_lote(http, codigos):
+    inicio = time.perf_counter()
+    resposta = http.post(
+        "/programas/batch",
+        json=[{"codigo": codigo, "nome": f"Programa {codigo}"} for codigo in codigos],
+    )
+    resposta.raise_for_status()
+    assert resposta.json()["criado"] == len(codigos)
+    return time.perf_counter() - inicio
+
+
+def main(url, quantidade, inicio):
+    primeiros = range(inicio, inicio + quantidade)
+    seguintes = range(inicio + quantidade, inicio + 2 * quantidade)
+
+    with httpx.Client(base_url=url, timeout=600) as http:
+        medicoes = [
+            ("POST /programas/", individual(http, primeiros), quantidade),
+            ("POST /programas/batch", em_lote(http, seguintes), 1),
+        ]
+
+        # Remove os programas criados pela medição
+        for codigo in (*primeiros, *seguintes):
+            http.delete(f"/programas/{codigo}")
+
+    print(f"{'modo':>22} {'requisições':>12} {'segundos':>9} {'itens/s':>9}")
+    for modo, segundos, requisicoes in medicoes:
+        print(
+            f"{modo:>22} {requisicoes:>12} {segundos:>9.2f} "
+            f"{quantidade / segundos:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compara a criação de programas um a um e em lote"
+    )
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--quantidade", type=int, default=2000)
+    parser.add_argument("--inicio", type=int, default=900000)
+    args = parser.parse_args()
+
+    main(args.url, args.quantidade, args.inicio)
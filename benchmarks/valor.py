@@ -0,0 +1,149 @@
+import json
+import time
+from sqlalchemy import (
+    BigInteger,
+    Integer,
+    Numeric,
+    column,
+    inspect,
+    select,
+    table,
+    text,
+)
+from src.database.infra import engine
+from src.database.tipos import Centavos
+
+REPETICOES = 5
+
+# Cópias de transferencia com o valor em cada representação; cada uma guarda
+# a conversão a partir de reais e as casas usadas para arredondar a média
+REPRESENTACOES = {
+    "numeric": ("numeric", "{reais}", 2, Numeric()),
+    "numeric(18,2)": ("numeric(18,2)", "{reais}", 2, Numeric(18, 2)),
+    "bigint (centavos)": ("bigint", "round(({reais}) * 100)", 0, Centavos()),
+}
+
+CONSULTAS = {
+    "soma por UF": """
+        SELECT m.uf, count(*), sum(t.valor)
+        FROM {tabela} t
+        JOIN favorecido f ON f.codigo = t.favorecido_codigo
+        JOIN municipio m ON m.codigo = f.municipio_codigo
+        GROUP BY m.uf
+    """,
+    "estatísticas por unidade gestora": """
+        SELECT unidade_gestora_codigo, max(valor), min(valor), sum(valor),
+               round(avg(valor), {casas}), count(*)
+        FROM {tabela}
+        GROUP BY unidade_gestora_codigo
+    """,
+    "soma e média gerais": """
+        SELECT sum(valor), round(avg(valor), {casas}) FROM {tabela}
+    """,
+}
+
+
+def nome_tabela(indice: int) -> str:
+    return f"benchmark_valor_{indice}"
+
+
+def criar_copias(connection):
+    atual = next(
+        c["type"]
+        for c in inspect(connection).get_columns("transferencia")
+        if c["name"] == "valor"
+    )
+    reais = "valor / 100.0" if isinstance(atual, Integer) else "valor"
+
+    for indice, (tipo, conversao, _, _) in enumerate(REPRESENTACOES.values()):
+        tabela = nome_tabela(indice)
+        connection.execute(text(f"DROP TABLE IF EXISTS {tabela}"))
+        connection.execute(
+            text(
+                f"CREATE TABLE {tabela} AS "
+                f"SELECT id, unidade_gestora_codigo, favorecido_codigo, "
+                f"({conversao.format(reais=reais)})::{tipo} AS valor "
+                f"FROM transferencia"
+            )
+        )
+        connection.execute(text(f"VACUUM ANALYZE {tabela}"))
+
+
+def remover_copias(connection):
+    for indice in range(len(REPRESENTACOES)):
+        connection.execute(text(f"DROP TABLE IF EXISTS {nome_tabela(indice)}"))
+
+
+def tempo_execucao(connection, sql) -> float:
+    plano = connection.execute(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}")).scalar()
+    if isinstance(plano, str):
+        plano = json.loads(plano)
+    return plano[0]["Execution Time"]
+
+
+def tempo_leitura(connection, tabela, tipo) -> float:
+    # Todos os valores lidos pelo driver e convertidos pelo tipo da coluna,
+    # como numa listagem ou exportação
+    consulta = select(column("valor", tipo)).select_from(table(tabela))
+    inicio = time.perf_counter()
+    for _ in connection.execute(consulta).scalars():
+        pass
+    return (time.perf_counter() - inicio) * 1000
+
+
+def melhor(medicao) -> float:
+    return min(medicao() for _ in range(REPETICOES))
+
+
+def medir(connection, tabela, casas, tipo) -> dict:
+    tamanho = connection.execute(
+        text(f"SELECT pg_total_relation_size('{tabela}')")
+    ).scalar()
+    medidas = {"tamanho da tabela (MB)": tamanho / 2**20}
+
+    for consulta, sql in CONSULTAS.items():
+        sql = sql.format(tabela=tabela, casas=casas)
+        medidas[consulta] = melhor(lambda: tempo_execucao(connection, sql))
+
+    medidas["leitura (Decimal por linha)"] = melhor(
+        lambda: tempo_leitura(connection, tabela, tipo)
+    )
+    if isinstance(tipo, Centavos):
+        medidas["leitura (centavos inteiros)"] = melhor(
+            lambda: tempo_leitura(connection, tabela, BigInteger())
+        )
+    return medidas
+
+
+def main():
+    if engine.dialect.name != "postgresql":
+        print("Este benchmark usa EXPLAIN ANALYZE e requer PostgreSQL")
+        return
+
+    with engine.connect() as connection:
+        connection = connection.execution_options(isolation_level="AUTOCOMMIT")
+        criar_copias(connection)
+        try:
+            resultados = {}
+            for indice, (nome, (_, _, casas, tipo)) in enumerate(
+                REPRESENTACOES.items()
+            ):
+                tabela = nome_tabela(indice)
+                resultados[nome] = medir(connection, tabela, casas, tipo)
+        finally:
+            remover_copias(connection)
+
+    medidas = list(dict.fromkeys(m for tempos in resultados.values() for m in tempos))
+    print(f"{'medida (ms)':<35}" + "".join(f"{nome:>20}" for nome in resultados))
+    for medida in medidas:
+        print(
+            f"{medida:<35}"
+            + "".join(
+                (f"{tempos[medida]:>20.2f}" if medida in tempos else f"{'-':>20}")
+                for tempos in resultados.values()
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import io
+import time
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import Date, Integer, insert, text
+from .particoes import chave_conflito, coluna_particao, garantir_particoes
+from .tipos import Centavos
+from ..dataset.clean_dataset import parse_valor_centavos
+
+TAMANHO_LOTE = 50000
+
+
+def dtype_coluna(coluna):
+    if isinstance(coluna.type, Integer):
+        return "Int64"
+    return str
+
+
+def dtypes_colunas(tabela, colunas):
+    return {
+        origem: dtype_coluna(tabela.c[destino]) for origem, destino in colunas.items()
+    }
+
+
+def ler_lotes(caminho, colunas, dtypes, tamanho_lote=TAMANHO_LOTE):
+    if not caminho.endswith(".parquet"):
+        yield from pd.read_csv(
+            caminho, usecols=colunas, dtype=dtypes, chunksize=tamanho_lote
+        )
+        return
+
+    inteiros = {coluna: dtype for coluna, dtype in dtypes.items() if dtype != str}
+    arquivo = pq.ParquetFile(caminho)
+    for lote in arquivo.iter_batches(batch_size=tamanho_lote, columns=colunas):
+        lote = pa.Table.from_batches([lote])
+        for indice, campo in enumerate(lote.schema):
+            if pa.types.is_decimal(campo.type):
+                lote = lote.set_column(
+                    indice, campo.name, lote.column(indice).cast(pa.string())
+                )
+        yield lote.to_pandas().astype(inteiros)
+
+
+def colunas_arquivo(caminho):
+    if caminho.endswith(".parquet"):
+        return pq.read_schema(caminho).names
+    return list(pd.read_csv(caminho, nrows=0).columns)
+
+
+def preparar_lote(tabela, chunk, colunas, transformar=None):
+    chunk = chunk.rename(columns=colunas)[list(colunas.values())]
+    if transformar is not None:
+        chunk = transformar(chunk)
+
+    for coluna in chunk.columns:
+        if isinstance(tabela.c[coluna].type, Date):
+            chunk[coluna] = pd.to_datetime(chunk[coluna]).dt.date
+    return chunk
+
+
+def garantir_particoes_lote(connection, tabela, df):
+    coluna = coluna_particao(tabela)
+    if coluna in df.columns:
+        garantir_particoes(connection, tabela, df[coluna].unique())
+
+
+def copiar_dataframe(connection, tabela, df):
+    # O COPY não passa pelo tipo da coluna: os reais lidos do arquivo viram
+    # centavos aqui, sem float no caminho
+    for coluna in df.columns:
+        if isinstance(tabela.c[coluna].type, Centavos):
+            df = df.assign(**{coluna: parse_valor_centavos(df[coluna], separador=".")})
+
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+
+    colunas = ", ".join(df.columns)
+    with connection.connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {tabela.name} ({colunas}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+
+
+def inserir_dataframe(connection, tabela, df):
+    registros = df.astype(object).where(df.notna(), None).to_dict("records")
+    connection.execute(insert(tabela), registros)
+
+
+def gravar_lote(connection, tabela, df):
+    garantir_particoes_lote(connection, tabela, df)
+    if connection.dialect.name == "postgresql":
+        copiar_dataframe(connection, tabela, df)
+    else:
+        inserir_dataframe(connection, tabela, df)
+
+
+def insert_dialeto(dialeto: str):
+    if dialeto == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialeto == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        raise NotImplementedError(f"Upsert não suportado para o banco {dialeto}")
+    return dialect_insert
+
+
+def upsert_dataframe(connection, tabela, df):
+    garantir_particoes_lote(connection, tabela, df)
+    chave = chave_conflito(connection, tabela)
+    statement = insert_dialeto(connection.dialect.name)(tabela)
+    atualizar = {
+        coluna: statement.excluded[coluna]
+        for coluna in df.columns
+        if coluna not in chave
+    }
+
+    if atualizar:
+        statement = statement.on_conflict_do_update(
+            index_elements=chave, set_=atualizar
+        )
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=chave)
+
+    registros = df.astype(object).where(df.notna(), None).to_dict("records")
+    connection.execute(statement, registros)
+
+
+def carregar_arquivo(
+    engine, tabela, caminho, colunas, transformar=None, tamanho_lote=TAMANHO_LOTE
+):
+    dtypes = dtypes_colunas(tabela, colunas)
+    linhas = 0
+    inicio = time.perf_counter()
+
+    with engine.begin() as connection:
+        for chunk in ler_lotes(caminho, list(colunas), dtypes, tamanho_lote):
+            chunk = preparar_lote(tabela, chunk, colunas, transformar)
+            gravar_lote(connection, tabela, chunk)
+            linhas += len(chunk)
+
+        ajustar_sequencia(connection, tabela)
+
+    return linhas, time.perf_counter() - inicio
+
+
+def ajustar_sequencia(connection, tabela):
+    chave = list(tabela.primary_key.columns)
+    if connection.dialect.name != "postgresql" or len(chave) != 1:
+        return
+    if not isinstance(chave[0].type, Integer):
+        return
+    if coluna_particao(tabela):
+        # Os ids da carga codificam a competência (ver clean_dataset); a
+        # sequência fica abaixo desses blocos, para as inserções sem id
+        return
+
+    connection.execute(
+        text(
+            f"SELECT setval(pg_get_serial_sequence('{tabela.name}', '{chave[0].name}'), "
+            f"COALESCE(MAX({chave[0].name}), 1)) FROM {tabela.name}"
+        )
+    )
@@ -0,0 +1,281 @@
+import os
+import time
+import hashlib
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    and_,
+    delete,
+    func,
+    or_,
+)
+from sqlmodel import select
+from .bulk import (
+    TAMANHO_LOTE,
+    ajustar_sequencia,
+    dtypes_colunas,
+    gravar_lote,
+    ler_lotes,
+    preparar_lote,
+    upsert_dataframe,
+)
+from ..dataset.clean_dataset import ID_POR_COMPETENCIA, id_competencia
+from ..models import CargaArquivo, CargaLinha, ProgramaTransferencia, Transferencia
+
+# Chaves e hashes de um lote, comparados com CargaLinha no próprio banco: a
+# memória e o tráfego da comparação acompanham o lote, não a tabela
+ENTRADA = Table(
+    "carga_entrada",
+    MetaData(),
+    Column("chave", String, primary_key=True),
+    Column("hash", BigInteger),
+    Column("posicao", Integer),
+    prefixes=["TEMPORARY"],
+    postgresql_on_commit="DROP",
+)
+
+# Transferências não têm identificador na origem: o id do clean_dataset é a
+# posição da linha no mês, e uma linha inserida ou reordenada mudaria o id de
+# todas as seguintes. A carga incremental as identifica por estas colunas e
+# pelo número da ocorrência (linhas iguais se repetem), mantendo o id gravado
+CHAVE_TRANSFERENCIA = [
+    "competencia",
+    "unidade_gestora_codigo",
+    "favorecido_codigo",
+    "programa_codigo",
+    "tipo",
+]
+
+
+def hash_arquivo(caminho):
+    sha = hashlib.sha256()
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def chave_natural(df, colunas):
+    chave = df[colunas[0]].astype(str)
+    for coluna in colunas[1:]:
+        chave = chave + "|" + df[coluna].astype(str)
+    return chave
+
+
+def hash_linhas(df):
+    return pd.util.hash_pandas_object(df, index=False).to_numpy().view(np.int64)
+
+
+def arquivo_inalterado(connection, arquivo, hash_atual) -> bool:
+    return (
+        connection.execute(
+            select(CargaArquivo.hash).where(CargaArquivo.arquivo == arquivo)
+        ).scalar_one_or_none()
+        == hash_atual
+    )
+
+
+def registrar_arquivo(connection, arquivo, hash_atual):
+    upsert_dataframe(
+        connection,
+        CargaArquivo.__table__,
+        pd.DataFrame(
+            {
+                "arquivo": [arquivo],
+                "hash": [hash_atual],
+                "carregado_em": [datetime.now()],
+            }
+        ),
+    )
+
+
+def linhas_alteradas(connection, tabela, chaves, hashes) -> pd.DataFrame:
+    # Posição no lote e id já gravado (registro) das linhas novas ou alteradas
+    connection.execute(delete(ENTRADA))
+    gravar_lote(
+        connection,
+        ENTRADA,
+        pd.DataFrame(
+            {"chave": chaves, "hash": hashes, "posicao": np.arange(len(chaves))}
+        ),
+    )
+    return pd.DataFrame(
+        connection.execute(
+            select(ENTRADA.c.posicao, CargaLinha.registro)
+            .select_from(ENTRADA)
+            .outerjoin(
+                CargaLinha,
+                and_(
+                    CargaLinha.tabela == tabela.name,
+                    CargaLinha.chave == ENTRADA.c.chave,
+                ),
+            )
+            .where(or_(CargaLinha.hash.is_(None), CargaLinha.hash != ENTRADA.c.hash))
+            .order_by(ENTRADA.c.posicao)
+        ).all(),
+        columns=["posicao", "registro"],
+    )
+
+
+def registrar_linhas(connection, tabela, chaves, hashes, registros=None):
+    upsert_dataframe(
+        connection,
+        CargaLinha.__table__,
+        pd.DataFrame(
+            {
+                "tabela": tabela.name,
+                "chave": chaves,
+                "hash": hashes,
+                "registro": registros,
+            }
+        ),
+    )
+
+
+def carregar_arquivo_incremental(
+    engine, tabela, caminho, colunas, transformar=None, tamanho_lote=TAMANHO_LOTE
+):
+    if tabela is Transferencia.__table__:
+        return carregar_transferencias_incremental(
+            engine, caminho, colunas, transformar, tamanho_lote
+        )
+
+    arquivo = os.path.basename(caminho)
+    hash_atual = hash_arquivo(caminho)
+    chave = [coluna.name for coluna in tabela.primary_key.columns]
+    dtypes = dtypes_colunas(tabela, colunas)
+    linhas = 0
+    alteradas = 0
+    inicio = time.perf_counter()
+
+    with engine.begin() as connection:
+        if arquivo_inalterado(connection, arquivo, hash_atual):
+            return None
+        ENTRADA.create(connection, checkfirst=True)
+
+        for chunk in ler_lotes(caminho, list(colunas), dtypes, tamanho_lote):
+            chunk = preparar_lote(tabela, chunk, colunas, transformar)
+            chunk = chunk.drop_duplicates(subset=chave, keep="last")
+            linhas += len(chunk)
+
+            chaves = chave_natural(chunk, chave).to_numpy()
+            hashes = hash_linhas(chunk)
+            mudou = linhas_alteradas(connection, tabela, chaves, hashes)["posicao"]
+
+            if mudou.empty:
+                continue
+
+            upsert_dataframe(connection, tabela, chunk.iloc[mudou])
+            registrar_linhas(connection, tabela, chaves[mudou], hashes[mudou])
+            alteradas += len(mudou)
+
+        ajustar_sequencia(connection, tabela)
+        registrar_arquivo(connection, arquivo, hash_atual)
+
+    return linhas, alteradas, time.perf_counter() - inicio
+
+
+def ocorrencias(chaves, vistas):
+    # Número de cada linha entre as de mesma chave, contado ao longo do arquivo
+    numero = chaves.groupby(chaves).cumcount().to_numpy() + 1
+    numero += chaves.map(vistas).fillna(0).astype("int64").to_numpy()
+    for chave, quantidade in chaves.value_counts().items():
+        vistas[chave] = vistas.get(chave, 0) + quantidade
+    return chaves + "|" + pd.Series(numero, index=chaves.index).astype(str)
+
+
+def novos_ids(connection, competencias):
+    # Depois do maior id já gravado no bloco de cada mês (ver clean_dataset)
+    ids = np.empty(len(competencias), dtype=np.int64)
+    for competencia, posicoes in competencias.groupby(competencias).indices.items():
+        inicio = id_competencia(competencia, 0)
+        maior = connection.execute(
+            select(func.max(Transferencia.id)).where(
+                Transferencia.competencia == competencia,
+                Transferencia.id >= inicio,
+                Transferencia.id < inicio + ID_POR_COMPETENCIA,
+            )
+        ).scalar()
+        ids[posicoes] = (maior or inicio) + 1 + np.arange(len(posicoes))
+    return ids
+
+
+def carregar_transferencias_incremental(
+    engine, caminho, colunas, transformar=None, tamanho_lote=TAMANHO_LOTE
+):
+    tabela = Transferencia.__table__
+    arquivo = os.path.basename(caminho)
+    hash_atual = hash_arquivo(caminho)
+    dtypes = {**dtypes_colunas(tabela, colunas), "programa_codigo": "Int64"}
+    vistas = {}
+    linhas = 0
+    alteradas = 0
+    inicio = time.perf_counter()
+
+    with engine.begin() as connection:
+        if arquivo_inalterado(connection, arquivo, hash_atual):
+            return None
+        ENTRADA.create(connection, checkfirst=True)
+
+        # Sem linhas registradas (banco vazio ou carregado sem --incremental),
+        # vale o id do arquivo, como numa carga completa
+        primeira = (
+            connection.execute(
+                select(CargaLinha.chave).where(CargaLinha.tabela == tabela.name)
+            ).first()
+            is None
+        )
+
+        leitura = [*colunas, "programa_codigo"]
+        for chunk in ler_lotes(caminho, leitura, dtypes, tamanho_lote):
+            programas = chunk.pop("programa_codigo")
+            chunk = preparar_lote(tabela, chunk, colunas, transformar)
+            chunk["programa_codigo"] = programas
+            linhas += len(chunk)
+
+            chaves = ocorrencias(
+                chave_natural(chunk, CHAVE_TRANSFERENCIA), vistas
+            ).to_numpy()
+            hashes = hash_linhas(chunk.drop(columns="id"))
+            mudou = linhas_alteradas(connection, tabela, chaves, hashes)
+
+            if mudou.empty:
+                continue
+
+            posicoes = mudou["posicao"].to_numpy()
+            alterado = chunk.iloc[posicoes].reset_index(drop=True)
+            registros = mudou["registro"].astype("Int64")
+            if not primeira:
+                novas = registros.isna().to_numpy()
+                registros[novas] = novos_ids(connection, alterado["competencia"][novas])
+            alterado["id"] = registros.fillna(alterado["id"]).astype("int64")
+
+            upsert_dataframe(
+                connection, tabela, alterado.drop(columns="programa_codigo")
+            )
+            upsert_dataframe(
+                connection,
+                ProgramaTransferencia.__table__,
+                alterado[["id", "programa_codigo"]]
+                .dropna()
+                .rename(columns={"id": "transferencia_id"}),
+            )
+            registrar_linhas(
+                connection,
+                tabela,
+                chaves[posicoes],
+                hashes[posicoes],
+                alterado["id"].to_numpy(),
+            )
+            alteradas += len(posicoes)
+
+        registrar_arquivo(connection, arquivo, hash_atual)
+
+    return linhas, alteradas, time.perf_counter() - inicio
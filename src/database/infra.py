@@ -1,13 +1,75 @@
 import os
+import math
 
+from fastapi import Request, Response
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from dotenv import load_dotenv
+from .pool import opcoes_pool
+from .replicas import REPLICA_JANELA_PRIMARIO, Replicas
 
 load_dotenv()
 
-engine = create_engine(os.getenv("DATABASE_URL"))
+DRIVERS_ASSINCRONOS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def url_assincrona(url):
+    url = make_url(url)
+    return url.set(drivername=DRIVERS_ASSINCRONOS.get(url.drivername, url.drivername))
+
+
+url = make_url(os.getenv("DATABASE_URL"))
+url_async = url_assincrona(url)
+
+engine = create_engine(url, **opcoes_pool(url))
+async_engine = create_async_engine(url_async, **opcoes_pool(url_async, assincrono=True))
+
+# Sem expirar na confirmação: o acesso a atributos expirados dispararia
+# uma carga implícita, que não é permitida fora de um await
+async_session = async_sessionmaker(
+    async_engine, class_=AsyncSession, expire_on_commit=False
+)
+
+replicas = Replicas(
+    url_assincrona(replica.strip())
+    for replica in os.getenv("DATABASE_REPLICA_URLS", "").split(",")
+    if replica.strip()
+)
+
+METODOS_LEITURA = ("GET", "HEAD", "OPTIONS")
+COOKIE_PRIMARIO = "ler_primario"
 
 
 def get_session():
     with Session(engine) as session:
         yield session
+
+
+def sessoes_para(request: Request, response: Response):
+    if not replicas.replicas:
+        return async_session
+
+    if request.method not in METODOS_LEITURA:
+        # Leituras do mesmo cliente logo após uma escrita vão ao primário até a
+        # réplica alcançá-lo; as dos demais clientes continuam nas réplicas
+        response.set_cookie(
+            COOKIE_PRIMARIO, "1", max_age=max(math.ceil(REPLICA_JANELA_PRIMARIO), 1)
+        )
+        return async_session
+
+    if COOKIE_PRIMARIO in request.cookies:
+        return async_session
+
+    return replicas.proxima() or async_session
+
+
+async def get_async_session(request: Request, response: Response):
+    async with sessoes_para(request, response)() as session:
+        yield session
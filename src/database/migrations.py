@@ -0,0 +1,147 @@
+from sqlalchemy import Integer, inspect, text
+from sqlmodel import SQLModel
+from .infra import engine
+from .tipos import Centavos
+from ..models import CargaLinha, ResumoEstado, ResumoUnidadeGestora, Transferencia
+
+COLUNAS_BUSCA = {
+    "favorecido": "nome",
+    "municipio": "nome",
+    "programa": "nome",
+    "unidadegestora": "nome",
+}
+
+COLUNAS_VALOR = [
+    Transferencia.valor,
+    ResumoEstado.valor_total,
+    ResumoUnidadeGestora.valor_total,
+]
+
+# Índices de versões anteriores que nenhuma consulta usa: tipo tem poucos
+# valores e a listagem filtra com LIKE '%...%', que o btree não atende
+INDICES_REMOVIDOS = ["ix_transferencia_tipo"]
+
+# Colunas criadas depois das tabelas: o create_all não altera tabelas existentes
+COLUNAS_ADICIONADAS = [CargaLinha.registro]
+
+FUNCAO_UNACCENT = """
+CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+"""
+
+
+def criar_indices_busca(connection):
+    disponiveis = connection.execute(
+        text(
+            "SELECT count(*) FROM pg_available_extensions "
+            "WHERE name IN ('pg_trgm', 'unaccent')"
+        )
+    ).scalar()
+    if disponiveis < 2:
+        return False
+
+    connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    connection.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+    connection.execute(text(FUNCAO_UNACCENT))
+
+    for tabela, coluna in COLUNAS_BUSCA.items():
+        connection.execute(
+            text(
+                f"CREATE INDEX IF NOT EXISTS ix_{tabela}_{coluna}_trgm ON {tabela} "
+                f"USING gin (f_unaccent(lower({coluna})) gin_trgm_ops)"
+            )
+        )
+
+    return True
+
+
+def criar_indices(bind=engine):
+    with bind.begin() as connection:
+        for indice in INDICES_REMOVIDOS:
+            connection.execute(text(f"DROP INDEX IF EXISTS {indice}"))
+
+        for tabela in SQLModel.metadata.sorted_tables:
+            for indice in tabela.indexes:
+                indice.create(connection, checkfirst=True)
+
+        if connection.dialect.name == "postgresql":
+            criar_indices_busca(connection)
+
+
+def adicionar_colunas(bind=engine):
+    with bind.begin() as connection:
+        inspetor = inspect(connection)
+        for coluna in COLUNAS_ADICIONADAS:
+            tabela = coluna.table.name
+            if not inspetor.has_table(tabela) or coluna.name in {
+                c["name"] for c in inspetor.get_columns(tabela)
+            }:
+                continue
+
+            tipo = coluna.type.compile(dialect=connection.dialect)
+            connection.execute(
+                text(f"ALTER TABLE {tabela} ADD COLUMN {coluna.name} {tipo}")
+            )
+
+            if coluna is CargaLinha.registro:
+                # As transferências eram registradas pelo id do arquivo; sem
+                # registros, a próxima carga incremental volta a usá-lo e passa
+                # a registrá-las pelas colunas de origem
+                connection.execute(
+                    CargaLinha.__table__.delete().where(
+                        CargaLinha.tabela == Transferencia.__tablename__
+                    )
+                )
+
+
+def ajustar_tipos_valor(bind=engine):
+    # Converte as colunas de valor para o armazenamento configurado em
+    # VALOR_ARMAZENAMENTO (NUMERIC sem escala, NUMERIC(18,2) ou centavos)
+    with bind.begin() as connection:
+        inspetor = inspect(connection)
+        for coluna in COLUNAS_VALOR:
+            tabela = coluna.table.name
+            if not inspetor.has_table(tabela):
+                continue
+
+            atual = next(
+                c["type"]
+                for c in inspetor.get_columns(tabela)
+                if c["name"] == coluna.name
+            )
+            alvo = coluna.type.compile(dialect=connection.dialect)
+            if atual.compile(dialect=connection.dialect) == alvo:
+                continue
+
+            em_centavos = isinstance(atual, Integer)
+            para_centavos = isinstance(coluna.type, Centavos)
+            if connection.dialect.name != "postgresql":
+                # No SQLite NUMERIC e NUMERIC(18,2) têm a mesma afinidade
+                if em_centavos == para_centavos:
+                    continue
+                raise RuntimeError(
+                    f"A coluna {tabela}.{coluna.name} está em outra unidade; "
+                    "recrie o banco e carregue os dados novamente"
+                )
+
+            reais = f"{coluna.name} / 100.0" if em_centavos else coluna.name
+            conversao = (
+                f"round(({reais}) * 100)" if para_centavos else f"round({reais}, 2)"
+            )
+            connection.execute(
+                text(
+                    f"ALTER TABLE {tabela} ALTER COLUMN {coluna.name} "
+                    f"TYPE {alvo} USING {conversao}"
+                )
+            )
+
+
+if __name__ == "__main__":
+    print("Adicionando colunas ausentes...")
+    adicionar_colunas()
+    print("Ajustando o tipo das colunas de valor...")
+    ajustar_tipos_valor()
+    print("Criando índices ausentes...")
+    criar_indices()
+    print("Índices criados com sucesso!")
@@ -0,0 +1,148 @@
+import os
+import time
+import threading
+from graphlib import TopologicalSorter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from sqlalchemy import Column, MetaData, Table, insert, select
+from .bulk import (
+    ajustar_sequencia,
+    dtypes_colunas,
+    gravar_lote,
+    ler_lotes,
+    preparar_lote,
+)
+from .particoes import coluna_particao, garantir_particoes
+
+TRABALHADORES = min(4, os.cpu_count() or 1)
+TAMANHO_LOTE = 10000
+
+
+def grafo_dependencias(tabelas):
+    nomes = {tabela.name for tabela in tabelas}
+
+    return {
+        tabela.name: {
+            chave.column.table.name
+            for chave in tabela.foreign_keys
+            if chave.column.table.name in nomes
+            and chave.column.table.name != tabela.name
+        }
+        for tabela in tabelas
+    }
+
+
+def tabela_intermediaria(engine, tabela):
+    # Mesmas colunas, sem restrições nem índices; no Postgres, sem WAL
+    return Table(
+        f"carga_{tabela.name}",
+        MetaData(),
+        *(Column(coluna.name, coluna.type) for coluna in tabela.columns),
+        prefixes=["UNLOGGED"] if engine.dialect.name == "postgresql" else [],
+    )
+
+
+def gravar_lote_isolado(engine, tabela, df):
+    with engine.begin() as connection:
+        gravar_lote(connection, tabela, df)
+    return len(df)
+
+
+def promover(engine, tabela, intermediaria):
+    # Uma única transação: a tabela recebe todos os lotes ou nenhum
+    with engine.begin() as connection:
+        coluna = coluna_particao(tabela)
+        if coluna is not None:
+            garantir_particoes(
+                connection,
+                tabela,
+                connection.execute(select(intermediaria.c[coluna]).distinct())
+                .scalars()
+                .all(),
+            )
+        connection.execute(
+            insert(tabela).from_select(
+                [coluna.name for coluna in intermediaria.columns], select(intermediaria)
+            )
+        )
+        ajustar_sequencia(connection, tabela)
+
+
+def carregar_tabela(
+    engine, executor, tabela, caminho, colunas, transformar, limite, tamanho_lote
+):
+    # Os lotes são gravados em paralelo numa tabela intermediária, cada um na
+    # sua transação, e só passam para a tabela de destino no fim; se algum
+    # falhar, o destino fica como estava e a intermediária é descartada
+    dtypes = dtypes_colunas(tabela, colunas)
+    intermediaria = tabela_intermediaria(engine, tabela)
+    inicio = time.perf_counter()
+    futuros = []
+
+    with engine.begin() as connection:
+        intermediaria.drop(connection, checkfirst=True)
+        intermediaria.create(connection)
+
+    try:
+        for chunk in ler_lotes(caminho, list(colunas), dtypes, tamanho_lote):
+            chunk = preparar_lote(tabela, chunk, colunas, transformar)
+            limite.acquire()
+            futuro = executor.submit(gravar_lote_isolado, engine, intermediaria, chunk)
+            futuro.add_done_callback(lambda _: limite.release())
+            futuros.append(futuro)
+
+        linhas = sum(futuro.result() for futuro in futuros)
+        promover(engine, tabela, intermediaria)
+    finally:
+        wait(futuros)
+        with engine.begin() as connection:
+            intermediaria.drop(connection, checkfirst=True)
+
+    return linhas, time.perf_counter() - inicio
+
+
+def carregar_em_paralelo(
+    engine, cargas, trabalhadores=TRABALHADORES, tamanho_lote=TAMANHO_LOTE
+):
+    if engine.dialect.name == "sqlite":
+        trabalhadores = 1
+
+    cargas = {carga[0].name: carga for carga in cargas}
+    ordem = TopologicalSorter(grafo_dependencias([c[0] for c in cargas.values()]))
+    ordem.prepare()
+
+    # Cada tabela tem um coordenador que lê o arquivo e distribui os lotes;
+    # a gravação dos lotes (cada um na sua conexão) é limitada por `trabalhadores`
+    limite = threading.BoundedSemaphore(trabalhadores * 2)
+
+    with (
+        ThreadPoolExecutor(
+            max_workers=len(cargas), thread_name_prefix="tabela"
+        ) as coordenadores,
+        ThreadPoolExecutor(
+            max_workers=trabalhadores, thread_name_prefix="lote"
+        ) as executor,
+    ):
+        pendentes = {}
+
+        while ordem.is_active():
+            for nome in ordem.get_ready():
+                tabela, caminho, colunas, transformar = cargas[nome]
+                futuro = coordenadores.submit(
+                    carregar_tabela,
+                    engine,
+                    executor,
+                    tabela,
+                    caminho,
+                    colunas,
+                    transformar,
+                    limite,
+                    tamanho_lote,
+                )
+                pendentes[futuro] = nome
+
+            concluidos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                nome = pendentes.pop(futuro)
+                linhas, segundos = futuro.result()
+                ordem.done(nome)
+                yield nome, linhas, segundos
@@ -0,0 +1,185 @@
+import os
+import argparse
+from datetime import date, datetime
+from sqlalchemy import MetaData, PrimaryKeyConstraint, func, select, text
+from sqlmodel import SQLModel
+from .. import models  # noqa: F401
+from ..dataset.clean_dataset import LIMITE_IDS_API
+
+PARTICOES_MESES_FUTUROS = int(os.getenv("PARTICOES_MESES_FUTUROS", "12"))
+
+
+def coluna_particao(tabela):
+    return tabela.info.get("particionar_por")
+
+
+def particionada(connection, tabela) -> bool:
+    return (
+        connection.dialect.name == "postgresql" and coluna_particao(tabela) is not None
+    )
+
+
+def chave_conflito(connection, tabela) -> list:
+    # No Postgres a chave primária de uma tabela particionada precisa incluir a
+    # coluna de partição, e o ON CONFLICT só aceita a chave como ela está no banco
+    chave = [coluna.name for coluna in tabela.primary_key.columns]
+    if particionada(connection, tabela):
+        chave.append(coluna_particao(tabela))
+    return chave
+
+
+def reservar_ids(connection, tabela, quantidade: int):
+    # Ids de tabelas particionadas criados pela API ficam abaixo de
+    # LIMITE_IDS_API, fora dos blocos mensais da carga. No Postgres a sequência
+    # já fica nessa faixa (ajustar_sequencia não a avança); no SQLite o
+    # próximo id seria o maior + 1, dentro do bloco do último mês carregado
+    if coluna_particao(tabela) is None or connection.dialect.name != "sqlite":
+        return None
+
+    chave = next(iter(tabela.primary_key.columns))
+    maior = connection.execute(
+        select(func.max(chave)).where(chave < LIMITE_IDS_API)
+    ).scalar()
+    inicio = (maior or 0) + 1
+    if inicio + quantidade > LIMITE_IDS_API:
+        raise RuntimeError(f"Não há ids livres abaixo de {LIMITE_IDS_API}")
+    return list(range(inicio, inicio + quantidade))
+
+
+def inicio_do_mes(dia) -> date:
+    return date(dia.year, dia.month, 1)
+
+
+def mes_seguinte(dia) -> date:
+    return date(dia.year + dia.month // 12, dia.month % 12 + 1, 1)
+
+
+def nome_particao(tabela, mes: date) -> str:
+    return f"{tabela.name}_{mes:%Y_%m}"
+
+
+def criar_tabela_particionada(connection, tabela):
+    coluna = coluna_particao(tabela)
+    tipo = connection.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:nome)"),
+        {"nome": tabela.name},
+    ).scalar()
+    if tipo == "p":
+        return
+    if tipo is not None:
+        raise RuntimeError(
+            f"A tabela {tabela.name} já existe sem particionamento; "
+            "recrie o banco e carregue os dados novamente"
+        )
+
+    # Cópia da tabela com a chave primária estendida pela coluna de partição;
+    # as tabelas referenciadas entram na cópia só para resolver as chaves estrangeiras
+    metadata = MetaData()
+    for chave in tabela.foreign_keys:
+        if chave.column.table.name not in metadata.tables:
+            chave.column.table.to_metadata(metadata)
+    copia = tabela.to_metadata(metadata)
+
+    chave = [c.name for c in tabela.primary_key.columns]
+    copia.c[coluna].primary_key = True
+    copia.append_constraint(PrimaryKeyConstraint(*chave, coluna))
+    if tabela.autoincrement_column is not None:
+        copia.c[tabela.autoincrement_column.name].autoincrement = True
+    copia.dialect_options["postgresql"]["partition_by"] = f"RANGE ({coluna})"
+    copia.create(connection)
+
+
+def criar_tabelas(bind):
+    with bind.begin() as connection:
+        for tabela in SQLModel.metadata.sorted_tables:
+            if particionada(connection, tabela):
+                criar_tabela_particionada(connection, tabela)
+            else:
+                tabela.create(connection, checkfirst=True)
+
+
+def meses_entre(inicio: date, fim: date) -> list:
+    meses, mes = [], inicio_do_mes(inicio)
+    while mes <= fim:
+        meses.append(mes)
+        mes = mes_seguinte(mes)
+    return meses
+
+
+def particoes_faltando(connection, tabela, valores) -> list:
+    if not particionada(connection, tabela):
+        return []
+
+    meses = sorted({inicio_do_mes(valor) for valor in valores if valor is not None})
+    return [
+        mes
+        for mes in meses
+        if connection.execute(
+            text("SELECT to_regclass(:nome)"), {"nome": nome_particao(tabela, mes)}
+        ).scalar()
+        is None
+    ]
+
+
+def sem_particao(mes: date) -> str:
+    return (
+        f"Não há partição para a competência {mes:%Y-%m}; crie-a com "
+        f"python -m src.database.particoes --de {mes:%Y-%m} --ate {mes:%Y-%m}"
+    )
+
+
+def garantir_particoes(connection, tabela, valores):
+    # Só para a carga e a manutenção: o CREATE TABLE ... PARTITION OF trava a
+    # tabela mãe em ACCESS EXCLUSIVE, e numa requisição disputaria essa trava
+    # com as leituras e as outras escritas. A API só grava em partições que já
+    # existem (ver particoes_faltando)
+    faltando = particoes_faltando(connection, tabela, valores)
+    if not faltando:
+        return
+
+    # Serializa a criação entre conexões (carga paralela): quem espera
+    # encontra a partição já criada por quem chegou antes
+    connection.execute(
+        text("SELECT pg_advisory_xact_lock(hashtext(:tabela))"),
+        {"tabela": tabela.name},
+    )
+    for mes in faltando:
+        connection.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS {nome_particao(tabela, mes)} "
+                f"PARTITION OF {tabela.name} "
+                f"FOR VALUES FROM ('{mes}') TO ('{mes_seguinte(mes)}')"
+            )
+        )
+
+
+def preparar_particoes(bind, inicio: date = None, fim: date = None):
+    # Por padrão, do mês atual até PARTICOES_MESES_FUTUROS meses à frente
+    if inicio is None:
+        inicio = date.today()
+    if fim is None:
+        fim = inicio_do_mes(inicio)
+        for _ in range(PARTICOES_MESES_FUTUROS):
+            fim = mes_seguinte(fim)
+
+    meses = meses_entre(inicio, fim)
+    with bind.begin() as connection:
+        for tabela in SQLModel.metadata.sorted_tables:
+            garantir_particoes(connection, tabela, meses)
+
+
+def ler_mes(valor):
+    return datetime.strptime(valor, "%Y-%m").date()
+
+
+if __name__ == "__main__":
+    from .infra import engine
+
+    parser = argparse.ArgumentParser(
+        description="Cria as partições mensais das tabelas particionadas"
+    )
+    parser.add_argument("--de", type=ler_mes, metavar="AAAA-MM", help="Primeiro mês")
+    parser.add_argument("--ate", type=ler_mes, metavar="AAAA-MM", help="Último mês")
+    args = parser.parse_args()
+
+    preparar_particoes(engine, args.de, args.ate)
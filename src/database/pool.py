@@ -0,0 +1,126 @@
+import os
+import time
+import uuid
+import threading
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+
+def variavel_booleana(nome: str, padrao: bool = False) -> bool:
+    return os.getenv(nome, str(padrao)).lower() in ("1", "true", "sim")
+
+
+class MetricasPool:
+    def __init__(self, classe: str):
+        self.classe = classe
+        self.trava = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+
+    def registrar(self, espera: float, timeout: bool = False):
+        with self.trava:
+            if timeout:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.espera_total += espera
+            self.espera_maxima = max(self.espera_maxima, espera)
+
+    def estatisticas(self, pool) -> dict:
+        with self.trava:
+            metricas = {
+                "pool": self.classe,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "espera_media_ms": self.espera_total
+                / max(self.checkouts + self.timeouts, 1)
+                * 1000,
+                "espera_maxima_ms": self.espera_maxima * 1000,
+            }
+
+        if isinstance(pool, QueuePool):
+            capacidade = pool.size() + max(pool._max_overflow, 0)
+            metricas.update(
+                {
+                    "tamanho": pool.size(),
+                    "overflow_maximo": pool._max_overflow,
+                    "em_uso": pool.checkedout(),
+                    "ociosas": pool.checkedin(),
+                    "overflow": max(pool.overflow(), 0),
+                    "saturacao": pool.checkedout() / capacidade if capacidade else 0,
+                }
+            )
+
+        return metricas
+
+
+class PoolMedido:
+    # Mede o tempo de espera de cada checkout; a classe é criada por engine
+    # (ver classe_pool), e recreate() preserva as métricas por usar __class__
+    metricas: MetricasPool
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexao = super()._do_get()
+        except exc.TimeoutError:
+            self.metricas.registrar(time.perf_counter() - inicio, timeout=True)
+            raise
+        self.metricas.registrar(time.perf_counter() - inicio)
+        return conexao
+
+
+def classe_pool(assincrono: bool):
+    if os.getenv("DATABASE_POOL", "queue") == "null" or variavel_booleana(
+        "DATABASE_PGBOUNCER"
+    ):
+        base = NullPool
+    elif assincrono:
+        base = AsyncAdaptedQueuePool
+    else:
+        base = QueuePool
+
+    return type(
+        f"{base.__name__}Medido",
+        (PoolMedido, base),
+        {"metricas": MetricasPool(base.__name__)},
+    )
+
+
+def opcoes_pool(url, assincrono: bool = False) -> dict:
+    poolclass = classe_pool(assincrono)
+    opcoes = {
+        "poolclass": poolclass,
+        "pool_pre_ping": variavel_booleana("DATABASE_POOL_PRE_PING"),
+    }
+
+    if issubclass(poolclass, QueuePool):
+        opcoes.update(
+            {
+                "pool_size": int(os.getenv("DATABASE_POOL_SIZE", "5")),
+                "max_overflow": int(os.getenv("DATABASE_MAX_OVERFLOW", "10")),
+                "pool_timeout": float(os.getenv("DATABASE_POOL_TIMEOUT", "30")),
+                "pool_recycle": int(os.getenv("DATABASE_POOL_RECYCLE", "-1")),
+            }
+        )
+
+    # No modo transação do PgBouncer cada instrução pode ir para uma conexão
+    # diferente do servidor, então o asyncpg não pode reutilizar prepared statements
+    if (
+        variavel_booleana("DATABASE_PGBOUNCER")
+        and url.drivername == "postgresql+asyncpg"
+    ):
+        opcoes["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+
+    return opcoes
+
+
+def metricas_pool(engine) -> dict:
+    pool = engine.pool
+    return pool.metricas.estatisticas(pool)
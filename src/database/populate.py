@@ -1,7 +1,12 @@
 import os
-import pandas as pd
-from decimal import Decimal
-from .infra import get_session
+import argparse
+from .infra import engine
+from .bulk import carregar_arquivo, colunas_arquivo
+from .incremental import carregar_arquivo_incremental
+from .paralelo import carregar_em_paralelo
+from .migrations import adicionar_colunas, ajustar_tipos_valor, criar_indices
+from .particoes import criar_tabelas, ler_mes, preparar_particoes
+from .resumos import atualizar_resumos
 from ..models import (
     Municipio,
     UnidadeGestora,
@@ -10,108 +15,219 @@ from ..models import (
     Transferencia,
     ProgramaTransferencia,
 )
+from ..dataset.clean_dataset import id_competencia
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 dataset_path = os.path.join(current_dir, "../dataset/")
 
+CARGAS = [
+    (
+        Municipio,
+        "municipios_clean",
+        {
+            "codigo_municipio_siafi": "codigo",
+            "nome_municipio": "nome",
+            "uf": "uf",
+        },
+    ),
+    (
+        UnidadeGestora,
+        "unidades_gestoras_clean",
+        {
+            "codigo_unidade_gestora": "codigo",
+            "nome_unidade_gestora": "nome",
+            "nome_orgao": "orgao_nome",
+        },
+    ),
+    (
+        Favorecido,
+        "favorecidos_clean",
+        {
+            "codigo_favorecido": "codigo",
+            "nome_favorecido": "nome",
+            "codigo_municipio_siafi": "municipio_codigo",
+        },
+    ),
+    (
+        Programa,
+        "programas_clean",
+        {
+            "codigo_programa": "codigo",
+            "nome_programa": "nome",
+        },
+    ),
+    (
+        Transferencia,
+        "transferencias_clean",
+        {
+            "id": "id",
+            "competencia": "competencia",
+            "tipo": "tipo",
+            "valor": "valor",
+            "unidade_gestora_codigo": "unidade_gestora_codigo",
+            "favorecido_codigo": "favorecido_codigo",
+        },
+    ),
+    (
+        ProgramaTransferencia,
+        "programa_transferencia_clean",
+        {
+            "transferencia_id": "transferencia_id",
+            "programa_codigo": "programa_codigo",
+        },
+    ),
+]
 
-def populate_data():
-    session = next(get_session())
 
-    try:
-        df_municipios = pd.read_csv(os.path.join(dataset_path, "municipios_clean.csv"))
-        municipios = []
-        for _, row in df_municipios.iterrows():
-            municipio = Municipio(
-                codigo=row["codigo_municipio_siafi"],
-                nome=row["nome_municipio"],
-                uf=row["uf"],
-            )
-            municipios.append(municipio)
-        session.add_all(municipios)
-        session.commit()
+def relatar_carga(tabela, linhas, segundos):
+    print(
+        f"{tabela}: {linhas} linhas em {segundos:.2f}s "
+        f"({linhas / max(segundos, 1e-9):.0f} linhas/s)"
+    )
 
-        df_unidades = pd.read_csv(
-            os.path.join(dataset_path, "unidades_gestoras_clean.csv")
-        )
-        unidades = []
-        for _, row in df_unidades.iterrows():
-            unidade = UnidadeGestora(
-                codigo=row["codigo_unidade_gestora"],
-                nome=row["nome_unidade_gestora"],
-                orgao_nome=row["nome_orgao"],
-            )
-            unidades.append(unidade)
-        session.add_all(unidades)
-        session.commit()
 
-        df_favorecidos = pd.read_csv(
-            os.path.join(dataset_path, "favorecidos_clean.csv")
+def transformacoes(formato, competencia):
+    caminho = os.path.join(dataset_path, f"transferencias_clean.{formato}")
+    if "competencia" in colunas_arquivo(caminho):
+        return {}
+    if competencia is None:
+        raise ValueError(
+            f"{caminho} não tem a coluna competencia (gerado antes dela); "
+            "informe a competência do extrato com --competencia AAAA-MM"
         )
-        favorecidos = []
-        for _, row in df_favorecidos.iterrows():
-            favorecido = Favorecido(
-                codigo=row["codigo_favorecido"],
-                nome=row["nome_favorecido"],
-                municipio_codigo=row["codigo_municipio_siafi"],
+
+    # Extrato antigo: a competência informada vale para todas as linhas e os
+    # ids vão para o bloco do mês, como faria o clean_dataset atual
+    base = id_competencia(competencia, 0)
+    return {
+        Transferencia: lambda df: df.assign(
+            id=df["id"] + base, competencia=competencia
+        ),
+        ProgramaTransferencia: lambda df: df.assign(
+            transferencia_id=df["transferencia_id"] + base
+        ),
+    }
+
+
+def cargas_do_formato(formato, competencia):
+    transformar = transformacoes(formato, competencia)
+    for modelo, arquivo, colunas in CARGAS:
+        if modelo in transformar:
+            colunas = {
+                origem: destino
+                for origem, destino in colunas.items()
+                if destino != "competencia"
+            }
+        yield modelo, arquivo, colunas, transformar.get(modelo)
+
+
+def carregar(incremental, formato, trabalhadores, competencia=None):
+    cargas = list(cargas_do_formato(formato, competencia))
+
+    if trabalhadores > 1 and not incremental:
+        cargas = [
+            (
+                modelo.__table__,
+                os.path.join(dataset_path, f"{arquivo}.{formato}"),
+                colunas,
+                transformar,
             )
-            favorecidos.append(favorecido)
-        session.add_all(favorecidos)
-        session.commit()
-
-        df_programas = pd.read_csv(os.path.join(dataset_path, "programas_clean.csv"))
-        programas = []
-        for _, row in df_programas.iterrows():
-            programa = Programa(
-                codigo=row["codigo_programa"], nome=row["nome_programa"]
+            for modelo, arquivo, colunas, transformar in cargas
+        ]
+        for tabela, linhas, segundos in carregar_em_paralelo(
+            engine, cargas, trabalhadores
+        ):
+            relatar_carga(tabela, linhas, segundos)
+        return None
+
+    alteradas = set()
+
+    for modelo, arquivo, colunas, transformar in cargas:
+        tabela = modelo.__table__
+        arquivo = f"{arquivo}.{formato}"
+        caminho = os.path.join(dataset_path, arquivo)
+
+        if not incremental:
+            linhas, segundos = carregar_arquivo(
+                engine, tabela, caminho, colunas, transformar
             )
-            programas.append(programa)
-        session.add_all(programas)
-        session.commit()
+            relatar_carga(tabela.name, linhas, segundos)
+            alteradas.add(tabela.name)
+            continue
+
+        if modelo is ProgramaTransferencia:
+            # Os ids do arquivo são posições; na carga incremental o vínculo é
+            # gravado junto com a transferência, pelo id mantido no banco
+            continue
 
-        df_transferencias = pd.read_csv(
-            os.path.join(dataset_path, "transferencias_clean.csv")
+        resultado = carregar_arquivo_incremental(
+            engine, tabela, caminho, colunas, transformar
         )
-        transferencias = []
-        for _, row in df_transferencias.iterrows():
-            valor = row["valor"]
-            if isinstance(valor, str):
-                try:
-                    valor = Decimal(valor)
-                except Exception:
-                    valor = None
-            transferencia = Transferencia(
-                id=row["id"],
-                tipo=row["tipo"],
-                valor=valor,
-                unidade_gestora_codigo=row["unidade_gestora_codigo"],
-                favorecido_codigo=row["favorecido_codigo"],
-            )
-            transferencias.append(transferencia)
-        session.add_all(transferencias)
-        session.commit()
+        if resultado is None:
+            print(f"{tabela.name}: {arquivo} sem alterações desde a última carga")
+            continue
 
-        df_pt = pd.read_csv(
-            os.path.join(dataset_path, "programa_transferencia_clean.csv")
+        linhas, novas, segundos = resultado
+        print(
+            f"{tabela.name}: {novas} de {linhas} linhas novas ou alteradas "
+            f"em {segundos:.2f}s ({linhas / max(segundos, 1e-9):.0f} linhas/s)"
         )
-        pt_links = []
-        for _, row in df_pt.iterrows():
-            link = ProgramaTransferencia(
-                transferencia_id=int(row["transferencia_id"]),
-                programa_codigo=int(row["programa_codigo"]),
-            )
-            pt_links.append(link)
-        session.add_all(pt_links)
-        session.commit()
+        if novas:
+            alteradas.add(tabela.name)
+            if modelo is Transferencia:
+                alteradas.add(ProgramaTransferencia.__tablename__)
+
+    return alteradas
+
+
+def populate_data(incremental=False, formato="csv", trabalhadores=1, competencia=None):
+    criar_tabelas(engine)
+    preparar_particoes(engine)
+    adicionar_colunas(engine)
+    ajustar_tipos_valor(engine)
+    criar_indices(engine)
+
+    try:
+        alteradas = carregar(incremental, formato, trabalhadores, competencia)
+        atualizar_resumos(engine, alteradas)
     except Exception as error:
-        session.rollback()
         print(f"Erro: {str(error)}")
         raise
-    finally:
-        session.close()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Popula o banco de dados")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Insere ou atualiza apenas as linhas novas ou alteradas",
+    )
+    parser.add_argument(
+        "--formato",
+        choices=["csv", "parquet"],
+        default="csv",
+        help="Formato dos arquivos gerados por clean_dataset",
+    )
+    parser.add_argument(
+        "--paralelo",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Carrega tabelas independentes e lotes em N conexões simultâneas",
+    )
+    parser.add_argument(
+        "--competencia",
+        type=ler_mes,
+        metavar="AAAA-MM",
+        help="Competência de um extrato gerado antes da coluna competencia",
+    )
+    args = parser.parse_args()
+
     print("Populando o banco de dados...")
-    populate_data()
+    populate_data(
+        incremental=args.incremental,
+        formato=args.formato,
+        trabalhadores=args.paralelo,
+        competencia=args.competencia,
+    )
     print("População concluída com sucesso!")
@@ -0,0 +1,100 @@
+import os
+import asyncio
+import itertools
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .pool import metricas_pool, opcoes_pool
+
+REPLICA_INTERVALO_VERIFICACAO = float(os.getenv("REPLICA_INTERVALO_VERIFICACAO", "5"))
+REPLICA_TIMEOUT_VERIFICACAO = float(os.getenv("REPLICA_TIMEOUT_VERIFICACAO", "2"))
+REPLICA_JANELA_PRIMARIO = float(os.getenv("REPLICA_JANELA_PRIMARIO", "5"))
+
+
+class Replica:
+    def __init__(self, url):
+        self.url = url
+        self.engine = create_async_engine(url, **opcoes_pool(url, assincrono=True))
+        self.sessoes = async_sessionmaker(
+            self.engine, class_=AsyncSession, expire_on_commit=False
+        )
+        self.saudavel = True
+        self.falhas = 0
+        self.leituras = 0
+
+    async def consultar(self):
+        async with self.engine.connect() as conexao:
+            await conexao.execute(text("SELECT 1"))
+
+    async def verificar(self) -> bool:
+        # O limite cobre também a abertura da conexão: uma réplica que aceita o
+        # TCP e não responde prenderia a verificação no connect
+        try:
+            await asyncio.wait_for(self.consultar(), REPLICA_TIMEOUT_VERIFICACAO)
+        except Exception as erro:
+            if self.saudavel:
+                logger.warning(
+                    f"Réplica {self.url.render_as_string()} indisponível: {erro}"
+                )
+            self.saudavel = False
+            self.falhas += 1
+            return False
+
+        if not self.saudavel:
+            logger.info(f"Réplica {self.url.render_as_string()} disponível novamente")
+        self.saudavel = True
+        return True
+
+    def estatisticas(self) -> dict:
+        return {
+            "url": self.url.render_as_string(),
+            "saudavel": self.saudavel,
+            "leituras": self.leituras,
+            "falhas_verificacao": self.falhas,
+            "pool": metricas_pool(self.engine),
+        }
+
+
+class Replicas:
+    def __init__(self, urls):
+        self.replicas = [Replica(url) for url in urls]
+        self.contador = itertools.count()
+        self.tarefa = None
+
+    def proxima(self):
+        # Round-robin entre as réplicas que passaram na última verificação;
+        # sem nenhuma disponível, a leitura vai para o primário
+        saudaveis = [replica for replica in self.replicas if replica.saudavel]
+        if not saudaveis:
+            return None
+
+        replica = saudaveis[next(self.contador) % len(saudaveis)]
+        replica.leituras += 1
+        return replica.sessoes
+
+    async def verificar(self):
+        await asyncio.gather(*(replica.verificar() for replica in self.replicas))
+
+    async def monitorar(self):
+        while True:
+            await asyncio.sleep(REPLICA_INTERVALO_VERIFICACAO)
+            await self.verificar()
+
+    async def iniciar(self):
+        if self.replicas:
+            await self.verificar()
+            self.tarefa = asyncio.create_task(self.monitorar())
+
+    async def encerrar(self):
+        if self.tarefa is not None:
+            self.tarefa.cancel()
+            self.tarefa = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def engines(self) -> list:
+        return [replica.engine for replica in self.replicas]
+
+    def estatisticas(self) -> list:
+        return [replica.estatisticas() for replica in self.replicas]
@@ -0,0 +1,146 @@
+import time
+from datetime import datetime
+from loguru import logger
+from sqlalchemy import delete, exists, insert
+from sqlmodel import func, select
+from .infra import engine
+from ..models import (
+    Favorecido,
+    Municipio,
+    ProgramaTransferencia,
+    ResumoEstado,
+    ResumoMunicipio,
+    ResumoPrograma,
+    ResumoUnidadeGestora,
+    Transferencia,
+    VersaoResumo,
+)
+
+# Cada resumo é recalculado por completo a partir da sua consulta agregada, e
+# apenas quando alguma das tabelas de origem foi alterada pela carga
+RESUMOS = [
+    (
+        ResumoEstado,
+        select(
+            Municipio.uf,
+            func.count(Transferencia.id),
+            func.sum(Transferencia.valor),
+        )
+        .join(Favorecido, Favorecido.municipio_codigo == Municipio.codigo)
+        .join(Transferencia, Transferencia.favorecido_codigo == Favorecido.codigo)
+        .group_by(Municipio.uf),
+        {"municipio", "favorecido", "transferencia"},
+    ),
+    (
+        ResumoUnidadeGestora,
+        select(
+            Transferencia.unidade_gestora_codigo,
+            func.count(),
+            func.sum(Transferencia.valor),
+        ).group_by(Transferencia.unidade_gestora_codigo),
+        {"transferencia"},
+    ),
+    (
+        ResumoPrograma,
+        select(
+            ProgramaTransferencia.programa_codigo,
+            func.count(),
+            func.count(func.distinct(Transferencia.favorecido_codigo)),
+        )
+        .join(Transferencia, Transferencia.id == ProgramaTransferencia.transferencia_id)
+        .group_by(ProgramaTransferencia.programa_codigo),
+        {"transferencia", "programatransferencia"},
+    ),
+    (
+        ResumoMunicipio,
+        select(Favorecido.municipio_codigo, func.count()).group_by(
+            Favorecido.municipio_codigo
+        ),
+        {"favorecido"},
+    ),
+]
+
+
+# As mesmas agregações restritas a um intervalo de competências [de, ate): o
+# filtro em Transferencia.competencia faz o Postgres ler só as partições do
+# intervalo. No período, um município conta os favorecidos que receberam algo
+CONSULTAS_PERIODO = {modelo: consulta for modelo, consulta, _ in RESUMOS}
+CONSULTAS_PERIODO[ResumoMunicipio] = (
+    select(
+        Favorecido.municipio_codigo,
+        func.count(func.distinct(Transferencia.favorecido_codigo)),
+    )
+    .join(Transferencia, Transferencia.favorecido_codigo == Favorecido.codigo)
+    .group_by(Favorecido.municipio_codigo)
+)
+
+
+def no_periodo(consulta, periodo):
+    if periodo is None:
+        return consulta
+
+    de, ate = periodo
+    if de is not None:
+        consulta = consulta.where(Transferencia.competencia >= de)
+    if ate is not None:
+        consulta = consulta.where(Transferencia.competencia < ate)
+    return consulta
+
+
+def resumo_do_periodo(modelo, periodo=None):
+    tabela = modelo.__table__
+    if periodo is None:
+        return tabela
+
+    consulta = CONSULTAS_PERIODO[modelo]
+    consulta = consulta.with_only_columns(
+        *(
+            coluna.label(nome)
+            for coluna, nome in zip(consulta.selected_columns, tabela.columns.keys())
+        )
+    )
+    return no_periodo(consulta, periodo).subquery(tabela.name)
+
+
+def registrar_versao(connection, tabela):
+    connection.execute(delete(VersaoResumo).where(VersaoResumo.tabela == tabela))
+    connection.execute(
+        insert(VersaoResumo).values(tabela=tabela, atualizado_em=datetime.now())
+    )
+
+
+def atualizar_resumos(bind=engine, tabelas_alteradas=None):
+    with bind.begin() as connection:
+        for modelo, consulta, origens in RESUMOS:
+            if tabelas_alteradas is not None and not origens & set(tabelas_alteradas):
+                continue
+
+            inicio = time.perf_counter()
+            tabela = modelo.__table__
+            connection.execute(delete(tabela))
+            connection.execute(
+                insert(tabela).from_select([c.name for c in tabela.columns], consulta)
+            )
+            registrar_versao(connection, tabela.name)
+            logger.info(
+                f"{tabela.name}: atualizado em {time.perf_counter() - inicio:.2f}s"
+            )
+
+        # As tabelas de origem também têm versão: os gráficos exibem os nomes
+        # das dimensões, que mudam sem alterar os resumos (ver services/graficos.py)
+        for tabela in sorted(tabelas_alteradas or ()):
+            registrar_versao(connection, tabela)
+
+
+def resumos_desatualizados(bind=engine) -> bool:
+    with bind.connect() as connection:
+        return connection.execute(
+            select(
+                exists(select(Transferencia.id))
+                & ~exists(select(ResumoUnidadeGestora.unidade_gestora_codigo))
+            )
+        ).scalar()
+
+
+if __name__ == "__main__":
+    atualizar_resumos()
@@ -0,0 +1,44 @@
+import os
+from decimal import ROUND_HALF_UP, Decimal
+from sqlalchemy import BigInteger, Numeric, TypeDecorator, func, type_coerce
+
+VALOR_ARMAZENAMENTO = os.getenv("VALOR_ARMAZENAMENTO", "numeric")
+
+ARMAZENAMENTOS = ["numeric", "centavos"]
+
+if VALOR_ARMAZENAMENTO not in ARMAZENAMENTOS:
+    raise ValueError(
+        f"VALOR_ARMAZENAMENTO inválido: {VALOR_ARMAZENAMENTO} "
+        f"(use {' ou '.join(ARMAZENAMENTOS)})"
+    )
+
+
+class Centavos(TypeDecorator):
+    # Valor em reais guardado como inteiro de centavos: somas e médias no banco
+    # usam aritmética inteira, e a conversão para reais fica na leitura
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        reais = Decimal(str(value))
+        return int((reais * 100).to_integral_value(ROUND_HALF_UP))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return Decimal(value).scaleb(-2)
+
+
+def tipo_valor():
+    if VALOR_ARMAZENAMENTO == "centavos":
+        return Centavos()
+    return Numeric(18, 2)
+
+
+def media(coluna):
+    # avg não herda o tipo da coluna: a média é arredondada ao centavo no banco
+    # e lida como a própria coluna (em reais, nos dois armazenamentos)
+    casas = 0 if isinstance(coluna.type, Centavos) else 2
+    return type_coerce(func.round(func.avg(coluna), casas), coluna.type)
@@ -1,9 +1,101 @@
+import os
 import re
+import argparse
 import unicodedata
-from decimal import Decimal
 
 import chardet
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+ARQUIVO_ENTRADA = os.path.join(current_dir, "raw_dataset_transferencias.csv")
+TAMANHO_LOTE = 100000
+# Cada competência reserva um bloco de ids (AAAAMM seguido de 7 dígitos): a
+# extração de cada mês numera do 1, e recarregar um mês mantém os mesmos ids
+ID_POR_COMPETENCIA = 10**7
+# O menor bloco (ano 0001) começa em 101 * 10**7: ids abaixo deste limite nunca
+# são gerados pela limpeza e ficam para as transferências criadas pela API
+LIMITE_IDS_API = 100 * ID_POR_COMPETENCIA
+
+DIMENSOES = {
+    "municipios_clean": (
+        ["codigo_municipio_siafi", "nome_municipio", "uf"],
+        "codigo_municipio_siafi",
+    ),
+    "unidades_gestoras_clean": (
+        ["codigo_unidade_gestora", "nome_unidade_gestora", "nome_orgao"],
+        "codigo_unidade_gestora",
+    ),
+    "favorecidos_clean": (
+        ["codigo_favorecido", "nome_favorecido", "codigo_municipio_siafi"],
+        "codigo_favorecido",
+    ),
+    "programas_clean": (
+        ["codigo_programa", "nome_programa"],
+        "codigo_programa",
+    ),
+}
+
+ESQUEMAS = {
+    "municipios_clean": pa.schema(
+        [
+            ("codigo_municipio_siafi", pa.int64()),
+            ("nome_municipio", pa.string()),
+            ("uf", pa.string()),
+        ]
+    ),
+    "unidades_gestoras_clean": pa.schema(
+        [
+            ("codigo_unidade_gestora", pa.int64()),
+            ("nome_unidade_gestora", pa.string()),
+            ("nome_orgao", pa.string()),
+        ]
+    ),
+    "favorecidos_clean": pa.schema(
+        [
+            ("codigo_favorecido", pa.string()),
+            ("nome_favorecido", pa.string()),
+            ("codigo_municipio_siafi", pa.int64()),
+        ]
+    ),
+    "programas_clean": pa.schema(
+        [
+            ("codigo_programa", pa.int64()),
+            ("nome_programa", pa.string()),
+        ]
+    ),
+    "transferencias_clean": pa.schema(
+        [
+            ("id", pa.int64()),
+            ("competencia", pa.date32()),
+            ("tipo", pa.string()),
+            ("valor", pa.decimal128(18, 2)),
+            ("unidade_gestora_codigo", pa.int64()),
+            ("favorecido_codigo", pa.string()),
+            ("programa_codigo", pa.int64()),
+        ]
+    ),
+    "programa_transferencia_clean": pa.schema(
+        [
+            ("transferencia_id", pa.int64()),
+            ("programa_codigo", pa.int64()),
+        ]
+    ),
+}
+
+FORMATOS = ["csv", "parquet"]
+
+columns_to_clean = [
+    "nome_unidade_gestora",
+    "nome_favorecido",
+    "nome_programa",
+    "tipo_transferencia",
+]
+
+numeric_cols = ["codigo_municipio_siafi", "codigo_unidade_gestora", "codigo_programa"]
 
 
 def to_snake_case(s):
@@ -16,95 +108,304 @@ def to_snake_case(s):
     return s
 
 
-file_path = "raw_dataset_transferencias.csv"
+def parse_valor_centavos(serie, separador=","):
+    # Percorre os textos como uma matriz de code points (uma linha por posição),
+    # validando e acumulando os dígitos de todas as células de uma vez; o outro
+    # separador (milhar) só é aceito entre grupos de três dígitos, e espaços só
+    # nas bordas
+    texto = serie.to_numpy(dtype=str)
+    largura = max(texto.dtype.itemsize // 4, 1)
+    caracteres = np.ascontiguousarray(
+        texto.view(np.uint32).reshape(len(texto), largura).T
+    )
 
-with open(file_path, "rb") as f:
-    result = chardet.detect(f.read(100000))
-encoding = result["encoding"]
+    centavos = np.zeros(len(texto), dtype=np.int64)
+    digitos = np.zeros(len(texto), dtype=np.int32)
+    casas = np.full(len(texto), -1, dtype=np.int32)
+    grupo = np.zeros(len(texto), dtype=np.int32)
+    milhar = np.zeros(len(texto), dtype=bool)
+    negativo = np.zeros(len(texto), dtype=bool)
+    fim = np.zeros(len(texto), dtype=bool)
+    valido = serie.notna().to_numpy()
 
-df = pd.read_csv(file_path, encoding=encoding, delimiter=";", dtype=str)
+    for c in caracteres:
+        digito = (c >= 48) & (c <= 57)
+        virgula = c == 44
+        ponto = c == 46
+        menos = c == 45
+        espaco = c == 32
+        decimal = c == ord(separador)
+        separador_milhar = (virgula | ponto) & ~decimal
 
-df.columns = [to_snake_case(col) for col in df.columns]
+        valido &= digito | virgula | ponto | menos | (c == 0) | espaco
+        valido &= ~((virgula | ponto) & (casas >= 0))
+        valido &= ~(menos & ((digitos > 0) | (casas >= 0) | negativo))
+        valido &= ~(fim & ~(espaco | (c == 0)))
+        valido &= ~(
+            separador_milhar & ((grupo == 0) | (grupo > 3) | (milhar & (grupo != 3)))
+        )
+        valido &= ~(decimal & milhar & (grupo != 3))
 
-if "ano__mês" in df.columns:
-    df.drop(columns=["ano__mês"], inplace=True)
+        fim |= espaco & ((digitos > 0) | (casas >= 0) | milhar)
+        negativo |= menos
+        np.add(centavos * 10, c - 48, out=centavos, where=digito, casting="unsafe")
+        digitos += digito
+        grupo += digito
+        grupo[separador_milhar] = 0
+        milhar |= separador_milhar
+        casas += digito & (casas >= 0)
+        casas[decimal] = 0
 
-df.dropna(inplace=True)
+    valido &= ~(milhar & (casas < 0) & (grupo != 3))
 
-columns_to_clean = [
-    "nome_unidade_gestora",
-    "nome_favorecido",
-    "nome_programa",
-    "tipo_transferencia",
-]
-for col in columns_to_clean:
-    if col in df.columns:
-        df[col] = df[col].replace('"', "", regex=False)
+    # Até 16 dígitos inteiros e 2 casas, como NUMERIC(18,2): os centavos cabem
+    # em int64 e a escala para centavos abaixo não transborda
+    inteiros = digitos - np.clip(casas, 0, None)
+    valido &= (digitos > 0) & (inteiros <= 16) & (casas <= 2)
+    centavos[~valido] = 0
+    centavos *= 10 ** (2 - np.clip(casas, 0, 2))
+    np.negative(centavos, out=centavos, where=negativo)
 
+    return pd.Series(pd.arrays.IntegerArray(centavos, ~valido), index=serie.index)
 
-def to_decimal(val):
-    if pd.isna(val):
-        return None
-    val = val.replace(".", "").replace(",", ".")
-    try:
-        return Decimal(val)
-    except RuntimeError:
-        return None
 
+def centavos_para_decimal(serie):
+    # decimal128 guarda o valor sem escala em 16 bytes little-endian:
+    # os centavos na palavra baixa e a extensão de sinal na alta
+    centavos = serie.to_numpy(dtype=np.int64, na_value=0)
+    buffer = np.empty((len(centavos), 2), dtype=np.int64)
+    buffer[:, 0] = centavos
+    buffer[:, 1] = centavos >> 63
+    validade = pa.array(serie, type=pa.int64()).buffers()[0]
+
+    return pa.Array.from_buffers(
+        pa.decimal128(18, 2), len(centavos), [validade, pa.py_buffer(buffer)]
+    )
 
-if "valor_transferido" in df.columns:
-    df["valor_transferido"] = df["valor_transferido"].apply(to_decimal)
 
-numeric_cols = ["codigo_municipio_siafi", "codigo_unidade_gestora", "codigo_programa"]
-for col in numeric_cols:
-    if col in df.columns:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-
-df_municipios = df[["codigo_municipio_siafi", "nome_municipio", "uf"]].drop_duplicates()
-df_unidades = df[
-    ["codigo_unidade_gestora", "nome_unidade_gestora", "nome_orgao"]
-].drop_duplicates()
-df_favorecidos = df[
-    ["codigo_favorecido", "nome_favorecido", "codigo_municipio_siafi"]
-].drop_duplicates()
-df_programas = df[["codigo_programa", "nome_programa"]].drop_duplicates()
-
-df_transferencias = df.copy()
-df_transferencias.reset_index(drop=True, inplace=True)
-df_transferencias["id"] = df_transferencias.index + 1
-
-df_transferencias = df_transferencias[
-    [
-        "id",
-        "tipo_transferencia",
-        "valor_transferido",
-        "codigo_unidade_gestora",
-        "codigo_favorecido",
-        "codigo_programa",
+def centavos_para_texto(serie):
+    # Reais com duas casas montados a partir dos centavos, sem passar por float
+    centavos = serie.astype("Int64")
+    absolutos = centavos.abs()
+    texto = (
+        centavos.lt(0).map({True: "-", False: ""})
+        + (absolutos // 100).astype(str)
+        + "."
+        + (absolutos % 100).astype(str).str.zfill(2)
+    )
+    return texto.where(centavos.notna())
+
+
+def parse_competencia(serie):
+    # Aceita AAAAMM, AAAA/MM, AAAA-MM e MM/AAAA; o resultado é o primeiro dia do mês
+    texto = serie.str.strip()
+    partes = texto.str.extract(r"^(?P<ano>\d{4})[/-]?(?P<mes>\d{2})$")
+    invertidas = texto.str.extract(r"^(?P<mes>\d{2})[/-](?P<ano>\d{4})$")
+    partes = partes.fillna(invertidas)
+
+    return pd.to_datetime(
+        partes["ano"] + "-" + partes["mes"] + "-01", format="%Y-%m-%d", errors="coerce"
+    )
+
+
+def id_competencia(competencia, sequencia):
+    return (competencia.year * 100 + competencia.month) * ID_POR_COMPETENCIA + sequencia
+
+
+def detectar_encoding(caminho):
+    with open(caminho, "rb") as f:
+        result = chardet.detect(f.read(100000))
+    return result["encoding"]
+
+
+def normalizar_lote(df, relatorio):
+    df.columns = [to_snake_case(col) for col in df.columns]
+
+    linhas = len(df)
+    df = df.dropna().copy()
+    relatorio["linhas_incompletas"] += linhas - len(df)
+
+    if "ano__mes" in df.columns:
+        df["competencia"] = parse_competencia(df.pop("ano__mes"))
+        rejeitadas = df["competencia"].isna()
+        relatorio["competencias_rejeitadas"] += int(rejeitadas.sum())
+        df = df[~rejeitadas].copy()
+
+    for col in columns_to_clean:
+        if col in df.columns:
+            df[col] = df[col].str.replace('"', "", regex=False)
+
+    if "valor_transferido" in df.columns:
+        df["valor_transferido"] = parse_valor_centavos(df["valor_transferido"])
+        rejeitados = df["valor_transferido"].isna()
+        relatorio["valores_rejeitados"] += int(rejeitados.sum())
+        df = df[~rejeitados].copy()
+
+    for col in numeric_cols:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
+
+    return df
+
+
+def separar_transferencias(df, sequencias):
+    df_transferencias = df[
+        [
+            "competencia",
+            "tipo_transferencia",
+            "valor_transferido",
+            "codigo_unidade_gestora",
+            "codigo_favorecido",
+            "codigo_programa",
+        ]
+    ].rename(
+        columns={
+            "tipo_transferencia": "tipo",
+            "valor_transferido": "valor",
+            "codigo_unidade_gestora": "unidade_gestora_codigo",
+            "codigo_favorecido": "favorecido_codigo",
+            "codigo_programa": "programa_codigo",
+        }
+    )
+
+    # Numeração contínua dentro de cada competência, entre lotes
+    competencias = df_transferencias["competencia"]
+    chaves = (competencias.dt.year * 100 + competencias.dt.month).astype("int64")
+    sequencia = df_transferencias.groupby(chaves).cumcount() + 1
+    sequencia += chaves.map(sequencias).fillna(0).astype("int64")
+    df_transferencias.insert(0, "id", chaves * ID_POR_COMPETENCIA + sequencia)
+    for chave, quantidade in chaves.value_counts().items():
+        sequencias[chave] = sequencias.get(chave, 0) + quantidade
+
+    df_programa_transferencia = df_transferencias[["id", "programa_codigo"]].rename(
+        columns={"id": "transferencia_id"}
+    )
+
+    return df_transferencias, df_programa_transferencia
+
+
+def anexar_csv(df, caminho):
+    escrever_cabecalho = not os.path.exists(caminho)
+    df.to_csv(
+        caminho,
+        mode="a",
+        header=escrever_cabecalho,
+        index=False,
+        encoding="utf-8",
+    )
+
+
+def anexar_parquet(df, nome, caminho, escritores):
+    esquema = ESQUEMAS[nome]
+    colunas = [
+        (
+            centavos_para_decimal(df[campo.name])
+            if pa.types.is_decimal(campo.type)
+            else pa.array(df[campo.name], type=campo.type, from_pandas=True)
+        )
+        for campo in esquema
     ]
-]
 
-df_transferencias.rename(
-    columns={
-        "tipo_transferencia": "tipo",
-        "valor_transferido": "valor",
-        "codigo_unidade_gestora": "unidade_gestora_codigo",
-        "codigo_favorecido": "favorecido_codigo",
-        "codigo_programa": "programa_codigo",
-    },
-    inplace=True,
-)
-
-df_programa_transferencia = df_transferencias[["id", "programa_codigo"]].copy()
-df_programa_transferencia.rename(columns={"id": "transferencia_id"}, inplace=True)
-
-df_municipios.to_csv("municipios_clean.csv", index=False, encoding="utf-8")
-df_unidades.to_csv("unidades_gestoras_clean.csv", index=False, encoding="utf-8")
-df_favorecidos.to_csv("favorecidos_clean.csv", index=False, encoding="utf-8")
-df_programas.to_csv("programas_clean.csv", index=False, encoding="utf-8")
-df_transferencias.to_csv("transferencias_clean.csv", index=False, encoding="utf-8")
-df_programa_transferencia.to_csv(
-    "programa_transferencia_clean.csv", index=False, encoding="utf-8"
-)
-
-print("Dataset tratado, limpo e preparado com sucesso!")
+    if nome not in escritores:
+        escritores[nome] = pq.ParquetWriter(caminho, esquema, compression="zstd")
+    escritores[nome].write_table(pa.Table.from_arrays(colunas, schema=esquema))
+
+
+def anexar(df, nome, destino, formato, escritores):
+    caminho = os.path.join(destino, f"{nome}.{formato}")
+
+    if formato == "parquet":
+        anexar_parquet(df, nome, caminho, escritores)
+        return
+
+    if "valor" in df.columns:
+        df = df.assign(valor=centavos_para_texto(df["valor"]))
+    anexar_csv(df, caminho)
+
+
+def limpar_dataset(
+    caminho=ARQUIVO_ENTRADA,
+    destino=current_dir,
+    tamanho_lote=TAMANHO_LOTE,
+    formato="csv",
+):
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de saída inválido: {formato}")
+
+    for nome in ESQUEMAS:
+        if os.path.exists(os.path.join(destino, f"{nome}.{formato}")):
+            os.remove(os.path.join(destino, f"{nome}.{formato}"))
+
+    escritores = {}
+    chaves_vistas = {nome: set() for nome in DIMENSOES}
+    relatorio = {
+        "transferencias": 0,
+        "linhas_incompletas": 0,
+        "valores_rejeitados": 0,
+        "competencias_rejeitadas": 0,
+    }
+    sequencias = {}
+
+    lotes = pd.read_csv(
+        caminho,
+        encoding=detectar_encoding(caminho),
+        delimiter=";",
+        dtype=str,
+        chunksize=tamanho_lote,
+    )
+
+    try:
+        for lote in lotes:
+            df = normalizar_lote(lote, relatorio)
+
+            for nome, (colunas, chave) in DIMENSOES.items():
+                df_dimensao = df[colunas].drop_duplicates(subset=chave)
+                df_dimensao = df_dimensao[~df_dimensao[chave].isin(chaves_vistas[nome])]
+                chaves_vistas[nome].update(df_dimensao[chave])
+                anexar(df_dimensao, nome, destino, formato, escritores)
+
+            df_transferencias, df_programa_transferencia = separar_transferencias(
+                df, sequencias
+            )
+
+            anexar(
+                df_transferencias,
+                "transferencias_clean",
+                destino,
+                formato,
+                escritores,
+            )
+            anexar(
+                df_programa_transferencia,
+                "programa_transferencia_clean",
+                destino,
+                formato,
+                escritores,
+            )
+    finally:
+        for escritor in escritores.values():
+            escritor.close()
+
+    relatorio["transferencias"] = sum(sequencias.values())
+    relatorio["competencias"] = sorted(sequencias)
+    return relatorio
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Limpa o dataset de transferências")
+    parser.add_argument("entrada", nargs="?", default=ARQUIVO_ENTRADA)
+    parser.add_argument("--destino", default=current_dir)
+    parser.add_argument("--tamanho-lote", type=int, default=TAMANHO_LOTE)
+    parser.add_argument("--formato", choices=FORMATOS, default="csv")
+    args = parser.parse_args()
+
+    relatorio = limpar_dataset(
+        args.entrada, args.destino, args.tamanho_lote, args.formato
+    )
+
+    print(f"Transferências geradas: {relatorio['transferencias']}")
+    print(f"Linhas incompletas descartadas: {relatorio['linhas_incompletas']}")
+    print(f"Valores inválidos rejeitados: {relatorio['valores_rejeitados']}")
+    print(f"Competências inválidas rejeitadas: {relatorio['competencias_rejeitadas']}")
+    print(f"Competências: {', '.join(map(str, relatorio['competencias']))}")
+    print("Dataset tratado, limpo e preparado com sucesso!")
@@ -1,50 +1,101 @@
-import sys
+import os
+import time
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from sqlmodel import SQLModel
 from .routes.programa import router as programa_router
 from .routes.transferencia import router as transferencia_router
 from .routes.unidade_gestora import router as unidade_gestora_router
 from .routes.municipio import router as municipio_router
 from .routes.analises import router as analises_router
 from .routes.favorecido import router as favorecido_router
+from .routes.metricas import prometheus_router, router as metricas_router
 from loguru import logger
-from .database.infra import engine
+from .database.infra import async_engine, engine, replicas
+from .database.migrations import adicionar_colunas, ajustar_tipos_valor, criar_indices
+from .database.particoes import criar_tabelas, preparar_particoes
+from .database.resumos import atualizar_resumos, resumos_desatualizados
+from .services.atualizacao import atualizador
+from .services.graficos import encerrar_graficos, pre_renderizar_graficos
+from .services.metricas import medir_banco, metricas
+from .services.registro import configurar_registro, deve_registrar
 
-LOGGER_FORMAT = (
-    "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | "
-    "<level>{level: <8}</level> | "
-    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> | "
-    "<level>{message} - Additional information: {extra}</level>"
-)
-
-logger.remove()
-logger.add(sys.stderr, format=LOGGER_FORMAT)
-logger.add("actions.log")
+configurar_registro()
+for engine_medida in (engine, async_engine, *replicas.engines()):
+    medir_banco(engine_medida)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    SQLModel.metadata.create_all(engine)
+    criar_tabelas(engine)
+    preparar_particoes(engine)
+    adicionar_colunas(engine)
+    ajustar_tipos_valor(engine)
+    criar_indices(engine)
+    if resumos_desatualizados(engine):
+        atualizar_resumos(engine)
+    if os.getenv("PRE_RENDERIZAR_GRAFICOS", "false").lower() in ("1", "true"):
+        await pre_renderizar_graficos()
+    await replicas.iniciar()
     yield
+    await atualizador.aguardar()
+    await replicas.encerrar()
+    encerrar_graficos()
+    await async_engine.dispose()
+    await logger.complete()
 
 
 app = FastAPI(lifespan=lifespan)
 
 
+def rota_da(request: Request) -> str:
+    # O modelo da rota (ex.: /programas/{codigo}) mantém a cardinalidade baixa
+    rota = request.scope.get("route")
+    return rota.path if rota is not None else "desconhecida"
+
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    inner_log = logger
-    inner_log.info(f"Receiving request: {request.method} {request.url}")
-
-    response = None
+    inicio, banco = metricas.iniciar()
+    contexto = {
+        "metodo": request.method,
+        "caminho": request.url.path,
+        "consulta": request.url.query,
+    }
 
     try:
         response = await call_next(request)
-        inner_log.info(f"Response: {response.status_code}")
-    except Exception as error:
-        inner_log.error(f"Response: 500")
-        raise error
+    except Exception:
+        metricas.concluir(inicio, request.method, rota_da(request), 500, None, banco)
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        logger.bind(**contexto, status=500, duracao_ms=duracao_ms).opt(
+            exception=True
+        ).error(f"{request.method} {request.url.path} 500 {duracao_ms:.1f} ms")
+        raise
+
+    tamanho = response.headers.get("content-length")
+    metricas.concluir(
+        inicio, request.method, rota_da(request), response.status_code, tamanho, banco
+    )
+
+    if deve_registrar(response.status_code):
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        nivel = (
+            "ERROR"
+            if response.status_code >= 500
+            else "WARNING" if response.status_code >= 400 else "INFO"
+        )
+        logger.bind(
+            **contexto,
+            status=response.status_code,
+            duracao_ms=duracao_ms,
+            banco_ms=banco[0] * 1000,
+            consultas=banco[1],
+            tamanho=tamanho,
+        ).log(
+            nivel,
+            f"{request.method} {request.url.path} {response.status_code} "
+            f"{duracao_ms:.1f} ms",
+        )
 
     return response
 
@@ -55,3 +106,5 @@ app.include_router(unidade_gestora_router)
 app.include_router(favorecido_router)
 app.include_router(municipio_router)
 app.include_router(analises_router)
+app.include_router(metricas_router)
+app.include_router(prometheus_router)
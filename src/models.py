@@ -1,12 +1,15 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import BigInteger, Integer
 from typing import Optional, List
 from decimal import Decimal
+from datetime import date, datetime
+from .database.tipos import tipo_valor
 
 
 class Municipio(SQLModel, table=True):
     codigo: int = Field(primary_key=True)
     nome: str
-    uf: str
+    uf: str = Field(index=True)
     favorecidos: List["Favorecido"] = Relationship(
         back_populates="municipio", cascade_delete=True
     )
@@ -24,7 +27,9 @@ class UnidadeGestora(SQLModel, table=True):
 class Favorecido(SQLModel, table=True):
     codigo: str = Field(primary_key=True)
     nome: str
-    municipio_codigo: int = Field(foreign_key="municipio.codigo", ondelete="CASCADE")
+    municipio_codigo: int = Field(
+        foreign_key="municipio.codigo", ondelete="CASCADE", index=True
+    )
     municipio: Municipio = Relationship(back_populates="favorecidos")
     transferencias: List["Transferencia"] = Relationship(
         back_populates="favorecido", cascade_delete=True
@@ -33,10 +38,13 @@ class Favorecido(SQLModel, table=True):
 
 class ProgramaTransferencia(SQLModel, table=True):
     transferencia_id: int = Field(
-        foreign_key="transferencia.id", primary_key=True, ondelete="CASCADE"
+        foreign_key="transferencia.id",
+        primary_key=True,
+        ondelete="CASCADE",
+        sa_type=BigInteger,
     )
     programa_codigo: int = Field(
-        foreign_key="programa.codigo", primary_key=True, ondelete="CASCADE"
+        foreign_key="programa.codigo", primary_key=True, ondelete="CASCADE", index=True
     )
 
 
@@ -49,15 +57,78 @@ class Programa(SQLModel, table=True):
 
 
 class Transferencia(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
+    # No Postgres a tabela é particionada por mês de competência
+    # (ver database/particoes.py)
+    __table_args__ = {"info": {"particionar_por": "competencia"}}
+
+    # No SQLite só INTEGER PRIMARY KEY gera ids (e já tem 64 bits)
+    id: Optional[int] = Field(
+        default=None,
+        primary_key=True,
+        sa_type=BigInteger().with_variant(Integer, "sqlite"),
+    )
+    competencia: date = Field(index=True)
     tipo: str
-    valor: Decimal
+    valor: Decimal = Field(sa_type=tipo_valor(), max_digits=18, decimal_places=2)
     unidade_gestora_codigo: int = Field(
-        foreign_key="unidadegestora.codigo", ondelete="CASCADE"
+        foreign_key="unidadegestora.codigo", ondelete="CASCADE", index=True
+    )
+    favorecido_codigo: str = Field(
+        foreign_key="favorecido.codigo", ondelete="CASCADE", index=True
     )
-    favorecido_codigo: str = Field(foreign_key="favorecido.codigo", ondelete="CASCADE")
     unidade_gestora: UnidadeGestora = Relationship(back_populates="transferencias")
     favorecido: Favorecido = Relationship(back_populates="transferencias")
     programas: List[Programa] = Relationship(
         back_populates="transferencias", link_model=ProgramaTransferencia
     )
+
+
+# Uma chave estrangeira para a tabela particionada teria de incluir a
+# competência; no Postgres os vínculos das transferências excluídas em cascata
+# são apagados pelas rotas de exclusão (ver services/exclusao.py)
+for restricao in ProgramaTransferencia.__table__.foreign_key_constraints:
+    if restricao.referred_table is Transferencia.__table__:
+        restricao.ddl_if(dialect="sqlite")
+
+
+class CargaArquivo(SQLModel, table=True):
+    arquivo: str = Field(primary_key=True)
+    hash: str
+    carregado_em: datetime
+
+
+class CargaLinha(SQLModel, table=True):
+    tabela: str = Field(primary_key=True)
+    chave: str = Field(primary_key=True)
+    hash: int = Field(sa_type=BigInteger)
+    # Id gravado, quando a chave vem das colunas de origem (transferências)
+    registro: Optional[int] = Field(default=None, sa_type=BigInteger)
+
+
+class ResumoEstado(SQLModel, table=True):
+    uf: str = Field(primary_key=True)
+    total_transferencias: int
+    valor_total: Decimal = Field(sa_type=tipo_valor())
+
+
+class ResumoUnidadeGestora(SQLModel, table=True):
+    unidade_gestora_codigo: int = Field(primary_key=True)
+    total_transferencias: int
+    valor_total: Decimal = Field(sa_type=tipo_valor())
+
+
+class ResumoPrograma(SQLModel, table=True):
+    programa_codigo: int = Field(primary_key=True)
+    total_transferencias: int
+    total_favorecidos: int
+
+
+class ResumoMunicipio(SQLModel, table=True):
+    municipio_codigo: int = Field(primary_key=True)
+    numero_de_favorecidos: int
+
+
+# Última atualização de cada resumo e de cada tabela de origem alterada
+class VersaoResumo(SQLModel, table=True):
+    tabela: str = Field(primary_key=True)
+    atualizado_em: datetime
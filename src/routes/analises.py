@@ -1,24 +1,38 @@
-import io
-import matplotlib
-import matplotlib.pyplot as plt
-import seaborn as sns
-from fastapi import APIRouter, HTTPException, Depends, Response
-from sqlmodel import Session, select, func
-from typing import List, Dict
-from src.database.infra import get_session
-from src.models import Favorecido, UnidadeGestora, Transferencia, Programa
-from ..services.analises import total_transferencias_por_estado
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Dict, Literal
+from src.database.infra import get_async_session
+from ..services.analises import (
+    Periodo,
+    favorecidos_por_programa,
+    ler_periodo,
+    programas_mais_frequentes,
+    total_transferencias_por_estado,
+    total_transferencias_por_unidade_gestora,
+)
+from ..services.cache import em_cache
+from ..services.desenho import FORMATOS
+from ..services.graficos import (
+    GRAFICOS,
+    etag_corresponde,
+    etag_grafico,
+    obter_grafico,
+)
 
 router = APIRouter(prefix="/analises", tags=["Análises"])
-matplotlib.use("Agg")
+
+# Além dos resumos ("analises") e das transferências (consultas com período),
+# cada rota depende das entidades cujos nomes e códigos ela lista
 
 
 @router.get("/total-transferencias-por-estado")
-def get_total_transferencias_por_estado(
-    session: Session = Depends(get_session),
+@em_cache("analises", "transferencia", "favorecido", "municipio")
+async def get_total_transferencias_por_estado(
+    session: AsyncSession = Depends(get_async_session),
+    periodo: Periodo = Depends(ler_periodo),
 ) -> List[Dict]:
     try:
-        return total_transferencias_por_estado(session)
+        return await total_transferencias_por_estado(session, periodo=periodo)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -26,66 +40,54 @@ def get_total_transferencias_por_estado(
         )
 
 
-@router.get("/grafico-transferencias-por-estado")
-def grafico_transferencias_por_estado(session: Session = Depends(get_session)):
-    dados = total_transferencias_por_estado(session, 10)
-
-    estados = [d["uf"] for d in dados]
-    totais = [d["total_transferencias"] for d in dados]
-    colors = sns.color_palette("Set3", 10)
-    colors = [color for color in colors]
-
-    plt.figure(figsize=(10, 8))
-    plt.pie(
-        totais,
-        labels=estados,
-        autopct="%1.1f%%",
-        startangle=140,
-        colors=colors,
-        wedgeprops={"edgecolor": "black"},
+async def responder_grafico(
+    request: Request, session: AsyncSession, nome: str, formato: str
+):
+    if nome not in GRAFICOS:
+        raise HTTPException(status_code=404, detail="Gráfico não encontrado")
+
+    etag = await etag_grafico(session, nome, formato)
+    cabecalhos = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if etag_corresponde(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cabecalhos)
+
+    return Response(
+        await obter_grafico(session, nome, formato, etag),
+        media_type=FORMATOS[formato],
+        headers=cabecalhos,
     )
 
-    plt.title(
-        "Distribuição de Transferências pelos 10 Estado Mais Representativos",
-        fontsize=14,
-        fontweight="bold",
-        pad=20,
+
+@router.get("/grafico-transferencias-por-estado")
+async def grafico_transferencias_por_estado(
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
+    formato: Literal["png", "svg"] = Query("png"),
+):
+    return await responder_grafico(
+        request, session, "transferencias-por-estado", formato
     )
-    plt.axis("equal")
 
-    img_io = io.BytesIO()
-    plt.savefig(img_io, format="png", bbox_inches="tight", dpi=100)
-    plt.close()
 
-    img_io.seek(0)
-    return Response(img_io.getvalue(), media_type="image/png")
+@router.get("/graficos/{nome}")
+async def get_grafico(
+    nome: str,
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
+    formato: Literal["png", "svg"] = Query("png"),
+):
+    return await responder_grafico(request, session, nome, formato)
 
 
 @router.get("/favorecidos-por-programa")
-def get_favorecidos_por_programa(session: Session = Depends(get_session)) -> List[Dict]:
+@em_cache("analises", "transferencia", "programa")
+async def get_favorecidos_por_programa(
+    session: AsyncSession = Depends(get_async_session),
+    periodo: Periodo = Depends(ler_periodo),
+) -> List[Dict]:
     try:
-        result = session.exec(
-            select(
-                Programa.codigo,
-                Programa.nome,
-                (
-                    select(func.count(Favorecido.codigo)).where(
-                        Favorecido.codigo == Transferencia.favorecido_codigo
-                    )
-                )
-                .scalar_subquery()
-                .label("total_favorecidos"),
-            )
-        ).all()
-
-        return [
-            {
-                "codigo_programa": codigo,
-                "nome": nome,
-                "total_favorecidos": total_favorecidos or 0,
-            }
-            for codigo, nome, total_favorecidos in result
-        ]
+        return await favorecidos_por_programa(session, periodo=periodo)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -94,42 +96,13 @@ def get_favorecidos_por_programa(session: Session = Depends(get_session)) -> Lis
 
 
 @router.get("/total-transferencias-por-unidade-gestora")
-def get_total_transferencias_por_unidade_gestora(
-    session: Session = Depends(get_session),
+@em_cache("analises", "transferencia", "unidade_gestora")
+async def get_total_transferencias_por_unidade_gestora(
+    session: AsyncSession = Depends(get_async_session),
+    periodo: Periodo = Depends(ler_periodo),
 ) -> List[Dict]:
     try:
-        result = session.exec(
-            select(
-                UnidadeGestora.codigo,
-                UnidadeGestora.nome,
-                UnidadeGestora.orgao_nome,
-                (
-                    select(func.count()).where(
-                        Transferencia.unidade_gestora_codigo == UnidadeGestora.codigo
-                    )
-                )
-                .scalar_subquery()
-                .label("total_transferencias"),
-                (
-                    select(func.sum(Transferencia.valor)).where(
-                        Transferencia.unidade_gestora_codigo == UnidadeGestora.codigo
-                    )
-                )
-                .scalar_subquery()
-                .label("valor_total"),
-            )
-        ).all()
-
-        return [
-            {
-                "codigo_unidade_gestora": codigo,
-                "nome": nome,
-                "orgao_nome": orgao_nome,
-                "total_transferencias": total_transferencias or 0,
-                "valor_total": valor_total or 0,
-            }
-            for codigo, nome, orgao_nome, total_transferencias, valor_total in result
-        ]
+        return await total_transferencias_por_unidade_gestora(session, periodo=periodo)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -138,32 +111,13 @@ def get_total_transferencias_por_unidade_gestora(
 
 
 @router.get("/programas-mais-frequentes")
-def get_programas_mais_frequentes(
-    session: Session = Depends(get_session),
+@em_cache("analises", "transferencia", "programa")
+async def get_programas_mais_frequentes(
+    session: AsyncSession = Depends(get_async_session),
+    periodo: Periodo = Depends(ler_periodo),
 ) -> List[Dict]:
     try:
-        result = session.exec(
-            select(
-                Programa.codigo,
-                Programa.nome,
-                (
-                    select(func.count()).where(
-                        Transferencia.programas.any(Programa.codigo == Programa.codigo)
-                    )
-                )
-                .scalar_subquery()
-                .label("total_transferencias"),
-            )
-        ).all()
-
-        return [
-            {
-                "codigo_programa": codigo,
-                "nome": nome,
-                "total_transferencias": total_transferencias or 0,
-            }
-            for codigo, nome, total_transferencias in result
-        ]
+        return await programas_mais_frequentes(session, periodo=periodo)
     except Exception as e:
         raise HTTPException(
             status_code=500,
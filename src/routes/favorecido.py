@@ -1,72 +1,130 @@
-from typing import Optional, Dict, Any
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlmodel import Session, select, func
+from typing import Any, Dict, List, Optional, Literal
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from src.models import Favorecido
-from src.database.infra import get_session
+from src.schemas import FavorecidoLeitura
+from src.database.infra import get_async_session
+from ..services.busca import buscar_por_nome, ordem_relevancia
+from ..services.atualizacao import atualiza_resumos
+from ..services.cache import em_cache, invalida_cache
+from ..services.exclusao import remover_vinculos_favorecido
+from ..services.expansao import expandir, ler_expansao, opcoes_expansao
+from ..services.lote import gravar_lote, ler_lote
+from ..services.paginacao import contar, ler_contagem, ler_cursor, paginar
 
 router = APIRouter(prefix="/favorecidos", tags=["Favorecidos"])
 
 
 @router.post("/", response_model=Favorecido)
-def create_favorecido(favorecido: Favorecido, session: Session = Depends(get_session)):
+@invalida_cache("favorecido")
+@atualiza_resumos("favorecido")
+async def create_favorecido(
+    favorecido: Favorecido, session: AsyncSession = Depends(get_async_session)
+):
     try:
         session.add(favorecido)
-        session.commit()
-        session.refresh(favorecido)
+        await session.commit()
+        await session.refresh(favorecido)
 
         return favorecido
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=500, detail=f"Erro ao criar favorecido: {str(e)}"
         )
 
 
+@router.post("/batch", response_model=Dict[str, Any])
+@invalida_cache("favorecido")
+@atualiza_resumos("favorecido", aguardar=True)
+async def create_favorecido_batch(
+    request: Request,
+    modo: Literal["upsert", "inserir"] = Query("upsert"),
+    session: AsyncSession = Depends(get_async_session),
+) -> Dict[str, Any]:
+    itens = await ler_lote(request)
+    try:
+        return await gravar_lote(session, Favorecido, itens, modo)
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(
+            status_code=500, detail=f"Erro ao gravar favorecidos: {str(e)}"
+        )
+
+
 @router.get("/", response_model=Dict[str, Any])
-def read_favorecidos(
-    session: Session = Depends(get_session),
+@em_cache("favorecido")
+async def read_favorecidos(
+    session: AsyncSession = Depends(get_async_session),
     skip: int = Query(0, alias="offset", ge=0),
     limit: int = Query(10, le=100),
-    codigo: Optional[int] = Query(None),
+    codigo: Optional[str] = Query(None),
     nome: Optional[str] = Query(None),
     municipio: Optional[int] = Query(None),
+    q: Optional[str] = Query(None, min_length=2),
+    cursor: Optional[List[Any]] = Depends(ler_cursor),
+    contagem: Optional[str] = Depends(ler_contagem),
 ) -> Dict[str, Any]:
     try:
         query = select(Favorecido)
+        ordem = [Favorecido.codigo]
 
         if codigo is not None:
             query = query.where(Favorecido.codigo == codigo)
         if nome is not None:
             query = query.where(Favorecido.nome.contains(nome))
         if municipio is not None:
-            query = query.where(Favorecido.municipio.codigo == municipio)
-
-        total = session.exec(select(func.count()).select_from(Favorecido)).one()
-
-        favorecidos = session.exec(query.offset(skip).limit(limit)).all()
-
-        return {"data": favorecidos, "total": total, "offset": skip, "limit": limit}
+            query = query.where(Favorecido.municipio_codigo == municipio)
+        if q is not None:
+            query = await buscar_por_nome(session, query, Favorecido.nome, q)
+            ordem = await ordem_relevancia(session, Favorecido.nome, q) + ordem
+
+        total = await contar(session, query, contagem)
+
+        favorecidos, proximo = await paginar(session, query, ordem, skip, limit, cursor)
+
+        return {
+            "data": favorecidos,
+            "total": total,
+            "offset": skip,
+            "limit": limit,
+            "next_cursor": proximo,
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Erro ao buscar favorecidos: {str(e)}"
         )
 
 
-@router.get("/{codigo}", response_model=Favorecido)
-def read_favorecido(codigo: int, session: Session = Depends(get_session)):
-    favorecido = session.get(Favorecido, codigo)
-
+@router.get(
+    "/{codigo}", response_model=FavorecidoLeitura, response_model_exclude_unset=True
+)
+@em_cache("favorecido", "municipio")
+async def read_favorecido(
+    codigo: str,
+    expand: Dict[str, Any] = Depends(ler_expansao("municipio")),
+    session: AsyncSession = Depends(get_async_session),
+):
+    favorecido = await session.get(
+        Favorecido, codigo, options=opcoes_expansao(Favorecido, expand)
+    )
     if not favorecido:
         raise HTTPException(status_code=404, detail="Favorecido não encontrado")
-
-    return favorecido
+    return expandir(favorecido, expand)
 
 
 @router.put("/{codigo}", response_model=Favorecido)
-def update_favorecido(
-    codigo: int, favorecido_update: Favorecido, session: Session = Depends(get_session)
+@invalida_cache("favorecido")
+@atualiza_resumos("favorecido")
+async def update_favorecido(
+    codigo: str,
+    favorecido_update: Favorecido,
+    session: AsyncSession = Depends(get_async_session),
 ):
-    favorecido = session.get(Favorecido, codigo)
+    favorecido = await session.get(Favorecido, codigo)
 
     if not favorecido:
         raise HTTPException(status_code=404, detail="Favorecido não encontrado")
@@ -75,34 +133,39 @@ def update_favorecido(
         update_data = favorecido_update.model_dump(exclude_unset=True)
 
         for key, value in update_data.items():
-            setattr(Favorecido, key, value)
+            setattr(favorecido, key, value)
 
         session.add(favorecido)
-        session.commit()
-        session.refresh(favorecido)
+        await session.commit()
+        await session.refresh(favorecido)
 
         return favorecido
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=500, detail=f"Erro ao atualizar favorecido: {str(e)}"
         )
 
 
 @router.delete("/{codigo}", response_model=Favorecido)
-def delete_favorecido(codigo: int, session: Session = Depends(get_session)):
-    favorecido = session.get(Favorecido, codigo)
+@invalida_cache("favorecido", "transferencia")
+@atualiza_resumos("favorecido", "transferencia")
+async def delete_favorecido(
+    codigo: str, session: AsyncSession = Depends(get_async_session)
+):
+    favorecido = await session.get(Favorecido, codigo)
 
     if not favorecido:
         raise HTTPException(status_code=404, detail="Favorecido não encontrado")
 
     try:
-        session.delete(favorecido)
-        session.commit()
+        await remover_vinculos_favorecido(session, codigo)
+        await session.delete(favorecido)
+        await session.commit()
 
         return favorecido
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=500, detail=f"Erro ao deletar favorecido: {str(e)}"
         )
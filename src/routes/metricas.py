@@ -0,0 +1,31 @@
+from typing import Any, Dict
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from ..database.infra import async_engine, engine, replicas
+from ..database.pool import metricas_pool
+from ..services.cache import cache
+from ..services.metricas import metricas
+
+router = APIRouter(prefix="/metricas", tags=["Métricas"])
+prometheus_router = APIRouter(tags=["Métricas"])
+
+
+@router.get("/cache")
+def get_metricas_cache() -> Dict[str, Any]:
+    return cache.estatisticas()
+
+
+@router.get("/pool")
+def get_metricas_pool() -> Dict[str, Any]:
+    return {
+        "api": metricas_pool(async_engine),
+        "sincrono": metricas_pool(engine),
+        "replicas": replicas.estatisticas(),
+    }
+
+
+@prometheus_router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics() -> PlainTextResponse:
+    return PlainTextResponse(
+        metricas.exportar(), media_type="text/plain; version=0.0.4"
+    )
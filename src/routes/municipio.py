@@ -1,67 +1,128 @@
-from typing import Optional, Dict, Any
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlmodel import Session, select, func
-from src.models import Municipio, Favorecido
-from src.database.infra import get_session
+from typing import Any, Dict, List, Optional, Literal
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.models import Municipio
+from src.schemas import MunicipioLeitura
+from src.database.infra import get_async_session
+from ..services.analises import Periodo, favorecidos_por_municipio, ler_periodo
+from ..services.busca import buscar_por_nome, ordem_relevancia
+from ..services.atualizacao import atualiza_resumos
+from ..services.cache import em_cache, invalida_cache
+from ..services.exclusao import remover_vinculos_municipio
+from ..services.expansao import expandir, ler_expansao, opcoes_expansao
+from ..services.lote import gravar_lote, ler_lote
+from ..services.paginacao import contar, ler_contagem, ler_cursor, paginar
 
 router = APIRouter(prefix="/municipios", tags=["Municípios"])
 
 
 @router.post("/", response_model=Municipio)
-def create_municipio(municipio: Municipio, session: Session = Depends(get_session)):
+@invalida_cache("municipio")
+@atualiza_resumos("municipio")
+async def create_municipio(
+    municipio: Municipio, session: AsyncSession = Depends(get_async_session)
+):
     try:
         session.add(municipio)
-        session.commit()
-        session.refresh(municipio)
+        await session.commit()
+        await session.refresh(municipio)
         return municipio
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=500, detail=f"Erro ao criar município: {str(e)}"
         )
 
 
+@router.post("/batch", response_model=Dict[str, Any])
+@invalida_cache("municipio")
+@atualiza_resumos("municipio", aguardar=True)
+async def create_municipio_batch(
+    request: Request,
+    modo: Literal["upsert", "inserir"] = Query("upsert"),
+    session: AsyncSession = Depends(get_async_session),
+) -> Dict[str, Any]:
+    itens = await ler_lote(request)
+    try:
+        return await gravar_lote(session, Municipio, itens, modo)
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(
+            status_code=500, detail=f"Erro ao gravar municípios: {str(e)}"
+        )
+
+
 @router.get("/")
-def read_municipios(
-    session: Session = Depends(get_session),
+@em_cache("municipio")
+async def read_municipios(
+    session: AsyncSession = Depends(get_async_session),
     skip: int = Query(0, alias="offset", ge=0),
     limit: int = Query(10, alias="limit", le=100),
     nome: Optional[str] = Query(None, alias="nome"),
     uf: Optional[str] = Query(None, alias="uf"),
     codigo: Optional[int] = Query(None, alias="codigo"),
+    q: Optional[str] = Query(None, min_length=2),
+    cursor: Optional[List[Any]] = Depends(ler_cursor),
+    contagem: Optional[str] = Depends(ler_contagem),
 ) -> Dict[str, Any]:
     try:
         query = select(Municipio)
+        ordem = [Municipio.codigo]
         if nome:
             query = query.where(Municipio.nome.contains(nome))
         if uf:
             query = query.where(Municipio.uf == uf)
         if codigo:
             query = query.where(Municipio.codigo == codigo)
+        if q:
+            query = await buscar_por_nome(session, query, Municipio.nome, q)
+            ordem = await ordem_relevancia(session, Municipio.nome, q) + ordem
 
-        total = session.exec(select(func.count()).select_from(Municipio)).one()
-        municipios = session.exec(query.offset(skip).limit(limit)).all()
+        total = await contar(session, query, contagem)
+        municipios, proximo = await paginar(session, query, ordem, skip, limit, cursor)
 
-        return {"data": municipios, "total": total, "offset": skip, "limit": limit}
+        return {
+            "data": municipios,
+            "total": total,
+            "offset": skip,
+            "limit": limit,
+            "next_cursor": proximo,
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Erro ao buscar municípios: {str(e)}"
         )
 
 
-@router.get("/{codigo}", response_model=Municipio)
-def read_municipio(codigo: int, session: Session = Depends(get_session)):
-    municipio = session.get(Municipio, codigo)
+@router.get(
+    "/{codigo}", response_model=MunicipioLeitura, response_model_exclude_unset=True
+)
+@em_cache("municipio", "favorecido")
+async def read_municipio(
+    codigo: int,
+    expand: Dict[str, Any] = Depends(ler_expansao("favorecidos")),
+    session: AsyncSession = Depends(get_async_session),
+):
+    municipio = await session.get(
+        Municipio, codigo, options=opcoes_expansao(Municipio, expand)
+    )
     if not municipio:
         raise HTTPException(status_code=404, detail="Município não encontrado")
-    return municipio
+    return expandir(municipio, expand)
 
 
 @router.put("/{codigo}", response_model=Municipio)
-def update_municipio(
-    codigo: int, municipio_update: Municipio, session: Session = Depends(get_session)
+@invalida_cache("municipio")
+@atualiza_resumos("municipio")
+async def update_municipio(
+    codigo: int,
+    municipio_update: Municipio,
+    session: AsyncSession = Depends(get_async_session),
 ):
-    municipio = session.get(Municipio, codigo)
+    municipio = await session.get(Municipio, codigo)
     if not municipio:
         raise HTTPException(status_code=404, detail="Município não encontrado")
     try:
@@ -69,61 +130,45 @@ def update_municipio(
         for key, value in update_data.items():
             setattr(municipio, key, value)
         session.add(municipio)
-        session.commit()
-        session.refresh(municipio)
+        await session.commit()
+        await session.refresh(municipio)
         return municipio
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=500, detail=f"Erro ao atualizar município: {str(e)}"
         )
 
 
 @router.delete("/{codigo}", response_model=Municipio)
-def delete_municipio(codigo: int, session: Session = Depends(get_session)):
-    municipio = session.get(Municipio, codigo)
+@invalida_cache("municipio", "favorecido", "transferencia")
+@atualiza_resumos("municipio", "favorecido", "transferencia")
+async def delete_municipio(
+    codigo: int, session: AsyncSession = Depends(get_async_session)
+):
+    municipio = await session.get(Municipio, codigo)
     if not municipio:
         raise HTTPException(status_code=404, detail="Município não encontrado")
     try:
-        session.delete(municipio)
-        session.commit()
+        await remover_vinculos_municipio(session, codigo)
+        await session.delete(municipio)
+        await session.commit()
         return municipio
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=500, detail=f"Erro ao deletar município: {str(e)}"
         )
 
 
 @router.get("/favorecidos/count")
-def count_favorecidos_por_municipio(
-    session: Session = Depends(get_session),
+@em_cache("municipio", "favorecido", "transferencia", "analises")
+async def count_favorecidos_por_municipio(
+    session: AsyncSession = Depends(get_async_session),
+    periodo: Periodo = Depends(ler_periodo),
 ) -> Dict[str, Any]:
     try:
-        municipios_com_favorecidos = session.exec(
-            select(
-                Municipio.codigo,
-                Municipio.nome,
-                Municipio.uf,
-                (
-                    select(func.count()).where(
-                        Favorecido.municipio_codigo == Municipio.codigo
-                    )
-                ).scalar_subquery(),
-            )
-        ).all()
-
-        return {
-            "data": [
-                {
-                    "codigo_municipio": codigo,
-                    "nome": nome,
-                    "uf": uf,
-                    "numero_de_favorecidos": count,
-                }
-                for codigo, nome, uf, count in municipios_com_favorecidos
-            ]
-        }
+        return {"data": await favorecidos_por_municipio(session, periodo=periodo)}
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -1,40 +1,84 @@
-from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlmodel import Session, select, func
+from typing import List, Optional, Dict, Any, Literal
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from src.models import Programa, ProgramaTransferencia
-from src.database.infra import get_session
+from src.database.infra import get_async_session
+from ..services.busca import buscar_por_nome, ordem_relevancia
+from ..services.atualizacao import atualiza_resumos
+from ..services.cache import em_cache, invalida_cache
+from ..services.lote import gravar_lote, ler_lote
+from ..services.paginacao import contar, ler_contagem, ler_cursor, paginar
 
 router = APIRouter(prefix="/programas", tags=["Programas"])
 
 
 @router.post("/", response_model=Programa)
-def create_programa(programa: Programa, session: Session = Depends(get_session)):
+@invalida_cache("programa")
+@atualiza_resumos("programa")
+async def create_programa(
+    programa: Programa, session: AsyncSession = Depends(get_async_session)
+):
     try:
         session.add(programa)
-        session.commit()
-        session.refresh(programa)
+        await session.commit()
+        await session.refresh(programa)
         return programa
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(status_code=500, detail=f"Erro ao criar programa: {str(e)}")
 
 
+@router.post("/batch", response_model=Dict[str, Any])
+@invalida_cache("programa")
+@atualiza_resumos("programa", aguardar=True)
+async def create_programa_batch(
+    request: Request,
+    modo: Literal["upsert", "inserir"] = Query("upsert"),
+    session: AsyncSession = Depends(get_async_session),
+) -> Dict[str, Any]:
+    itens = await ler_lote(request)
+    try:
+        return await gravar_lote(session, Programa, itens, modo)
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(
+            status_code=500, detail=f"Erro ao gravar programas: {str(e)}"
+        )
+
+
 @router.get("/", response_model=Dict[str, Any])
-def read_programas(
-    session: Session = Depends(get_session),
+@em_cache("programa")
+async def read_programas(
+    session: AsyncSession = Depends(get_async_session),
     skip: int = Query(0, alias="offset", ge=0),
     limit: int = Query(10, alias="limit", le=100),
     nome: Optional[str] = Query(None, alias="nome"),
+    q: Optional[str] = Query(None, min_length=2),
+    cursor: Optional[List[Any]] = Depends(ler_cursor),
+    contagem: Optional[str] = Depends(ler_contagem),
 ) -> Dict[str, Any]:
     try:
         query = select(Programa)
+        ordem = [Programa.codigo]
         if nome:
             query = query.where(Programa.nome.contains(nome))
+        if q:
+            query = await buscar_por_nome(session, query, Programa.nome, q)
+            ordem = await ordem_relevancia(session, Programa.nome, q) + ordem
 
-        total = session.exec(select(func.count()).select_from(Programa)).one()
-        programas = session.exec(query.offset(skip).limit(limit)).all()
+        total = await contar(session, query, contagem)
+        programas, proximo = await paginar(session, query, ordem, skip, limit, cursor)
 
-        return {"data": programas, "total": total, "offset": skip, "limit": limit}
+        return {
+            "data": programas,
+            "total": total,
+            "offset": skip,
+            "limit": limit,
+            "next_cursor": proximo,
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Erro ao buscar programas: {str(e)}"
@@ -42,18 +86,25 @@ def read_programas(
 
 
 @router.get("/{codigo}", response_model=Programa)
-def read_programa(codigo: int, session: Session = Depends(get_session)):
-    programa = session.get(Programa, codigo)
+@em_cache("programa")
+async def read_programa(
+    codigo: int, session: AsyncSession = Depends(get_async_session)
+):
+    programa = await session.get(Programa, codigo)
     if not programa:
         raise HTTPException(status_code=404, detail="Programa não encontrado")
     return programa
 
 
 @router.put("/{codigo}", response_model=Programa)
-def update_programa(
-    codigo: int, programa_update: Programa, session: Session = Depends(get_session)
+@invalida_cache("programa")
+@atualiza_resumos("programa")
+async def update_programa(
+    codigo: int,
+    programa_update: Programa,
+    session: AsyncSession = Depends(get_async_session),
 ):
-    programa = session.get(Programa, codigo)
+    programa = await session.get(Programa, codigo)
     if not programa:
         raise HTTPException(status_code=404, detail="Programa não encontrado")
     try:
@@ -61,27 +112,31 @@ def update_programa(
         for key, value in update_data.items():
             setattr(programa, key, value)
         session.add(programa)
-        session.commit()
-        session.refresh(programa)
+        await session.commit()
+        await session.refresh(programa)
         return programa
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=500, detail=f"Erro ao atualizar programa: {str(e)}"
         )
 
 
 @router.delete("/{codigo}", response_model=Programa)
-def delete_programa(codigo: int, session: Session = Depends(get_session)):
-    programa = session.get(Programa, codigo)
+@invalida_cache("programa")
+@atualiza_resumos("programa", "programatransferencia")
+async def delete_programa(
+    codigo: int, session: AsyncSession = Depends(get_async_session)
+):
+    programa = await session.get(Programa, codigo)
     if not programa:
         raise HTTPException(status_code=404, detail="Programa não encontrado")
     try:
-        session.delete(programa)
-        session.commit()
+        await session.delete(programa)
+        await session.commit()
         return programa
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=500, detail=f"Erro ao deletar programa: {str(e)}"
         )
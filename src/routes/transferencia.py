@@ -1,64 +1,180 @@
-from typing import Optional, Dict, Any
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlmodel import Session, select, func
+from typing import Any, Dict, List, Literal, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
 from src.models import Transferencia, UnidadeGestora
-from src.database.infra import get_session
+from src.schemas import TransferenciaLeitura
+from src.database.infra import get_async_session, sessoes_para
+from src.database.particoes import particoes_faltando, reservar_ids, sem_particao
+from src.database.resumos import no_periodo
+from src.database.tipos import media
+from ..services.analises import Periodo, ler_periodo
+from ..services.atualizacao import atualiza_resumos
+from ..services.cache import em_cache, invalida_cache
+from ..services.expansao import expandir, ler_expansao, opcoes_expansao
+from ..services.lote import erros_validacao, gravar_lote, ler_lote
+from ..services.exportacao import FORMATOS, consulta_exportacao, exportar
+from ..services.paginacao import contar, ler_contagem, ler_cursor, paginar
 
 router = APIRouter(prefix="/transferencias", tags=["Transferências"])
 
 
+def validar(dados: dict) -> Transferencia:
+    # O corpo de um modelo de tabela chega sem validação nem conversão de tipos,
+    # e a competência precisa ser uma data para escolher a partição
+    try:
+        return Transferencia.model_validate(dados)
+    except ValidationError as erro:
+        raise HTTPException(status_code=422, detail=erros_validacao(erro))
+
+
+async def exigir_particao(session: AsyncSession, transferencia: Transferencia):
+    # A API não cria partições (ver database/particoes.py)
+    faltando = await session.run_sync(
+        lambda sessao: particoes_faltando(
+            sessao.connection(), Transferencia.__table__, [transferencia.competencia]
+        )
+    )
+    if faltando:
+        raise HTTPException(status_code=422, detail=sem_particao(faltando[0]))
+
+
 @router.post("/", response_model=Transferencia)
-def create_transferencia(
-    transferencia: Transferencia, session: Session = Depends(get_session)
+@invalida_cache("transferencia")
+@atualiza_resumos("transferencia")
+async def create_transferencia(
+    transferencia: Transferencia, session: AsyncSession = Depends(get_async_session)
 ):
+    transferencia = validar(transferencia.model_dump(warnings=False))
+    # No Postgres a chave da tabela particionada inclui a competência: o mesmo
+    # id em outro mês seria aceito pelo banco como uma segunda linha
+    if transferencia.id is not None and await session.get(
+        Transferencia, transferencia.id
+    ):
+        raise HTTPException(
+            status_code=409, detail="Já existe uma transferência com esse id"
+        )
+    await exigir_particao(session, transferencia)
     try:
+        if transferencia.id is None:
+            ids = await session.run_sync(
+                lambda sessao: reservar_ids(
+                    sessao.connection(), Transferencia.__table__, 1
+                )
+            )
+            if ids:
+                transferencia.id = ids[0]
         session.add(transferencia)
-        session.commit()
-        session.refresh(transferencia)
+        await session.commit()
+        await session.refresh(transferencia)
         return transferencia
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=500, detail=f"Erro ao criar transferencia: {str(e)}"
         )
 
 
+@router.post("/batch", response_model=Dict[str, Any])
+@invalida_cache("transferencia")
+@atualiza_resumos("transferencia", aguardar=True)
+async def create_transferencia_batch(
+    request: Request,
+    modo: Literal["upsert", "inserir"] = Query("upsert"),
+    session: AsyncSession = Depends(get_async_session),
+) -> Dict[str, Any]:
+    itens = await ler_lote(request)
+    try:
+        return await gravar_lote(session, Transferencia, itens, modo)
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(
+            status_code=500, detail=f"Erro ao gravar transferências: {str(e)}"
+        )
+
+
 @router.get("/", response_model=Dict[str, Any])
-def read_transferencia(
-    session: Session = Depends(get_session),
+@em_cache("transferencia")
+async def read_transferencia(
+    session: AsyncSession = Depends(get_async_session),
     skip: int = Query(0, alias="offset", ge=0),
     limit: int = Query(10, le=100),
     tipo: Optional[str] = Query(None, alias="tipo"),
+    cursor: Optional[List[Any]] = Depends(ler_cursor),
+    contagem: Optional[str] = Depends(ler_contagem),
 ) -> Dict[str, Any]:
     try:
         query = select(Transferencia)
         if tipo:
             query = query.where(Transferencia.tipo.contains(tipo))
 
-        total = session.exec(select(func.count()).select_from(Transferencia)).one()
+        total = await contar(session, query, contagem)
 
-        transferencia = session.exec(query.offset(skip).limit(limit)).all()
+        transferencia, proximo = await paginar(
+            session, query, [Transferencia.id], skip, limit, cursor
+        )
 
-        return {"data": transferencia, "total": total, "offset": skip, "limit": limit}
+        return {
+            "data": transferencia,
+            "total": total,
+            "offset": skip,
+            "limit": limit,
+            "next_cursor": proximo,
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Erro ao buscar transferências: {str(e)}"
         )
 
 
+@router.get("/export")
+async def export_transferencias(
+    formato: Literal["ndjson", "csv", "parquet"] = Query("ndjson"),
+    tipo: Optional[str] = Query(None),
+    unidade_gestora: Optional[int] = Query(None),
+    favorecido: Optional[str] = Query(None),
+    programa: Optional[int] = Query(None),
+    uf: Optional[str] = Query(None, min_length=2, max_length=2),
+    periodo: Periodo = Depends(ler_periodo),
+    fabrica_sessoes=Depends(sessoes_para),
+) -> StreamingResponse:
+    try:
+        query = consulta_exportacao(
+            tipo, unidade_gestora, favorecido, programa, uf, periodo
+        )
+        return StreamingResponse(
+            exportar(fabrica_sessoes, query, formato),
+            media_type=FORMATOS[formato],
+            headers={
+                "Content-Disposition": f'attachment; filename="transferencias.{formato}"'
+            },
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Erro ao exportar transferências: {str(e)}"
+        )
+
+
 @router.get("/{unidade_gestora}/statistics", response_model=Dict[str, Any])
-def read_transferencia_estatisticas(
-    unidade_gestora: int, session: Session = Depends(get_session)
+@em_cache("transferencia", "unidade_gestora")
+async def read_transferencia_estatisticas(
+    unidade_gestora: int,
+    periodo: Periodo = Depends(ler_periodo),
+    session: AsyncSession = Depends(get_async_session),
 ) -> Dict[str, Any]:
     try:
-        resultado = session.exec(
+        query = (
             select(
                 UnidadeGestora.nome,
                 UnidadeGestora.orgao_nome,
                 func.max(Transferencia.valor),
                 func.min(Transferencia.valor),
                 func.sum(Transferencia.valor),
-                func.round(func.avg(Transferencia.valor), 2),
+                media(Transferencia.valor),
                 func.count(Transferencia.id),
             )
             .join(
@@ -67,7 +183,8 @@ def read_transferencia_estatisticas(
             )
             .where(Transferencia.unidade_gestora_codigo == unidade_gestora)
             .group_by(UnidadeGestora.nome, UnidadeGestora.orgao_nome)
-        ).one_or_none()
+        )
+        resultado = (await session.exec(no_periodo(query, periodo))).one_or_none()
 
         if not resultado:
             raise HTTPException(
@@ -91,49 +208,68 @@ def read_transferencia_estatisticas(
         )
 
 
-@router.get("/{codigo}", response_model=Transferencia)
-def read_transferencia(codigo: int, session: Session = Depends(get_session)):
-    transferencia = session.get(Transferencia, codigo)
+@router.get(
+    "/{codigo}", response_model=TransferenciaLeitura, response_model_exclude_unset=True
+)
+@em_cache("transferencia", "favorecido", "municipio", "unidade_gestora", "programa")
+async def read_transferencia(
+    codigo: int,
+    expand: Dict[str, Any] = Depends(
+        ler_expansao("favorecido.municipio", "unidade_gestora", "programas")
+    ),
+    session: AsyncSession = Depends(get_async_session),
+):
+    transferencia = await session.get(
+        Transferencia, codigo, options=opcoes_expansao(Transferencia, expand)
+    )
     if not transferencia:
         raise HTTPException(status_code=404, detail="Transferencia não encontrado")
-    return transferencia
+    return expandir(transferencia, expand)
 
 
 @router.put("/{codigo}", response_model=Transferencia)
-def update_transferencia(
+@invalida_cache("transferencia")
+@atualiza_resumos("transferencia")
+async def update_transferencia(
     codigo: int,
     transferencia_update: Transferencia,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
-    transferencia = session.get(Transferencia, codigo)
+    transferencia = await session.get(Transferencia, codigo)
     if not transferencia:
         raise HTTPException(status_code=404, detail="Transferencia não encontrada")
+    update_data = transferencia_update.model_dump(exclude_unset=True, warnings=False)
+    validado = validar({**transferencia.model_dump(), **update_data})
+    await exigir_particao(session, validado)
     try:
-        update_data = transferencia_update.dict(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(transferencia, key, value)
+        for key in update_data:
+            setattr(transferencia, key, getattr(validado, key))
         session.add(transferencia)
-        session.commit()
-        session.refresh(transferencia)
+        await session.commit()
+        await session.refresh(transferencia)
         return transferencia
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=500, detail=f"Erro ao atualizar transferencia: {str(e)}"
         )
 
 
 @router.delete("/{codigo}", response_model=Transferencia)
-def delete_transferencia(codigo: int, session: Session = Depends(get_session)):
-    transferencia = session.get(Transferencia, codigo)
+@invalida_cache("transferencia")
+@atualiza_resumos("transferencia")
+async def delete_transferencia(
+    codigo: int, session: AsyncSession = Depends(get_async_session)
+):
+    transferencia = await session.get(Transferencia, codigo)
     if not transferencia:
         raise HTTPException(status_code=404, detail="Transferencia não encontrada")
     try:
-        session.delete(transferencia)
-        session.commit()
+        await session.delete(transferencia)
+        await session.commit()
         return transferencia
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=500, detail=f"Erro ao deletar transferencia: {str(e)}"
         )
@@ -1,50 +1,90 @@
-from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlmodel import Session, select, func
+from typing import List, Optional, Dict, Any, Literal
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from src.models import UnidadeGestora
-from src.database.infra import get_session
+from src.database.infra import get_async_session
+from ..services.busca import buscar_por_nome, ordem_relevancia
+from ..services.atualizacao import atualiza_resumos
+from ..services.cache import em_cache, invalida_cache
+from ..services.exclusao import remover_vinculos_unidade_gestora
+from ..services.lote import gravar_lote, ler_lote
+from ..services.paginacao import contar, ler_contagem, ler_cursor, paginar
 
 router = APIRouter(prefix="/unidades_gestoras", tags=["Unidades Gestora"])
 
 
 @router.post("/", response_model=UnidadeGestora)
-def create_unidade_gestora(
-    unidade_gestora: UnidadeGestora, session: Session = Depends(get_session)
+@invalida_cache("unidade_gestora")
+@atualiza_resumos("unidadegestora")
+async def create_unidade_gestora(
+    unidade_gestora: UnidadeGestora, session: AsyncSession = Depends(get_async_session)
 ):
     try:
         session.add(unidade_gestora)
-        session.commit()
-        session.refresh(unidade_gestora)
+        await session.commit()
+        await session.refresh(unidade_gestora)
         return unidade_gestora
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=500, detail=f"Erro ao criar unidade gestora: {str(e)}"
         )
 
 
+@router.post("/batch", response_model=Dict[str, Any])
+@invalida_cache("unidade_gestora")
+@atualiza_resumos("unidadegestora", aguardar=True)
+async def create_unidade_gestora_batch(
+    request: Request,
+    modo: Literal["upsert", "inserir"] = Query("upsert"),
+    session: AsyncSession = Depends(get_async_session),
+) -> Dict[str, Any]:
+    itens = await ler_lote(request)
+    try:
+        return await gravar_lote(session, UnidadeGestora, itens, modo)
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(
+            status_code=500, detail=f"Erro ao gravar unidades gestoras: {str(e)}"
+        )
+
+
 @router.get("/", response_model=Dict[str, Any])
-def read_unidades_gestoras(
-    session: Session = Depends(get_session),
+@em_cache("unidade_gestora")
+async def read_unidades_gestoras(
+    session: AsyncSession = Depends(get_async_session),
     skip: int = Query(0, alias="offset", ge=0),
     limit: int = Query(10, le=100),
     orgao_nome: Optional[str] = Query(None, alias="orgao_nome"),
+    q: Optional[str] = Query(None, min_length=2),
+    cursor: Optional[List[Any]] = Depends(ler_cursor),
+    contagem: Optional[str] = Depends(ler_contagem),
 ) -> Dict[str, Any]:
     try:
         query = select(UnidadeGestora)
+        ordem = [UnidadeGestora.codigo]
         if orgao_nome:
             query = query.where(UnidadeGestora.orgao_nome.contains(orgao_nome))
+        if q:
+            query = await buscar_por_nome(session, query, UnidadeGestora.nome, q)
+            ordem = await ordem_relevancia(session, UnidadeGestora.nome, q) + ordem
 
-        total = session.exec(select(func.count()).select_from(UnidadeGestora)).one()
+        total = await contar(session, query, contagem)
 
-        unidades_gestoras = session.exec(query.offset(skip).limit(limit)).all()
+        unidades_gestoras, proximo = await paginar(
+            session, query, ordem, skip, limit, cursor
+        )
 
         return {
             "data": unidades_gestoras,
             "total": total,
             "offset": skip,
             "limit": limit,
+            "next_cursor": proximo,
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Erro ao buscar unidades gestoras: {str(e)}"
@@ -52,20 +92,25 @@ def read_unidades_gestoras(
 
 
 @router.get("/{codigo}", response_model=UnidadeGestora)
-def read_unidade_gestora(codigo: int, session: Session = Depends(get_session)):
-    unidade_gestora = session.get(UnidadeGestora, codigo)
+@em_cache("unidade_gestora")
+async def read_unidade_gestora(
+    codigo: int, session: AsyncSession = Depends(get_async_session)
+):
+    unidade_gestora = await session.get(UnidadeGestora, codigo)
     if not unidade_gestora:
         raise HTTPException(status_code=404, detail="Unidade gestora não encontrado")
     return unidade_gestora
 
 
 @router.put("/{codigo}", response_model=UnidadeGestora)
-def update_unidade_gestora(
+@invalida_cache("unidade_gestora")
+@atualiza_resumos("unidadegestora")
+async def update_unidade_gestora(
     codigo: int,
     unidade_gestora_update: UnidadeGestora,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
-    unidade_gestora = session.get(UnidadeGestora, codigo)
+    unidade_gestora = await session.get(UnidadeGestora, codigo)
     if not unidade_gestora:
         raise HTTPException(status_code=404, detail="Unidade gestora não encontrada")
     try:
@@ -73,27 +118,32 @@ def update_unidade_gestora(
         for key, value in update_data.items():
             setattr(unidade_gestora, key, value)
         session.add(unidade_gestora)
-        session.commit()
-        session.refresh(unidade_gestora)
+        await session.commit()
+        await session.refresh(unidade_gestora)
         return unidade_gestora
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=500, detail=f"Erro ao atualizar unidade gestora: {str(e)}"
         )
 
 
 @router.delete("/{codigo}", response_model=UnidadeGestora)
-def delete_unidade_gestora(codigo: int, session: Session = Depends(get_session)):
-    unidade_gestora = session.get(UnidadeGestora, codigo)
+@invalida_cache("unidade_gestora", "transferencia")
+@atualiza_resumos("unidadegestora", "transferencia")
+async def delete_unidade_gestora(
+    codigo: int, session: AsyncSession = Depends(get_async_session)
+):
+    unidade_gestora = await session.get(UnidadeGestora, codigo)
     if not unidade_gestora:
         raise HTTPException(status_code=404, detail="Unidade gestora não encontrada")
     try:
-        session.delete(unidade_gestora)
-        session.commit()
+        await remover_vinculos_unidade_gestora(session, codigo)
+        await session.delete(unidade_gestora)
+        await session.commit()
         return unidade_gestora
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=500, detail=f"Erro ao deletar unidade gestora: {str(e)}"
         )
@@ -0,0 +1,44 @@
+from sqlmodel import SQLModel
+from typing import Optional, List
+from decimal import Decimal
+from datetime import date
+
+
+class MunicipioLeitura(SQLModel):
+    codigo: int
+    nome: str
+    uf: str
+    favorecidos: Optional[List["FavorecidoLeitura"]] = None
+
+
+class UnidadeGestoraLeitura(SQLModel):
+    codigo: int
+    nome: str
+    orgao_nome: str
+
+
+class FavorecidoLeitura(SQLModel):
+    codigo: str
+    nome: str
+    municipio_codigo: int
+    municipio: Optional[MunicipioLeitura] = None
+
+
+class ProgramaLeitura(SQLModel):
+    codigo: int
+    nome: str
+
+
+class TransferenciaLeitura(SQLModel):
+    id: int
+    competencia: date
+    tipo: str
+    valor: Decimal
+    unidade_gestora_codigo: int
+    favorecido_codigo: str
+    unidade_gestora: Optional[UnidadeGestoraLeitura] = None
+    favorecido: Optional[FavorecidoLeitura] = None
+    programas: Optional[List[ProgramaLeitura]] = None
+
+
+MunicipioLeitura.model_rebuild()
@@ -1,20 +1,66 @@
-from typing import Dict, List
-from sqlmodel import Session, func, select
-from ..models import Favorecido, Municipio, Transferencia
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException, Query
+from sqlmodel import func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..database.particoes import mes_seguinte
+from ..database.resumos import resumo_do_periodo
+from ..models import (
+    Municipio,
+    Programa,
+    ResumoEstado,
+    ResumoMunicipio,
+    ResumoPrograma,
+    ResumoUnidadeGestora,
+    UnidadeGestora,
+)
 
+PADRAO_COMPETENCIA = r"^\d{4}-(0[1-9]|1[0-2])$"
 
-def total_transferencias_por_estado(session: Session, limit: int = 100) -> List[Dict]:
-    result = session.exec(
-        select(
-            Municipio.uf,
-            func.count(Transferencia.id).label("total_transferencias"),
-            func.sum(Transferencia.valor).label("valor_total"),
+Periodo = Optional[Tuple[Optional[date], Optional[date]]]
+
+
+def ler_periodo(
+    de: Optional[str] = Query(
+        None,
+        pattern=PADRAO_COMPETENCIA,
+        description="Primeira competência incluída (AAAA-MM)",
+    ),
+    ate: Optional[str] = Query(
+        None,
+        pattern=PADRAO_COMPETENCIA,
+        description="Última competência incluída (AAAA-MM)",
+    ),
+) -> Periodo:
+    # Sem período, as análises vêm das tabelas de resumo; com ele, das
+    # transferências das competências do intervalo [de, ate]
+    if de is None and ate is None:
+        return None
+
+    inicio = date(int(de[:4]), int(de[5:]), 1) if de else None
+    fim = mes_seguinte(date(int(ate[:4]), int(ate[5:]), 1)) if ate else None
+    if inicio and fim and inicio >= fim:
+        raise HTTPException(
+            status_code=400, detail="A competência 'de' é posterior à 'ate'"
+        )
+    return inicio, fim
+
+
+async def total_transferencias_por_estado(
+    session: AsyncSession, limit: int = 100, periodo: Periodo = None
+) -> List[Dict]:
+    resumo = resumo_do_periodo(ResumoEstado, periodo)
+
+    result = (
+        await session.exec(
+            select(
+                resumo.c.uf,
+                resumo.c.total_transferencias,
+                resumo.c.valor_total,
+            )
+            .order_by(resumo.c.total_transferencias.desc())
+            .limit(limit)
         )
-        .join(Favorecido, Favorecido.municipio_codigo == Municipio.codigo)
-        .join(Transferencia, Transferencia.favorecido_codigo == Favorecido.codigo)
-        .group_by(Municipio.uf)
-        .order_by(func.count(Transferencia.id).desc())
-        .limit(limit)
     ).all()
 
     return [
@@ -25,3 +71,109 @@ def total_transferencias_por_estado(session: Session, limit: int = 100) -> List[
         }
         for uf, total_transferencias, valor_total in result
     ]
+
+
+async def total_transferencias_por_unidade_gestora(
+    session: AsyncSession, periodo: Periodo = None
+) -> List[Dict]:
+    resumo = resumo_do_periodo(ResumoUnidadeGestora, periodo)
+
+    result = (
+        await session.exec(
+            select(
+                UnidadeGestora.codigo,
+                UnidadeGestora.nome,
+                UnidadeGestora.orgao_nome,
+                resumo.c.total_transferencias,
+                resumo.c.valor_total,
+            ).outerjoin(
+                resumo,
+                resumo.c.unidade_gestora_codigo == UnidadeGestora.codigo,
+            )
+        )
+    ).all()
+
+    return [
+        {
+            "codigo_unidade_gestora": codigo,
+            "nome": nome,
+            "orgao_nome": orgao_nome,
+            "total_transferencias": total_transferencias or 0,
+            "valor_total": valor_total or 0,
+        }
+        for codigo, nome, orgao_nome, total_transferencias, valor_total in result
+    ]
+
+
+async def favorecidos_por_programa(
+    session: AsyncSession, periodo: Periodo = None
+) -> List[Dict]:
+    resumo = resumo_do_periodo(ResumoPrograma, periodo)
+
+    result = (
+        await session.exec(
+            select(
+                Programa.codigo, Programa.nome, resumo.c.total_favorecidos
+            ).outerjoin(resumo, resumo.c.programa_codigo == Programa.codigo)
+        )
+    ).all()
+
+    return [
+        {
+            "codigo_programa": codigo,
+            "nome": nome,
+            "total_favorecidos": total_favorecidos or 0,
+        }
+        for codigo, nome, total_favorecidos in result
+    ]
+
+
+async def programas_mais_frequentes(
+    session: AsyncSession, periodo: Periodo = None
+) -> List[Dict]:
+    resumo = resumo_do_periodo(ResumoPrograma, periodo)
+    total_transferencias = func.coalesce(resumo.c.total_transferencias, 0)
+
+    result = (
+        await session.exec(
+            select(Programa.codigo, Programa.nome, total_transferencias)
+            .outerjoin(resumo, resumo.c.programa_codigo == Programa.codigo)
+            .order_by(total_transferencias.desc(), Programa.codigo)
+        )
+    ).all()
+
+    return [
+        {
+            "codigo_programa": codigo,
+            "nome": nome,
+            "total_transferencias": total_transferencias,
+        }
+        for codigo, nome, total_transferencias in result
+    ]
+
+
+async def favorecidos_por_municipio(
+    session: AsyncSession, periodo: Periodo = None
+) -> List[Dict]:
+    resumo = resumo_do_periodo(ResumoMunicipio, periodo)
+
+    result = (
+        await session.exec(
+            select(
+                Municipio.codigo,
+                Municipio.nome,
+                Municipio.uf,
+                resumo.c.numero_de_favorecidos,
+            ).outerjoin(resumo, resumo.c.municipio_codigo == Municipio.codigo)
+        )
+    ).all()
+
+    return [
+        {
+            "codigo_municipio": codigo,
+            "nome": nome,
+            "uf": uf,
+            "numero_de_favorecidos": count or 0,
+        }
+        for codigo, nome, uf, count in result
+    ]
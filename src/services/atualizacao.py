@@ -0,0 +1,70 @@
+import os
+import asyncio
+from functools import wraps
+from loguru import logger
+from ..database.infra import engine
+from ..database.resumos import atualizar_resumos
+from .cache import cache
+
+RESUMOS_ATRASO = float(os.getenv("RESUMOS_ATRASO", "1"))
+
+
+class AtualizadorResumos:
+    # Escritas pela API marcam as tabelas de origem alteradas; os resumos que
+    # dependem delas são recalculados em segundo plano, um recálculo por vez.
+    # Cada recálculo espera RESUMOS_ATRASO segundos e agrupa as escritas feitas
+    # nesse intervalo e enquanto o anterior estava em andamento
+    def __init__(self, bind=engine, atraso=RESUMOS_ATRASO):
+        self.bind = bind
+        self.atraso = atraso
+        self.pendentes = set()
+        self.imediato = False
+        self.tarefa = None
+
+    def agendar(self, tabelas, imediato=False):
+        self.pendentes.update(tabelas)
+        self.imediato |= imediato
+        if self.tarefa is None or self.tarefa.done():
+            self.tarefa = asyncio.get_running_loop().create_task(self.executar())
+
+    async def executar(self):
+        while self.pendentes:
+            if not self.imediato:
+                await asyncio.sleep(self.atraso)
+            self.imediato = False
+            tabelas, self.pendentes = self.pendentes, set()
+            try:
+                await asyncio.to_thread(atualizar_resumos, self.bind, tabelas)
+            except Exception:
+                # Fica pendente para o próximo recálculo
+                self.pendentes |= tabelas
+                logger.opt(exception=True).error("Erro ao atualizar os resumos")
+                return
+            # Respostas lidas dos resumos antigos, mesmo que guardadas depois
+            # da escrita, deixam de valer
+            cache.invalidar("analises")
+
+    async def aguardar(self):
+        while self.tarefa is not None and not self.tarefa.done():
+            await asyncio.shield(self.tarefa)
+
+
+atualizador = AtualizadorResumos()
+
+
+def atualiza_resumos(*tabelas, aguardar: bool = False):
+    # Com aguardar, a resposta só sai com os resumos já recalculados (lotes),
+    # sem esperar o agrupamento; sem, a escrita responde logo e o recálculo
+    # segue em segundo plano
+    def decorador(funcao):
+        @wraps(funcao)
+        async def envoltorio(*args, **kwargs):
+            resultado = await funcao(*args, **kwargs)
+            atualizador.agendar(tabelas, imediato=aguardar)
+            if aguardar:
+                await atualizador.aguardar()
+            return resultado
+
+        return envoltorio
+
+    return decorador
@@ -0,0 +1,44 @@
+from sqlalchemy import literal, or_, text
+from sqlmodel import func
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+_trigramas_disponiveis = {}
+
+
+async def trigramas_disponiveis(session: AsyncSession) -> bool:
+    bind = session.get_bind()
+
+    if bind.dialect.name != "postgresql":
+        return False
+
+    if bind.url not in _trigramas_disponiveis:
+        _trigramas_disponiveis[bind.url] = (
+            await session.execute(
+                text("SELECT to_regprocedure('f_unaccent(text)') IS NOT NULL")
+            )
+        ).scalar()
+
+    return _trigramas_disponiveis[bind.url]
+
+
+def normalizar(expressao):
+    return func.f_unaccent(func.lower(expressao))
+
+
+async def buscar_por_nome(session: AsyncSession, query, coluna, q: str):
+    if not await trigramas_disponiveis(session):
+        return query.where(coluna.icontains(q, autoescape=True))
+
+    nome = normalizar(coluna)
+    termo = normalizar(literal(q))
+
+    return query.where(or_(nome.contains(termo), termo.op("<%")(nome)))
+
+
+async def ordem_relevancia(session: AsyncSession, coluna, q: str) -> list:
+    if not await trigramas_disponiveis(session):
+        return []
+
+    # Negada para que a ordenação por relevância decrescente seja ascendente,
+    # como as demais chaves da paginação por cursor
+    return [-func.word_similarity(normalizar(literal(q)), normalizar(coluna))]
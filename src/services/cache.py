@@ -0,0 +1,162 @@
+import inspect
+import os
+import time
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from functools import wraps
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import serialize_response
+
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+CACHE_TAMANHO = int(os.getenv("CACHE_TAMANHO", "1024"))
+
+
+class CacheRespostas:
+    def __init__(self, tamanho=CACHE_TAMANHO, validade=CACHE_TTL):
+        self.tamanho = tamanho
+        self.validade = validade
+        self.itens = OrderedDict()
+        self.geracoes = Counter()
+        self.metricas = defaultdict(Counter)
+        self.trava = threading.Lock()
+
+    def chave(self, rota, entidades, parametros):
+        # A geração de cada entidade faz parte da chave: uma escrita invalida
+        # as entradas antigas sem percorrê-las, e uma leitura iniciada antes da
+        # escrita grava o resultado numa chave que não será mais consultada
+        with self.trava:
+            geracoes = tuple(self.geracoes[entidade] for entidade in entidades)
+        return rota, geracoes, parametros
+
+    def obter(self, chave, entidade):
+        agora = time.monotonic()
+
+        with self.trava:
+            item = self.itens.get(chave)
+            if item is not None and item[0] > agora:
+                self.itens.move_to_end(chave)
+                self.metricas[entidade]["acertos"] += 1
+                return True, item[1]
+
+            if item is not None:
+                del self.itens[chave]
+                self.metricas[entidade]["expiradas"] += 1
+            self.metricas[entidade]["falhas"] += 1
+            return False, None
+
+    def guardar(self, chave, entidade, valor):
+        with self.trava:
+            self.itens[chave] = (time.monotonic() + self.validade, valor)
+            self.itens.move_to_end(chave)
+            while len(self.itens) > self.tamanho:
+                self.itens.popitem(last=False)
+                self.metricas[entidade]["descartadas"] += 1
+
+    def invalidar(self, *entidades):
+        with self.trava:
+            for entidade in entidades:
+                self.geracoes[entidade] += 1
+                self.metricas[entidade]["invalidacoes"] += 1
+
+    def limpar(self):
+        with self.trava:
+            self.itens.clear()
+
+    def estatisticas(self):
+        with self.trava:
+            entidades = {
+                entidade: {
+                    "acertos": metricas["acertos"],
+                    "falhas": metricas["falhas"],
+                    "expiradas": metricas["expiradas"],
+                    "descartadas": metricas["descartadas"],
+                    "invalidacoes": metricas["invalidacoes"],
+                    "taxa_acerto": metricas["acertos"]
+                    / max(metricas["acertos"] + metricas["falhas"], 1),
+                }
+                for entidade, metricas in sorted(self.metricas.items())
+            }
+            return {
+                "itens": len(self.itens),
+                "tamanho_maximo": self.tamanho,
+                "validade_segundos": self.validade,
+                "entidades": entidades,
+            }
+
+
+cache = CacheRespostas()
+
+
+async def serializar(rota, resultado) -> bytes:
+    # Mesma validação e filtragem que o FastAPI aplica pelo response_model da
+    # rota (inclusive response_model_exclude_unset), para que a resposta
+    # guardada seja igual à que sairia sem o cache
+    conteudo = await serialize_response(
+        field=rota.response_field,
+        response_content=resultado,
+        include=rota.response_model_include,
+        exclude=rota.response_model_exclude,
+        by_alias=rota.response_model_by_alias,
+        exclude_unset=rota.response_model_exclude_unset,
+        exclude_defaults=rota.response_model_exclude_defaults,
+        exclude_none=rota.response_model_exclude_none,
+    )
+    return JSONResponse(conteudo).body
+
+
+def em_cache(*entidades):
+    def decorador(funcao):
+        @wraps(funcao)
+        async def envoltorio(*args, requisicao_cache: Request, **kwargs):
+            if cache.validade <= 0:
+                return await funcao(*args, **kwargs)
+
+            parametros = tuple(
+                sorted(
+                    (nome, repr(valor))
+                    for nome, valor in kwargs.items()
+                    if nome != "session"
+                )
+            )
+            chave = cache.chave(funcao, entidades, parametros)
+
+            encontrado, corpo = cache.obter(chave, entidades[0])
+            if not encontrado:
+                # Guarda o JSON já serializado: um acerto não repete a validação
+                # e a serialização pelo response_model da rota
+                resultado = await funcao(*args, **kwargs)
+                corpo = await serializar(requisicao_cache.scope["route"], resultado)
+                cache.guardar(chave, entidades[0], corpo)
+
+            return Response(corpo, media_type="application/json")
+
+        # O FastAPI lê os parâmetros da assinatura; a requisição é acrescentada
+        # para chegar à rota e ao seu response_model
+        assinatura = inspect.signature(funcao)
+        envoltorio.__signature__ = assinatura.replace(
+            parameters=[
+                *assinatura.parameters.values(),
+                inspect.Parameter(
+                    "requisicao_cache",
+                    inspect.Parameter.KEYWORD_ONLY,
+                    annotation=Request,
+                ),
+            ]
+        )
+        return envoltorio
+
+    return decorador
+
+
+def invalida_cache(*entidades):
+    def decorador(funcao):
+        @wraps(funcao)
+        async def envoltorio(*args, **kwargs):
+            resultado = await funcao(*args, **kwargs)
+            cache.invalidar(*entidades)
+            return resultado
+
+        return envoltorio
+
+    return decorador
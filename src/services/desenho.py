@@ -0,0 +1,46 @@
+import io
+import seaborn as sns
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+FORMATOS = {"png": "image/png", "svg": "image/svg+xml"}
+
+
+def exportar(figura: Figure, formato: str) -> bytes:
+    FigureCanvasAgg(figura)
+    saida = io.BytesIO()
+    figura.savefig(saida, format=formato, bbox_inches="tight", dpi=100)
+    return saida.getvalue()
+
+
+def desenhar_pizza(titulo, rotulos, valores, formato="png") -> bytes:
+    figura = Figure(figsize=(10, 8))
+    eixo = figura.add_subplot()
+    eixo.pie(
+        valores,
+        labels=rotulos,
+        autopct="%1.1f%%",
+        startangle=140,
+        colors=sns.color_palette("Set3", len(valores)),
+        wedgeprops={"edgecolor": "black"},
+    )
+    eixo.set_title(titulo, fontsize=14, fontweight="bold", pad=20)
+    eixo.axis("equal")
+
+    return exportar(figura, formato)
+
+
+def desenhar_barras(titulo, rotulos, valores, legenda, formato="png") -> bytes:
+    figura = Figure(figsize=(10, max(4, len(valores) * 0.5)))
+    eixo = figura.add_subplot()
+    eixo.barh(
+        rotulos[::-1],
+        valores[::-1],
+        color=sns.color_palette("Set3", len(valores))[::-1],
+        edgecolor="black",
+    )
+    eixo.set_title(titulo, fontsize=14, fontweight="bold", pad=20)
+    eixo.set_xlabel(legenda)
+    eixo.tick_params(axis="y", labelsize=8)
+
+    return exportar(figura, formato)
@@ -0,0 +1,34 @@
+from sqlalchemy import delete, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..models import Favorecido, ProgramaTransferencia, Transferencia
+
+
+async def remover_vinculos(session: AsyncSession, *condicoes):
+    # No Postgres programatransferencia não tem chave estrangeira para a tabela
+    # particionada (ver models.py), e a exclusão em cascata das transferências
+    # pelo banco não alcançaria os vínculos: eles são apagados antes, na mesma
+    # transação
+    await session.execute(
+        delete(ProgramaTransferencia).where(
+            ProgramaTransferencia.transferencia_id.in_(
+                select(Transferencia.id).where(*condicoes)
+            )
+        )
+    )
+
+
+async def remover_vinculos_unidade_gestora(session: AsyncSession, codigo: int):
+    await remover_vinculos(session, Transferencia.unidade_gestora_codigo == codigo)
+
+
+async def remover_vinculos_favorecido(session: AsyncSession, codigo: str):
+    await remover_vinculos(session, Transferencia.favorecido_codigo == codigo)
+
+
+async def remover_vinculos_municipio(session: AsyncSession, codigo: int):
+    await remover_vinculos(
+        session,
+        Transferencia.favorecido_codigo.in_(
+            select(Favorecido.codigo).where(Favorecido.municipio_codigo == codigo)
+        ),
+    )
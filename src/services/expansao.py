@@ -0,0 +1,94 @@
+from typing import Optional
+from fastapi import HTTPException, Query
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+from ..models import Favorecido, Municipio, Programa, Transferencia, UnidadeGestora
+from ..schemas import (
+    FavorecidoLeitura,
+    MunicipioLeitura,
+    ProgramaLeitura,
+    TransferenciaLeitura,
+    UnidadeGestoraLeitura,
+)
+
+ESQUEMAS = {
+    Favorecido: FavorecidoLeitura,
+    Municipio: MunicipioLeitura,
+    Programa: ProgramaLeitura,
+    Transferencia: TransferenciaLeitura,
+    UnidadeGestora: UnidadeGestoraLeitura,
+}
+
+
+def ler_expansao(*permitidas: str):
+    # Cada caminho permitido também libera seus prefixos
+    # (ex.: "favorecido.municipio" libera "favorecido")
+    validos = {
+        ".".join(caminho.split(".")[:tamanho])
+        for caminho in permitidas
+        for tamanho in range(1, len(caminho.split(".")) + 1)
+    }
+
+    def dependencia(
+        expand: Optional[str] = Query(
+            None,
+            description="Relações a incluir, separadas por vírgula: "
+            + ", ".join(permitidas),
+        )
+    ) -> dict:
+        arvore = {}
+        for caminho in filter(
+            None, (parte.strip() for parte in (expand or "").split(","))
+        ):
+            if caminho not in validos:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Expansão inválida: {caminho}. "
+                    f"Permitidas: {', '.join(permitidas)}",
+                )
+            no = arvore
+            for relacao in caminho.split("."):
+                no = no.setdefault(relacao, {})
+        return arvore
+
+    return dependencia
+
+
+def opcoes_expansao(modelo, arvore: dict, pai=None) -> list:
+    # Relações para um (muitos-para-um) entram na mesma consulta por JOIN;
+    # coleções são carregadas por uma consulta IN por nível
+    opcoes = []
+    for relacao, subarvore in arvore.items():
+        atributo = getattr(modelo, relacao)
+        propriedade = inspect(modelo).relationships[relacao]
+        carregador = selectinload if propriedade.uselist else joinedload
+        opcao = (
+            getattr(pai, carregador.__name__)(atributo)
+            if pai is not None
+            else carregador(atributo)
+        )
+        opcoes.append(opcao)
+        opcoes.extend(opcoes_expansao(propriedade.mapper.class_, subarvore, opcao))
+
+    if pai is None:
+        # Qualquer outra relação acessada falha em vez de gerar uma consulta
+        opcoes.append(raiseload("*"))
+    return opcoes
+
+
+def montar(objeto, arvore: dict) -> dict:
+    dados = objeto.model_dump()
+    for relacao, subarvore in arvore.items():
+        valor = getattr(objeto, relacao)
+        if isinstance(valor, list):
+            dados[relacao] = [montar(item, subarvore) for item in valor]
+        else:
+            dados[relacao] = montar(valor, subarvore) if valor is not None else None
+    return dados
+
+
+def expandir(objeto, arvore: dict) -> dict:
+    esquema = ESQUEMAS[type(objeto)]
+    return esquema.model_validate(montar(objeto, arvore)).model_dump(
+        mode="json", exclude_unset=True
+    )
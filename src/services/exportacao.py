@@ -0,0 +1,194 @@
+import io
+import os
+import csv
+import json
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import Optional
+from sqlalchemy import BigInteger, type_coerce
+from sqlmodel import select
+from ..database.resumos import no_periodo
+from ..database.tipos import Centavos
+from ..dataset.clean_dataset import centavos_para_decimal
+from ..models import Favorecido, Municipio, ProgramaTransferencia, Transferencia
+
+EXPORTACAO_LOTE = int(os.getenv("EXPORTACAO_LOTE", "5000"))
+
+FORMATOS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Guardado em centavos, o valor sai do banco como inteiro e só vira reais na
+# serialização, sem um Decimal por linha
+CENTAVOS = isinstance(Transferencia.valor.type, Centavos)
+
+COLUNAS = [
+    Transferencia.id,
+    Transferencia.competencia,
+    Transferencia.tipo,
+    (
+        type_coerce(Transferencia.valor, BigInteger).label("valor")
+        if CENTAVOS
+        else Transferencia.valor
+    ),
+    Transferencia.unidade_gestora_codigo,
+    Transferencia.favorecido_codigo,
+]
+NOMES = [coluna.key for coluna in COLUNAS]
+
+ESQUEMA = pa.schema(
+    [
+        ("id", pa.int64()),
+        ("competencia", pa.date32()),
+        ("tipo", pa.string()),
+        ("valor", pa.decimal128(18, 2)),
+        ("unidade_gestora_codigo", pa.int64()),
+        ("favorecido_codigo", pa.string()),
+    ]
+)
+
+
+def consulta_exportacao(
+    tipo: Optional[str] = None,
+    unidade_gestora: Optional[int] = None,
+    favorecido: Optional[str] = None,
+    programa: Optional[int] = None,
+    uf: Optional[str] = None,
+    periodo=None,
+):
+    # Colunas em vez de entidades: nada é guardado no identity map da sessão
+    query = no_periodo(select(*COLUNAS).order_by(Transferencia.id), periodo)
+    if tipo:
+        query = query.where(Transferencia.tipo.contains(tipo))
+    if unidade_gestora is not None:
+        query = query.where(Transferencia.unidade_gestora_codigo == unidade_gestora)
+    if favorecido:
+        query = query.where(Transferencia.favorecido_codigo == favorecido)
+    if programa is not None:
+        query = query.where(
+            Transferencia.id.in_(
+                select(ProgramaTransferencia.transferencia_id).where(
+                    ProgramaTransferencia.programa_codigo == programa
+                )
+            )
+        )
+    if uf:
+        query = query.where(
+            Transferencia.favorecido_codigo.in_(
+                select(Favorecido.codigo)
+                .join(Municipio, Municipio.codigo == Favorecido.municipio_codigo)
+                .where(Municipio.uf == uf.upper())
+            )
+        )
+    return query
+
+
+class Saida:
+    # Destino do ParquetWriter: acumula os bytes de cada row group para que
+    # sejam enviados e descartados logo em seguida
+    def __init__(self):
+        self.partes = []
+        self.posicao = 0
+        self.closed = False
+
+    def write(self, dados):
+        self.partes.append(bytes(dados))
+        self.posicao += len(dados)
+        return len(dados)
+
+    def tell(self):
+        return self.posicao
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def esvaziar(self) -> bytes:
+        dados = b"".join(self.partes)
+        self.partes.clear()
+        return dados
+
+
+def reais(centavos: int) -> str:
+    sinal = "-" if centavos < 0 else ""
+    return f"{sinal}{abs(centavos) // 100}.{abs(centavos) % 100:02d}"
+
+
+def para_ndjson(lote) -> bytes:
+    # valor vai como texto decimal, exato como no CSV e no Parquet e como nas
+    # demais respostas da API
+    return "".join(
+        json.dumps(
+            {
+                "id": linha[0],
+                "competencia": linha[1].isoformat(),
+                "tipo": linha[2],
+                "valor": reais(linha[3]) if CENTAVOS else str(linha[3]),
+                "unidade_gestora_codigo": linha[4],
+                "favorecido_codigo": linha[5],
+            },
+            ensure_ascii=False,
+        )
+        + "\n"
+        for linha in lote
+    ).encode()
+
+
+def para_csv(lote, cabecalho: bool = False) -> bytes:
+    saida = io.StringIO()
+    escritor = csv.writer(saida)
+    if cabecalho:
+        escritor.writerow(NOMES)
+    if CENTAVOS:
+        lote = ((*linha[:3], reais(linha[3]), *linha[4:]) for linha in lote)
+    escritor.writerows(lote)
+    return saida.getvalue().encode()
+
+
+def para_tabela(lote) -> pa.Table:
+    colunas = list(zip(*lote))
+    return pa.Table.from_arrays(
+        [
+            (
+                centavos_para_decimal(pd.Series(valores, dtype="Int64"))
+                if CENTAVOS and campo.name == "valor"
+                else pa.array(valores, type=campo.type)
+            )
+            for valores, campo in zip(colunas, ESQUEMA)
+        ],
+        schema=ESQUEMA,
+    )
+
+
+async def exportar(fabrica_sessoes, query, formato: str):
+    # A sessão é aberta aqui, e não por dependência: o FastAPI encerra as
+    # dependências antes de a StreamingResponse consumir o gerador
+    async with fabrica_sessoes() as session:
+        resultado = await session.stream(
+            query.execution_options(yield_per=EXPORTACAO_LOTE)
+        )
+
+        if formato == "parquet":
+            saida = Saida()
+            with pq.ParquetWriter(saida, ESQUEMA, compression="zstd") as escritor:
+                async for lote in resultado.partitions():
+                    escritor.write_table(para_tabela(lote))
+                    yield saida.esvaziar()
+            yield saida.esvaziar()
+            return
+
+        primeiro = True
+        async for lote in resultado.partitions():
+            if formato == "csv":
+                yield para_csv(lote, cabecalho=primeiro)
+            else:
+                yield para_ndjson(lote)
+            primeiro = False
+
+        if primeiro and formato == "csv":
+            yield para_csv([], cabecalho=True)
@@ -0,0 +1,232 @@
+import os
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from sqlmodel import func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..database.infra import async_session
+from ..models import (
+    Municipio,
+    Programa,
+    ResumoEstado,
+    ResumoMunicipio,
+    ResumoPrograma,
+    ResumoUnidadeGestora,
+    UnidadeGestora,
+    VersaoResumo,
+)
+from .analises import (
+    favorecidos_por_municipio,
+    favorecidos_por_programa,
+    programas_mais_frequentes,
+    total_transferencias_por_estado,
+    total_transferencias_por_unidade_gestora,
+)
+from .desenho import desenhar_barras, desenhar_pizza
+
+TRABALHADORES_GRAFICOS = int(
+    os.getenv("TRABALHADORES_GRAFICOS", str(min(4, os.cpu_count() or 1)))
+)
+
+_executor = None
+_renderizados = {}
+_em_andamento = {}
+_trava = threading.Lock()
+
+
+def abreviar(texto: str, tamanho: int = 45) -> str:
+    return texto if len(texto) <= tamanho else texto[: tamanho - 1] + "…"
+
+
+def maiores(dados, chave, quantidade):
+    return sorted(dados, key=lambda d: d[chave], reverse=True)[:quantidade]
+
+
+async def dados_transferencias_por_estado(session: AsyncSession):
+    dados = await total_transferencias_por_estado(session, 10)
+    return desenhar_pizza, {
+        "titulo": "Distribuição de Transferências pelos 10 Estado Mais Representativos",
+        "rotulos": [d["uf"] for d in dados],
+        "valores": [d["total_transferencias"] for d in dados],
+    }
+
+
+async def dados_transferencias_por_unidade_gestora(session: AsyncSession):
+    dados = maiores(
+        await total_transferencias_por_unidade_gestora(session), "valor_total", 15
+    )
+    return desenhar_barras, {
+        "titulo": "15 Unidades Gestoras com Maior Valor Transferido",
+        "rotulos": [abreviar(d["nome"]) for d in dados],
+        "valores": [float(d["valor_total"]) for d in dados],
+        "legenda": "Valor total (R$)",
+    }
+
+
+async def dados_programas_mais_frequentes(session: AsyncSession):
+    dados = (await programas_mais_frequentes(session))[:10]
+    return desenhar_barras, {
+        "titulo": "10 Programas com Mais Transferências",
+        "rotulos": [abreviar(d["nome"]) for d in dados],
+        "valores": [d["total_transferencias"] for d in dados],
+        "legenda": "Transferências",
+    }
+
+
+async def dados_favorecidos_por_programa(session: AsyncSession):
+    dados = maiores(await favorecidos_por_programa(session), "total_favorecidos", 10)
+    return desenhar_barras, {
+        "titulo": "10 Programas com Mais Favorecidos",
+        "rotulos": [abreviar(d["nome"]) for d in dados],
+        "valores": [d["total_favorecidos"] for d in dados],
+        "legenda": "Favorecidos distintos",
+    }
+
+
+async def dados_favorecidos_por_municipio(session: AsyncSession):
+    dados = maiores(
+        await favorecidos_por_municipio(session), "numero_de_favorecidos", 15
+    )
+    return desenhar_barras, {
+        "titulo": "15 Municípios com Mais Favorecidos",
+        "rotulos": [f"{d['nome']} ({d['uf']})" for d in dados],
+        "valores": [d["numero_de_favorecidos"] for d in dados],
+        "legenda": "Favorecidos",
+    }
+
+
+# Cada gráfico muda com o seu resumo e com as tabelas de onde vêm os rótulos
+GRAFICOS = {
+    "transferencias-por-estado": (
+        [ResumoEstado],
+        dados_transferencias_por_estado,
+    ),
+    "transferencias-por-unidade-gestora": (
+        [ResumoUnidadeGestora, UnidadeGestora],
+        dados_transferencias_por_unidade_gestora,
+    ),
+    "programas-mais-frequentes": (
+        [ResumoPrograma, Programa],
+        dados_programas_mais_frequentes,
+    ),
+    "favorecidos-por-programa": (
+        [ResumoPrograma, Programa],
+        dados_favorecidos_por_programa,
+    ),
+    "favorecidos-por-municipio": (
+        [ResumoMunicipio, Municipio],
+        dados_favorecidos_por_municipio,
+    ),
+}
+
+
+def executor() -> ProcessPoolExecutor:
+    global _executor
+
+    with _trava:
+        if _executor is None:
+            # spawn evita herdar, via fork, travas e conexões das threads da API
+            _executor = ProcessPoolExecutor(
+                max_workers=TRABALHADORES_GRAFICOS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def encerrar_graficos():
+    global _executor
+
+    with _trava:
+        if _executor is not None:
+            _executor.shutdown(cancel_futures=True)
+            _executor = None
+
+
+async def etag_grafico(session: AsyncSession, nome: str, formato: str = "png") -> str:
+    tabelas, _ = GRAFICOS[nome]
+    atualizado_em = (
+        await session.exec(
+            select(func.max(VersaoResumo.atualizado_em)).where(
+                VersaoResumo.tabela.in_([tabela.__tablename__ for tabela in tabelas])
+            )
+        )
+    ).first()
+    versao = atualizado_em.strftime("%Y%m%d%H%M%S%f") if atualizado_em else "0"
+    return f'"{nome}-{formato}-{versao}"'
+
+
+def etag_corresponde(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+
+    candidatos = {candidato.strip() for candidato in if_none_match.split(",")}
+    return "*" in candidatos or etag in candidatos or f"W/{etag}" in candidatos
+
+
+async def renderizar(
+    session: AsyncSession, nome: str, formato: str, etag: str
+) -> Future:
+    chave = (nome, formato)
+
+    with _trava:
+        renderizado = _renderizados.get(chave)
+        if renderizado and renderizado[0] == etag:
+            futuro = Future()
+            futuro.set_result(renderizado[1])
+            return futuro
+
+        # Requisições simultâneas pela mesma versão aguardam o mesmo desenho
+        andamento = _em_andamento.get(chave)
+        if andamento and andamento[0] == etag:
+            return andamento[1]
+
+        futuro = Future()
+        _em_andamento[chave] = (etag, futuro)
+
+    def concluir(resultado=None, erro=None):
+        with _trava:
+            if _em_andamento.get(chave, (None, None))[1] is futuro:
+                del _em_andamento[chave]
+            if erro is None:
+                _renderizados[chave] = (etag, resultado)
+
+        if erro is None:
+            futuro.set_result(resultado)
+        else:
+            futuro.set_exception(erro)
+
+    def repassar(trabalho: Future):
+        if trabalho.exception() is None:
+            concluir(resultado=trabalho.result())
+        else:
+            concluir(erro=trabalho.exception())
+
+    try:
+        _, dados = GRAFICOS[nome]
+        desenhar, argumentos = await dados(session)
+        executor().submit(desenhar, formato=formato, **argumentos).add_done_callback(
+            repassar
+        )
+    except Exception as erro:
+        concluir(erro=erro)
+
+    return futuro
+
+
+async def obter_grafico(
+    session: AsyncSession, nome: str, formato: str, etag: str
+) -> bytes:
+    return await asyncio.wrap_future(await renderizar(session, nome, formato, etag))
+
+
+async def pre_renderizar_graficos(formatos=("png",)):
+    async with async_session() as session:
+        futuros = [
+            await renderizar(
+                session, nome, formato, await etag_grafico(session, nome, formato)
+            )
+            for nome in GRAFICOS
+            for formato in formatos
+        ]
+    await asyncio.gather(*(asyncio.wrap_future(futuro) for futuro in futuros))
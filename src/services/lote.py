@@ -0,0 +1,208 @@
+import os
+import json
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy import bindparam, insert, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..database.bulk import ajustar_sequencia, insert_dialeto
+from ..database.particoes import (
+    chave_conflito,
+    coluna_particao,
+    inicio_do_mes,
+    particoes_faltando,
+    reservar_ids,
+    sem_particao,
+)
+
+LOTE_MAXIMO = int(os.getenv("LOTE_MAXIMO", "10000"))
+TAMANHO_CONSULTA = 1000
+
+
+async def ler_lote(request: Request) -> list:
+    corpo = await request.body()
+
+    try:
+        if "ndjson" in request.headers.get("content-type", ""):
+            itens = [json.loads(linha) for linha in corpo.splitlines() if linha.strip()]
+        else:
+            itens = json.loads(corpo)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Corpo inválido: {str(e)}")
+
+    if not isinstance(itens, list):
+        raise HTTPException(
+            status_code=400, detail="O corpo deve ser uma lista de objetos"
+        )
+    if len(itens) > LOTE_MAXIMO:
+        raise HTTPException(
+            status_code=413,
+            detail=f"O lote tem {len(itens)} itens; o máximo é {LOTE_MAXIMO}",
+        )
+    return itens
+
+
+def erros_validacao(erro: ValidationError) -> list:
+    return [
+        f"{'.'.join(str(parte) for parte in detalhe['loc']) or 'item'}: {detalhe['msg']}"
+        for detalhe in erro.errors(include_url=False)
+    ]
+
+
+async def chaves_existentes(session: AsyncSession, coluna, chaves: list) -> set:
+    existentes = set()
+    for inicio in range(0, len(chaves), TAMANHO_CONSULTA):
+        existentes.update(
+            (
+                await session.execute(
+                    select(coluna).where(
+                        coluna.in_(chaves[inicio : inicio + TAMANHO_CONSULTA])
+                    )
+                )
+            ).scalars()
+        )
+    return existentes
+
+
+async def gravar_lote(session: AsyncSession, modelo, itens: list, modo: str) -> dict:
+    tabela = modelo.__table__
+    coluna = next(iter(tabela.primary_key.columns))
+    resultados = [None] * len(itens)
+    com_chave = {}
+    sem_chave = []
+
+    for indice, item in enumerate(itens):
+        try:
+            registro = modelo.model_validate(item).model_dump()
+        except ValidationError as erro:
+            resultados[indice] = {
+                "indice": indice,
+                "status": "invalido",
+                "erros": erros_validacao(erro),
+            }
+            continue
+
+        chave = registro.get(coluna.name)
+        if chave is None:
+            registro.pop(coluna.name, None)
+            sem_chave.append((indice, registro))
+            continue
+
+        # Um mesmo comando não pode atualizar a mesma linha duas vezes
+        repetido = com_chave.get(chave)
+        if repetido is not None:
+            resultados[repetido[0]] = {
+                "indice": repetido[0],
+                "status": "ignorado",
+                "chave": chave,
+                "erros": ["Chave repetida no lote; vale o último item"],
+            }
+        com_chave[chave] = (indice, registro)
+
+    particao = coluna_particao(tabela)
+    if particao is not None:
+        valores = [registro[particao] for _, registro in com_chave.values()]
+        valores += [registro[particao] for _, registro in sem_chave]
+        faltando = set(
+            await session.run_sync(
+                lambda sessao: particoes_faltando(sessao.connection(), tabela, valores)
+            )
+        )
+
+        # As partições são criadas pela carga e pela manutenção, não aqui
+        def sem_destino(indice, registro, chave=None):
+            mes = inicio_do_mes(registro[particao])
+            if mes not in faltando:
+                return False
+            resultados[indice] = {
+                "indice": indice,
+                "status": "invalido",
+                **({"chave": chave} if chave is not None else {}),
+                "erros": [sem_particao(mes)],
+            }
+            return True
+
+        com_chave = {
+            chave: (indice, registro)
+            for chave, (indice, registro) in com_chave.items()
+            if not sem_destino(indice, registro, chave)
+        }
+        sem_chave = [
+            (indice, registro)
+            for indice, registro in sem_chave
+            if not sem_destino(indice, registro)
+        ]
+
+    # Uma consulta por lote para distinguir criados de atualizados, no lugar
+    # do refresh que cada criação individual faz. A busca é só pela chave:
+    # numa tabela particionada o ON CONFLICT compara também a coluna de
+    # partição, e um item que muda de partição viraria uma segunda linha
+    existentes = await chaves_existentes(session, coluna, list(com_chave))
+
+    conflito = chave_conflito(session.bind, tabela)
+    statement = (
+        insert_dialeto(session.bind.dialect.name)(tabela)
+        .on_conflict_do_nothing(index_elements=conflito)
+        .returning(coluna)
+    )
+
+    novos = [
+        registro
+        for chave, (_, registro) in com_chave.items()
+        if chave not in existentes
+    ]
+    gravadas = set()
+    if novos:
+        # Com RETURNING, o SQLAlchemy agrupa a lista em INSERTs de várias linhas
+        gravadas = set((await session.execute(statement, novos)).scalars())
+        # Chaves informadas não avançam a sequência da coluna
+        await session.run_sync(
+            lambda sessao: ajustar_sequencia(sessao.connection(), tabela)
+        )
+
+    if modo == "upsert" and existentes:
+        # Atualização pela chave: no Postgres, uma linha cuja coluna de
+        # partição mudou é movida para a partição nova
+        await session.execute(
+            update(tabela).where(coluna == bindparam("chave_atual")),
+            [
+                {**registro, "chave_atual": chave}
+                for chave, (_, registro) in com_chave.items()
+                if chave in existentes
+            ],
+        )
+
+    geradas = []
+    if sem_chave:
+        ids = await session.run_sync(
+            lambda sessao: reservar_ids(sessao.connection(), tabela, len(sem_chave))
+        )
+        for (_, registro), chave in zip(sem_chave, ids or []):
+            registro[coluna.name] = chave
+        geradas = (
+            (
+                await session.execute(
+                    insert(tabela).returning(coluna, sort_by_parameter_order=True),
+                    [registro for _, registro in sem_chave],
+                )
+            )
+            .scalars()
+            .all()
+        )
+
+    await session.commit()
+
+    for chave, (indice, _) in com_chave.items():
+        if chave in existentes:
+            status = "atualizado" if modo == "upsert" else "existente"
+        else:
+            status = "criado" if chave in gravadas else "existente"
+        resultados[indice] = {"indice": indice, "status": status, "chave": chave}
+
+    for (indice, _), chave in zip(sem_chave, geradas):
+        resultados[indice] = {"indice": indice, "status": "criado", "chave": chave}
+
+    resumo = {
+        status: sum(1 for resultado in resultados if resultado["status"] == status)
+        for status in ("criado", "atualizado", "existente", "ignorado", "invalido")
+    }
+    return {"total": len(itens), **resumo, "resultados": resultados}
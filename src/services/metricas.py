@@ -0,0 +1,155 @@
+import time
+import threading
+from contextvars import ContextVar
+from sqlalchemy import event
+
+BUCKETS_DURACAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_TAMANHO = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+# Tempo de banco acumulado pela requisição atual: [segundos, consultas]
+_banco = ContextVar("banco", default=None)
+
+
+def escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def rotulos_texto(rotulos: tuple) -> str:
+    return ",".join(f'{nome}="{escapar(valor)}"' for nome, valor in rotulos)
+
+
+class Histograma:
+    def __init__(self, nome: str, ajuda: str, buckets: tuple):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.buckets = buckets
+        self.series = {}
+
+    def observar(self, rotulos: tuple, valor: float):
+        serie = self.series.get(rotulos)
+        if serie is None:
+            serie = self.series[rotulos] = [[0] * len(self.buckets), 0.0, 0]
+
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                serie[0][i] += 1
+        serie[1] += valor
+        serie[2] += 1
+
+    def exportar(self) -> list:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        for rotulos, (contagens, soma, total) in sorted(self.series.items()):
+            texto = rotulos_texto(rotulos)
+            for limite, contagem in zip(self.buckets, contagens):
+                linhas.append(f'{self.nome}_bucket{{{texto},le="{limite}"}} {contagem}')
+            linhas.append(f'{self.nome}_bucket{{{texto},le="+Inf"}} {total}')
+            linhas.append(f"{self.nome}_sum{{{texto}}} {soma}")
+            linhas.append(f"{self.nome}_count{{{texto}}} {total}")
+        return linhas
+
+
+class Contador:
+    def __init__(self, nome: str, ajuda: str, tipo: str = "counter"):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.tipo = tipo
+        self.series = {}
+
+    def somar(self, rotulos: tuple, valor: float = 1):
+        self.series[rotulos] = self.series.get(rotulos, 0) + valor
+
+    def exportar(self) -> list:
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+        for rotulos, valor in sorted(self.series.items()):
+            texto = rotulos_texto(rotulos)
+            linhas.append(
+                f"{self.nome}{{{texto}}} {valor}" if texto else f"{self.nome} {valor}"
+            )
+        return linhas
+
+
+class MetricasHttp:
+    def __init__(self):
+        self.trava = threading.Lock()
+        self.requisicoes = Contador(
+            "http_requisicoes_total", "Requisições atendidas por rota e status"
+        )
+        self.em_andamento = Contador(
+            "http_requisicoes_em_andamento", "Requisições em andamento", "gauge"
+        )
+        self.duracao = Histograma(
+            "http_requisicao_duracao_segundos",
+            "Latência das requisições por rota",
+            BUCKETS_DURACAO,
+        )
+        self.tamanho = Histograma(
+            "http_resposta_tamanho_bytes",
+            "Tamanho das respostas por rota",
+            BUCKETS_TAMANHO,
+        )
+        self.banco = Histograma(
+            "http_requisicao_banco_segundos",
+            "Tempo gasto no banco de dados por requisição",
+            BUCKETS_DURACAO,
+        )
+        self.consultas = Contador(
+            "http_requisicao_consultas_total", "Consultas ao banco por rota"
+        )
+
+    def iniciar(self):
+        with self.trava:
+            self.em_andamento.somar((), 1)
+        acumulado = [0.0, 0]
+        _banco.set(acumulado)
+        return time.perf_counter(), acumulado
+
+    def concluir(
+        self, inicio, metodo: str, rota: str, status: int, tamanho, banco: list
+    ):
+        duracao = time.perf_counter() - inicio
+        rotulos = (("metodo", metodo), ("rota", rota))
+
+        with self.trava:
+            self.em_andamento.somar((), -1)
+            self.requisicoes.somar(rotulos + (("status", status),))
+            self.duracao.observar(rotulos, duracao)
+            self.banco.observar(rotulos, banco[0])
+            self.consultas.somar(rotulos, banco[1])
+            if tamanho is not None:
+                self.tamanho.observar(rotulos, int(tamanho))
+
+    def exportar(self) -> str:
+        with self.trava:
+            linhas = []
+            for metrica in (
+                self.requisicoes,
+                self.em_andamento,
+                self.duracao,
+                self.tamanho,
+                self.banco,
+                self.consultas,
+            ):
+                linhas.extend(metrica.exportar())
+        return "\n".join(linhas) + "\n"
+
+
+metricas = MetricasHttp()
+
+
+def antes_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    conn.info["inicio_consulta"] = time.perf_counter()
+
+
+def depois_da_consulta(conn, cursor, statement, parameters, context, executemany):
+    acumulado = _banco.get()
+    if acumulado is not None:
+        acumulado[0] += time.perf_counter() - conn.info["inicio_consulta"]
+        acumulado[1] += 1
+
+
+def medir_banco(engine):
+    # Engines assíncronas disparam os eventos na engine síncrona subjacente
+    engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(engine, "before_cursor_execute", antes_da_consulta):
+        event.listen(engine, "before_cursor_execute", antes_da_consulta)
+        event.listen(engine, "after_cursor_execute", depois_da_consulta)
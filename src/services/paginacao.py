@@ -0,0 +1,155 @@
+import json
+import time
+import base64
+import binascii
+from typing import Any, List, Literal, Optional, Tuple
+from fastapi import HTTPException, Query
+from sqlalchemy import text, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from sqlmodel import func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+VALIDADE_CONTAGEM = 60
+LIMITE_CONTAGENS = 1024
+
+_contagens = {}
+
+
+class Explicar(Executable, ClauseElement):
+    # EXPLAIN compilado junto com a consulta: os filtros continuam como
+    # parâmetros, em vez de voltarem ao banco como texto
+    inherit_cache = False
+
+    def __init__(self, query):
+        self.query = query
+
+
+@compiles(Explicar, "postgresql")
+def compilar_explicar(elemento, compilador, **kwargs):
+    return "EXPLAIN (FORMAT JSON) " + compilador.process(elemento.query, **kwargs)
+
+
+def codificar_cursor(valores: List[Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode()
+
+
+def ler_cursor(
+    cursor: Optional[str] = Query(
+        None, description="Cursor opaco devolvido em next_cursor pela página anterior"
+    ),
+) -> Optional[List[Any]]:
+    if cursor is None:
+        return None
+
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    if not isinstance(valores, list):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    return valores
+
+
+async def paginar(
+    session: AsyncSession,
+    query,
+    ordem: list,
+    skip: int,
+    limit: int,
+    cursor: Optional[List[Any]] = None,
+) -> Tuple[list, Optional[str]]:
+    query = query.add_columns(*ordem).order_by(*ordem)
+
+    if cursor is None:
+        query = query.offset(skip)
+    elif len(cursor) != len(ordem):
+        raise HTTPException(
+            status_code=400, detail="Cursor não corresponde aos filtros da consulta"
+        )
+    else:
+        query = query.where(tuple_(*ordem) > tuple_(*cursor))
+
+    linhas = (await session.execute(query.limit(limit))).all()
+
+    proximo = None
+    if len(linhas) == limit:
+        proximo = codificar_cursor(list(linhas[-1][1:]))
+
+    return [linha[0] for linha in linhas], proximo
+
+
+def ler_contagem(
+    include_total: bool = Query(
+        True, description="Se falso, a resposta não traz o total de registros"
+    ),
+    contagem: Literal["exata", "estimada", "cache"] = Query(
+        "exata",
+        description="exata: COUNT da consulta filtrada; estimada: estatísticas do "
+        "PostgreSQL; cache: contagem exata reaproveitada por alguns segundos",
+    ),
+) -> Optional[str]:
+    return contagem if include_total else None
+
+
+async def contar_exato(session: AsyncSession, query) -> int:
+    return (
+        await session.exec(
+            select(func.count()).select_from(query.order_by(None).subquery())
+        )
+    ).one()
+
+
+async def contar_estimado(session: AsyncSession, query) -> int:
+    if session.get_bind().dialect.name != "postgresql":
+        return await contar_exato(session, query)
+
+    tabelas = query.get_final_froms()
+    if query.whereclause is None and len(tabelas) == 1:
+        estimativa = (
+            await session.execute(
+                text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:tabela)"),
+                {"tabela": tabelas[0].name},
+            )
+        ).scalar()
+        # reltuples é -1 enquanto a tabela nunca passou por VACUUM/ANALYZE
+        if estimativa is not None and estimativa >= 0:
+            return int(estimativa)
+
+    plano = (await session.execute(Explicar(query.order_by(None)))).scalar()
+    if isinstance(plano, str):
+        plano = json.loads(plano)
+    return int(plano[0]["Plan"]["Plan Rows"])
+
+
+async def contar_em_cache(session: AsyncSession, query) -> int:
+    compilada = query.compile()
+    chave = (
+        str(session.get_bind().url),
+        str(compilada),
+        tuple(sorted(compilada.params.items())),
+    )
+    agora = time.monotonic()
+
+    if chave in _contagens and agora - _contagens[chave][1] < VALIDADE_CONTAGEM:
+        return _contagens[chave][0]
+
+    total = await contar_exato(session, query)
+    if len(_contagens) >= LIMITE_CONTAGENS:
+        _contagens.clear()
+    _contagens[chave] = (total, agora)
+    return total
+
+
+async def contar(
+    session: AsyncSession, query, contagem: Optional[str]
+) -> Optional[int]:
+    if contagem is None:
+        return None
+    if contagem == "estimada":
+        return await contar_estimado(session, query)
+    if contagem == "cache":
+        return await contar_em_cache(session, query)
+    return await contar_exato(session, query)
@@ -0,0 +1,54 @@
+import os
+import sys
+import json
+import random
+import traceback
+from loguru import logger
+
+LOG_ARQUIVO = os.getenv("LOG_ARQUIVO", "actions.log")
+LOG_ROTACAO = os.getenv("LOG_ROTACAO", "50 MB")
+LOG_RETENCAO = os.getenv("LOG_RETENCAO", "10")
+LOG_COMPRESSAO = os.getenv("LOG_COMPRESSAO", "gz")
+LOG_AMOSTRAGEM = float(os.getenv("LOG_AMOSTRAGEM", "1"))
+
+LOGGER_FORMAT = (
+    "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | "
+    "<level>{level: <8}</level> | "
+    "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> | "
+    "<level>{message}</level>"
+)
+
+
+def formato_json(record) -> str:
+    linha = {
+        "horario": record["time"].isoformat(),
+        "nivel": record["level"].name,
+        "mensagem": record["message"],
+        **record["extra"],
+    }
+    if record["exception"] is not None:
+        linha["excecao"] = "".join(traceback.format_exception(*record["exception"]))
+
+    record["extra"]["_json"] = json.dumps(linha, ensure_ascii=False, default=str)
+    return "{extra[_json]}\n"
+
+
+def configurar_registro():
+    # enqueue=True: a escrita em disco acontece numa thread separada, e não
+    # no event loop que atende as requisições
+    logger.remove()
+    logger.add(sys.stderr, format=LOGGER_FORMAT, enqueue=True)
+    if LOG_ARQUIVO:
+        logger.add(
+            LOG_ARQUIVO,
+            format=formato_json,
+            enqueue=True,
+            rotation=LOG_ROTACAO,
+            retention=int(LOG_RETENCAO) if LOG_RETENCAO.isdigit() else LOG_RETENCAO,
+            compression=LOG_COMPRESSAO or None,
+        )
+
+
+def deve_registrar(status: int) -> bool:
+    # Erros são sempre registrados; respostas de sucesso, por amostragem
+    return status >= 400 or random.random() < LOG_AMOSTRAGEM
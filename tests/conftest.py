@@ -0,0 +1,68 @@
+import os
+import uuid
+from datetime import date
+import pytest
+from sqlalchemy import create_engine, make_url, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import Session
+
+# A aplicação lê DATABASE_URL ao importar src.database.infra; os testes usam
+# os próprios bancos
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from src.database.particoes import criar_tabelas, preparar_particoes
+from src.models import Favorecido, Municipio, UnidadeGestora
+
+# Os testes rodam no SQLite e, com TEST_DATABASE_URL, também no PostgreSQL,
+# cada um num schema descartável
+BANCOS = ["sqlite"] + (["postgresql"] if os.getenv("TEST_DATABASE_URL") else [])
+
+
+def preparar(sincrono):
+    criar_tabelas(sincrono)
+    preparar_particoes(sincrono, date(2024, 1, 1), date(2024, 12, 1))
+
+
+@pytest.fixture(params=BANCOS)
+def bancos(request, tmp_path):
+    if request.param == "sqlite":
+        caminho = tmp_path / "teste.db"
+        sincrono = create_engine(f"sqlite:///{caminho}")
+        assincrono = create_async_engine(
+            f"sqlite+aiosqlite:///{caminho}", poolclass=NullPool
+        )
+        preparar(sincrono)
+        yield sincrono, assincrono
+        sincrono.dispose()
+        return
+
+    esquema = f"teste_{uuid.uuid4().hex[:8]}"
+    url = make_url(os.environ["TEST_DATABASE_URL"])
+    sincrono = create_engine(
+        url.set(drivername="postgresql+psycopg2"),
+        connect_args={"options": f"-csearch_path={esquema}"},
+    )
+    with sincrono.begin() as connection:
+        connection.execute(text(f"CREATE SCHEMA {esquema}"))
+    assincrono = create_async_engine(
+        url.set(drivername="postgresql+asyncpg"),
+        connect_args={"server_settings": {"search_path": esquema}},
+        poolclass=NullPool,
+    )
+    preparar(sincrono)
+    yield sincrono, assincrono
+    with sincrono.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA {esquema} CASCADE"))
+    sincrono.dispose()
+
+
+@pytest.fixture
+def dados(bancos):
+    sincrono, assincrono = bancos
+    with Session(sincrono) as session:
+        session.add(Municipio(codigo=1, nome="Campina Grande", uf="PB"))
+        session.add(UnidadeGestora(codigo=1, nome="UG", orgao_nome="Órgão"))
+        session.add(Favorecido(codigo="1", nome="Favorecido", municipio_codigo=1))
+        session.commit()
+    return sincrono, assincrono
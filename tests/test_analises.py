@@ -0,0 +1,53 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.database.infra import get_async_session
+from src.routes.analises import router as analises_router
+from src.routes.programa import router as programa_router
+from src.routes.unidade_gestora import router as unidade_gestora_router
+from src.services import atualizacao
+from src.services.atualizacao import AtualizadorResumos
+from src.services.cache import cache
+
+
+def cliente(sincrono, assincrono, monkeypatch):
+    monkeypatch.setattr(
+        atualizacao, "atualizador", AtualizadorResumos(sincrono, atraso=0)
+    )
+    app = FastAPI()
+    for router in (analises_router, programa_router, unidade_gestora_router):
+        app.include_router(router)
+
+    async def sessao():
+        async with AsyncSession(assincrono, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_async_session] = sessao
+    return TestClient(app)
+
+
+def test_analises_refletem_programas_criados_e_renomeados(dados, monkeypatch):
+    sincrono, assincrono = dados
+    cache.limpar()
+    api = cliente(sincrono, assincrono, monkeypatch)
+    rota = "/analises/programas-mais-frequentes"
+
+    assert api.get(rota).json() == []
+    api.post("/programas/", json={"codigo": 1, "nome": "Programa"})
+    assert [p["nome"] for p in api.get(rota).json()] == ["Programa"]
+    api.put("/programas/1", json={"nome": "Renomeado"})
+    assert [p["nome"] for p in api.get(rota).json()] == ["Renomeado"]
+    assert [
+        p["nome"] for p in api.get("/analises/favorecidos-por-programa").json()
+    ] == ["Renomeado"]
+
+
+def test_analises_refletem_unidades_gestoras_renomeadas(dados, monkeypatch):
+    sincrono, assincrono = dados
+    cache.limpar()
+    api = cliente(sincrono, assincrono, monkeypatch)
+    rota = "/analises/total-transferencias-por-unidade-gestora"
+
+    assert [u["nome"] for u in api.get(rota).json()] == ["UG"]
+    api.put("/unidades_gestoras/1", json={"nome": "Renomeada"})
+    assert [u["nome"] for u in api.get(rota).json()] == ["Renomeada"]
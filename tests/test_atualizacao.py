@@ -0,0 +1,135 @@
+import asyncio
+from datetime import date, datetime
+from decimal import Decimal
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.database.particoes import garantir_particoes
+from src.models import (
+    ResumoEstado,
+    ResumoUnidadeGestora,
+    Transferencia,
+    UnidadeGestora,
+    VersaoResumo,
+)
+from src.services import atualizacao
+from src.services.atualizacao import AtualizadorResumos
+from src.services.cache import cache
+from src.services.graficos import etag_grafico
+
+
+def inserir_transferencia(sincrono, id, valor):
+    with Session(sincrono) as session:
+        garantir_particoes(
+            session.connection(), Transferencia.__table__, [date(2024, 1, 1)]
+        )
+        session.add(
+            Transferencia(
+                id=id,
+                competencia=date(2024, 1, 1),
+                tipo="Legal",
+                valor=Decimal(valor),
+                unidade_gestora_codigo=1,
+                favorecido_codigo="1",
+            )
+        )
+        session.commit()
+
+
+def test_escritas_agrupadas_atualizam_os_resumos(dados):
+    sincrono, _ = dados
+    atualizador = AtualizadorResumos(sincrono, atraso=0)
+    geracao = cache.geracoes["analises"]
+
+    async def executar():
+        inserir_transferencia(sincrono, 1, "10.00")
+        atualizador.agendar({"transferencia"})
+        inserir_transferencia(sincrono, 2, "5.50")
+        atualizador.agendar({"favorecido"})
+        await atualizador.aguardar()
+
+    asyncio.run(executar())
+
+    with Session(sincrono) as session:
+        estado = session.exec(select(ResumoEstado)).one()
+        unidade = session.exec(select(ResumoUnidadeGestora)).one()
+        versoes = session.exec(select(VersaoResumo.tabela)).all()
+
+    assert (estado.uf, estado.total_transferencias) == ("PB", 2)
+    assert estado.valor_total == Decimal("15.50")
+    assert unidade.total_transferencias == 2
+    assert {"resumoestado", "resumounidadegestora"} <= set(versoes)
+    assert not atualizador.pendentes
+    assert cache.geracoes["analises"] > geracao
+
+
+def test_tabelas_sem_resumo_so_registram_a_versao(dados):
+    sincrono, _ = dados
+    atualizador = AtualizadorResumos(sincrono, atraso=0)
+
+    async def executar():
+        atualizador.agendar({"unidadegestora"})
+        await atualizador.aguardar()
+
+    inicio = datetime.now()
+    asyncio.run(executar())
+
+    with Session(sincrono) as session:
+        versoes = session.exec(
+            select(VersaoResumo.tabela).where(VersaoResumo.atualizado_em >= inicio)
+        ).all()
+    assert versoes == ["unidadegestora"]
+
+
+def test_etag_do_grafico_muda_com_os_rotulos(dados):
+    sincrono, assincrono = dados
+    atualizador = AtualizadorResumos(sincrono, atraso=0)
+
+    async def etags():
+        async with AsyncSession(assincrono) as session:
+            return [
+                await etag_grafico(session, nome)
+                for nome in (
+                    "transferencias-por-unidade-gestora",
+                    "transferencias-por-estado",
+                )
+            ]
+
+    async def executar():
+        atualizador.agendar({"transferencia"})
+        await atualizador.aguardar()
+        antes = await etags()
+        with Session(sincrono) as session:
+            unidade = session.get(UnidadeGestora, 1)
+            unidade.nome = "Renomeada"
+            session.add(unidade)
+            session.commit()
+        atualizador.agendar({"unidadegestora"})
+        await atualizador.aguardar()
+        return antes, await etags()
+
+    antes, depois = asyncio.run(executar())
+
+    assert antes[0] != depois[0]
+    assert antes[1] == depois[1]
+
+
+def test_escritas_proximas_sao_recalculadas_juntas(monkeypatch):
+    chamadas = []
+    monkeypatch.setattr(
+        atualizacao,
+        "atualizar_resumos",
+        lambda bind, tabelas: chamadas.append(set(tabelas)),
+    )
+    atualizador = AtualizadorResumos(None, atraso=0.2)
+
+    async def executar():
+        atualizador.agendar({"transferencia"})
+        await asyncio.sleep(0.05)
+        atualizador.agendar({"favorecido"})
+        await atualizador.aguardar()
+        atualizador.agendar({"municipio"}, imediato=True)
+        await atualizador.aguardar()
+
+    asyncio.run(executar())
+
+    assert chamadas == [{"transferencia", "favorecido"}, {"municipio"}]
@@ -0,0 +1,35 @@
+from typing import Optional
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from src.services.cache import cache, em_cache
+
+
+class Item(BaseModel):
+    codigo: int
+    nome: Optional[str] = None
+
+
+def test_resposta_em_cache_passa_pelo_response_model():
+    app = FastAPI()
+    chamadas = []
+
+    @app.get("/itens/{codigo}", response_model=Item, response_model_exclude_unset=True)
+    @em_cache("teste")
+    async def ler_item(codigo: int):
+        chamadas.append(codigo)
+        return {"codigo": str(codigo), "senha": "segredo"}
+
+    cache.limpar()
+    cliente = TestClient(app)
+    respostas = [cliente.get("/itens/7").json() for _ in range(2)]
+
+    validade, cache.validade = cache.validade, 0
+    try:
+        sem_cache = cliente.get("/itens/7").json()
+    finally:
+        cache.validade = validade
+
+    assert respostas == [{"codigo": 7}, {"codigo": 7}]
+    assert sem_cache == respostas[0]
+    assert chamadas == [7, 7]
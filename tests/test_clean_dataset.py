@@ -0,0 +1,86 @@
+import warnings
+import pandas as pd
+import pytest
+from src.dataset.clean_dataset import normalizar_lote, parse_valor_centavos
+
+
+@pytest.mark.parametrize(
+    "texto, centavos",
+    [
+        ("1.234,56", 123456),
+        ("27675,2", 2767520),
+        ("-0,07", -7),
+        ("- 5,00", -500),
+        (" 12 ", 1200),
+        (",5", 50),
+        ("9999999999999999,99", 999999999999999999),
+        ("-9999999999999999", -999999999999999900),
+        ("1.234.567,89", 123456789),
+        ("12.345", 1234500),
+    ],
+)
+def test_valores_validos(texto, centavos):
+    assert parse_valor_centavos(pd.Series([texto])).tolist() == [centavos]
+
+
+@pytest.mark.parametrize(
+    "texto",
+    [
+        "99999999999999999",
+        "9" * 260,
+        "1" + "0" * 127 + ",00",
+        "-",
+        "",
+        "1.234,567",
+        "1,2,3",
+        "5-",
+        "R$ 5,00",
+        "1 2",
+        "1 234,00",
+        "1,00 2",
+        "1.2,00",
+        "1.23,00",
+        "12345.678,00",
+        ".123,00",
+        "1.234.5,00",
+        "1.2345",
+        "1.234.",
+    ],
+)
+def test_valores_invalidos(texto):
+    assert parse_valor_centavos(pd.Series([texto])).isna().all()
+
+
+def test_separador_decimal_ponto():
+    resultado = parse_valor_centavos(
+        pd.Series(["27675.28", "1,234.5", "-0.07"]), separador="."
+    )
+    assert resultado.tolist() == [2767528, 123450, -7]
+
+
+def test_normalizar_lote_sem_avisos():
+    df = pd.DataFrame(
+        {
+            "ano__mes": ["202401", "2024/13", "202402", None],
+            "nome_favorecido": ['"A"', "B", "C", "D"],
+            "valor_transferido": ["1,00", "2,00", "x", "4,00"],
+            "codigo_programa": ["10", "20", "30", "40"],
+        }
+    )
+    relatorio = {
+        "linhas_incompletas": 0,
+        "competencias_rejeitadas": 0,
+        "valores_rejeitados": 0,
+    }
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        resultado = normalizar_lote(df, relatorio)
+
+    assert resultado["nome_favorecido"].tolist() == ["A"]
+    assert resultado["valor_transferido"].tolist() == [100]
+    assert relatorio == {
+        "linhas_incompletas": 1,
+        "competencias_rejeitadas": 1,
+        "valores_rejeitados": 1,
+    }
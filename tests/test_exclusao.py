@@ -0,0 +1,59 @@
+import asyncio
+from datetime import date
+from decimal import Decimal
+import pytest
+from sqlalchemy import func, select
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.models import Programa, ProgramaTransferencia, Transferencia
+from src.routes.favorecido import delete_favorecido
+from src.routes.municipio import delete_municipio
+from src.routes.unidade_gestora import delete_unidade_gestora
+from src.services import atualizacao
+from src.services.atualizacao import AtualizadorResumos
+
+
+@pytest.mark.parametrize(
+    "excluir,codigo",
+    [
+        (delete_unidade_gestora, 1),
+        (delete_favorecido, "1"),
+        (delete_municipio, 1),
+    ],
+)
+def test_exclusao_em_cascata_remove_os_vinculos(dados, monkeypatch, excluir, codigo):
+    sincrono, assincrono = dados
+    monkeypatch.setattr(
+        atualizacao, "atualizador", AtualizadorResumos(sincrono, atraso=0)
+    )
+    with Session(sincrono) as session:
+        session.add(Programa(codigo=1, nome="Programa"))
+        session.add(
+            Transferencia(
+                id=2024010000001,
+                competencia=date(2024, 1, 1),
+                tipo="Legal",
+                valor=Decimal("10.00"),
+                unidade_gestora_codigo=1,
+                favorecido_codigo="1",
+            )
+        )
+        session.flush()
+        session.add(
+            ProgramaTransferencia(transferencia_id=2024010000001, programa_codigo=1)
+        )
+        session.commit()
+
+    async def executar():
+        async with AsyncSession(assincrono, expire_on_commit=False) as session:
+            await excluir(codigo=codigo, session=session)
+        await atualizacao.atualizador.aguardar()
+
+    asyncio.run(executar())
+
+    with sincrono.connect() as connection:
+        for modelo in (Transferencia, ProgramaTransferencia):
+            assert (
+                connection.execute(select(func.count()).select_from(modelo)).scalar()
+                == 0
+            )
@@ -0,0 +1,165 @@
+import asyncio
+from datetime import date
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import inspect
+from sqlalchemy.exc import InvalidRequestError
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.models import (
+    Favorecido,
+    Municipio,
+    Programa,
+    ProgramaTransferencia,
+    Transferencia,
+)
+from src.services.expansao import expandir, ler_expansao, opcoes_expansao
+
+ID = 2024010000001
+
+# As mesmas expansões permitidas pelas rotas de leitura
+PERMITIDAS = {
+    Transferencia: ("favorecido.municipio", "unidade_gestora", "programas"),
+    Favorecido: ("municipio",),
+    Municipio: ("favorecidos",),
+}
+CHAVES = {Transferencia: ID, Favorecido: "1", Municipio: 1}
+
+
+@pytest.fixture
+def transferencia(dados):
+    sincrono, assincrono = dados
+    with Session(sincrono) as session:
+        session.add(Programa(codigo=1, nome="Programa"))
+        session.add(
+            Transferencia(
+                id=ID,
+                competencia=date(2024, 1, 1),
+                tipo="Legal",
+                valor="10.00",
+                unidade_gestora_codigo=1,
+                favorecido_codigo="1",
+            )
+        )
+        session.commit()
+        session.add(ProgramaTransferencia(programa_codigo=1, transferencia_id=ID))
+        session.commit()
+    return sincrono, assincrono
+
+
+def ler(assincrono, modelo, expand, acessar=None):
+    arvore = ler_expansao(*PERMITIDAS[modelo])(expand)
+
+    async def executar():
+        async with AsyncSession(assincrono) as session:
+            objeto = await session.get(
+                modelo, CHAVES[modelo], options=opcoes_expansao(modelo, arvore)
+            )
+            if acessar is not None:
+                getattr(objeto, acessar)
+            return expandir(objeto, arvore)
+
+    return asyncio.run(executar())
+
+
+@pytest.mark.parametrize(
+    "modelo, expand, esperado",
+    [
+        (Transferencia, None, {}),
+        (
+            Transferencia,
+            "favorecido",
+            {
+                "favorecido": {
+                    "codigo": "1",
+                    "nome": "Favorecido",
+                    "municipio_codigo": 1,
+                }
+            },
+        ),
+        (
+            Transferencia,
+            "favorecido.municipio",
+            {
+                "favorecido": {
+                    "codigo": "1",
+                    "nome": "Favorecido",
+                    "municipio_codigo": 1,
+                    "municipio": {"codigo": 1, "nome": "Campina Grande", "uf": "PB"},
+                }
+            },
+        ),
+        (
+            Transferencia,
+            "unidade_gestora",
+            {"unidade_gestora": {"codigo": 1, "nome": "UG", "orgao_nome": "Órgão"}},
+        ),
+        (
+            Transferencia,
+            "programas",
+            {"programas": [{"codigo": 1, "nome": "Programa"}]},
+        ),
+        (
+            Favorecido,
+            "municipio",
+            {"municipio": {"codigo": 1, "nome": "Campina Grande", "uf": "PB"}},
+        ),
+        (
+            Municipio,
+            "favorecidos",
+            {
+                "favorecidos": [
+                    {"codigo": "1", "nome": "Favorecido", "municipio_codigo": 1}
+                ]
+            },
+        ),
+    ],
+)
+def test_cada_expansao_traz_so_a_relacao_pedida(
+    transferencia, modelo, expand, esperado
+):
+    _, assincrono = transferencia
+
+    resultado = ler(assincrono, modelo, expand)
+
+    relacoes = inspect(modelo).relationships.keys()
+    assert {chave: resultado[chave] for chave in relacoes if chave in resultado} == (
+        esperado
+    )
+
+
+@pytest.mark.parametrize(
+    "modelo, expand, acessar",
+    [
+        (Transferencia, None, "favorecido"),
+        (Transferencia, "unidade_gestora", "programas"),
+        (Transferencia, "programas", "unidade_gestora"),
+        (Transferencia, "favorecido.municipio", "unidade_gestora"),
+        (Favorecido, None, "municipio"),
+        (Favorecido, "municipio", "transferencias"),
+        (Municipio, None, "favorecidos"),
+    ],
+)
+def test_relacao_nao_expandida_nao_gera_consulta(
+    transferencia, modelo, expand, acessar
+):
+    _, assincrono = transferencia
+
+    with pytest.raises(InvalidRequestError, match="raise"):
+        ler(assincrono, modelo, expand, acessar)
+
+
+@pytest.mark.parametrize(
+    "modelo, expand",
+    [
+        (Transferencia, "municipio"),
+        (Transferencia, "favorecido.transferencias"),
+        (Favorecido, "transferencias"),
+        (Municipio, "favorecidos.municipio"),
+    ],
+)
+def test_expansao_nao_permitida_e_recusada(modelo, expand):
+    with pytest.raises(HTTPException) as erro:
+        ler_expansao(*PERMITIDAS[modelo])(expand)
+
+    assert erro.value.status_code == 400
@@ -0,0 +1,23 @@
+import json
+from datetime import date
+from decimal import Decimal
+from src.services.exportacao import CENTAVOS, para_ndjson
+
+
+def test_ndjson_escreve_o_valor_exato():
+    valores = ["9999999999999999.99", "0.10", "-27675.28"]
+    lote = [
+        (
+            1,
+            date(2024, 1, 1),
+            "Legal",
+            int(Decimal(valor) * 100) if CENTAVOS else Decimal(valor),
+            1,
+            "1",
+        )
+        for valor in valores
+    ]
+
+    linhas = para_ndjson(lote).decode().splitlines()
+
+    assert [json.loads(linha)["valor"] for linha in linhas] == valores
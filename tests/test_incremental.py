@@ -0,0 +1,87 @@
+import pandas as pd
+from sqlalchemy import select
+from sqlmodel import Session
+from src.database.incremental import carregar_arquivo_incremental
+from src.database.populate import CARGAS
+from src.models import Programa, ProgramaTransferencia, Transferencia
+
+COLUNAS = next(colunas for modelo, _, colunas in CARGAS if modelo is Transferencia)
+LINHAS = [
+    (2024010000001, "2024-01-01", "Legal", "10.00", 1, "1", 1),
+    (2024010000002, "2024-01-01", "Legal", "10.00", 1, "1", 1),
+    (2024010000003, "2024-01-01", "Voluntária", "7.50", 1, "1", 2),
+]
+
+
+def escrever(caminho, linhas):
+    pd.DataFrame(
+        linhas,
+        columns=[
+            "id",
+            "competencia",
+            "tipo",
+            "valor",
+            "unidade_gestora_codigo",
+            "favorecido_codigo",
+            "programa_codigo",
+        ],
+    ).to_csv(caminho, index=False)
+
+
+def carregar(sincrono, caminho):
+    return carregar_arquivo_incremental(
+        sincrono, Transferencia.__table__, str(caminho), COLUNAS
+    )
+
+
+def gravadas(sincrono):
+    with sincrono.connect() as connection:
+        transferencias = connection.execute(
+            select(Transferencia.id, Transferencia.tipo, Transferencia.valor).order_by(
+                Transferencia.id
+            )
+        ).all()
+        vinculos = connection.execute(
+            select(
+                ProgramaTransferencia.transferencia_id,
+                ProgramaTransferencia.programa_codigo,
+            ).order_by(ProgramaTransferencia.transferencia_id)
+        ).all()
+    return [(id, tipo, str(valor)) for id, tipo, valor in transferencias], vinculos
+
+
+def test_linha_inserida_no_inicio_nao_regrava_as_seguintes(dados, tmp_path):
+    sincrono, _ = dados
+    with Session(sincrono) as session:
+        session.add_all(
+            [Programa(codigo=1, nome="Um"), Programa(codigo=2, nome="Dois")]
+        )
+        session.commit()
+
+    caminho = tmp_path / "transferencias_clean.csv"
+    escrever(caminho, LINHAS)
+    assert carregar(sincrono, caminho)[:2] == (3, 3)
+    assert carregar(sincrono, caminho) is None
+
+    # O novo extrato ganha uma linha no início (os ids do arquivo se deslocam)
+    # e corrige o valor da última
+    novas = [(2024010000001, "2024-01-01", "Legal", "99.00", 1, "1", 2)]
+    novas += [(id + 1, *resto) for id, *resto in LINHAS]
+    novas[-1] = (*novas[-1][:3], "8.00", *novas[-1][4:])
+    escrever(caminho, novas)
+
+    assert carregar(sincrono, caminho)[:2] == (4, 2)
+    assert gravadas(sincrono) == (
+        [
+            (2024010000001, "Legal", "10.00"),
+            (2024010000002, "Legal", "10.00"),
+            (2024010000003, "Voluntária", "8.00"),
+            (2024010000004, "Legal", "99.00"),
+        ],
+        [
+            (2024010000001, 1),
+            (2024010000002, 1),
+            (2024010000003, 2),
+            (2024010000004, 2),
+        ],
+    )
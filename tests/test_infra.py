@@ -0,0 +1,32 @@
+from fastapi import Request, Response
+from src.database import infra
+
+
+class Replicas:
+    replicas = ["replica"]
+
+    def proxima(self):
+        return "replica"
+
+
+def requisicao(metodo, cookies=""):
+    return Request(
+        {
+            "type": "http",
+            "method": metodo,
+            "headers": [(b"cookie", cookies.encode())] if cookies else [],
+        }
+    )
+
+
+def test_escrita_so_desvia_as_leituras_do_mesmo_cliente(monkeypatch):
+    monkeypatch.setattr(infra, "replicas", Replicas())
+    resposta = Response()
+
+    assert infra.sessoes_para(requisicao("POST"), resposta) is infra.async_session
+    cookie = resposta.headers["set-cookie"].split(";")[0]
+
+    assert infra.sessoes_para(requisicao("GET"), Response()) == "replica"
+    assert infra.sessoes_para(requisicao("GET", cookie), Response()) is (
+        infra.async_session
+    )
@@ -0,0 +1,144 @@
+import asyncio
+from datetime import date
+from decimal import Decimal
+import pytest
+from sqlalchemy import select, text
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.dataset.clean_dataset import LIMITE_IDS_API
+from src.models import Transferencia
+from src.services.lote import gravar_lote
+
+ITEM = {
+    "id": 2024010000002,
+    "competencia": "2024-01-01",
+    "tipo": "Legal",
+    "valor": "10.00",
+    "unidade_gestora_codigo": 1,
+    "favorecido_codigo": "1",
+}
+
+
+def gravar(assincrono, itens, modo="upsert"):
+    async def executar():
+        async with AsyncSession(assincrono, expire_on_commit=False) as session:
+            return await gravar_lote(session, Transferencia, itens, modo)
+
+    return asyncio.run(executar())
+
+
+def linhas(sincrono):
+    with sincrono.connect() as connection:
+        return connection.execute(
+            select(
+                Transferencia.id, Transferencia.competencia, Transferencia.valor
+            ).order_by(Transferencia.id, Transferencia.competencia)
+        ).all()
+
+
+def test_upsert_que_muda_a_competencia_atualiza_a_linha(dados):
+    sincrono, assincrono = dados
+
+    assert gravar(assincrono, [ITEM])["criado"] == 1
+    resultado = gravar(
+        assincrono, [{**ITEM, "competencia": "2024-03-01", "valor": "20.00"}]
+    )
+
+    assert resultado["resultados"][0]["status"] == "atualizado"
+    assert linhas(sincrono) == [(ITEM["id"], date(2024, 3, 1), Decimal("20.00"))]
+
+
+def test_inserir_mantem_a_linha_existente(dados):
+    sincrono, assincrono = dados
+
+    gravar(assincrono, [ITEM])
+    resultado = gravar(
+        assincrono, [{**ITEM, "competencia": "2024-03-01"}], modo="inserir"
+    )
+
+    assert resultado["resultados"][0]["status"] == "existente"
+    assert linhas(sincrono) == [(ITEM["id"], date(2024, 1, 1), Decimal("10.00"))]
+
+
+def test_lote_com_itens_novos_e_existentes(dados):
+    sincrono, assincrono = dados
+
+    gravar(assincrono, [ITEM])
+    resultado = gravar(
+        assincrono,
+        [
+            {**ITEM, "valor": "11.00"},
+            {**ITEM, "id": 2024020000001, "competencia": "2024-02-01"},
+        ],
+    )
+
+    assert [r["status"] for r in resultado["resultados"]] == ["atualizado", "criado"]
+    assert len(linhas(sincrono)) == 2
+
+
+def test_ids_gerados_ficam_fora_dos_blocos_mensais(dados):
+    sincrono, assincrono = dados
+
+    gravar(assincrono, [ITEM])
+    sem_id = {chave: valor for chave, valor in ITEM.items() if chave != "id"}
+    resultado = gravar(assincrono, [{**sem_id, "competencia": "2024-02-01"}, sem_id])
+
+    chaves = [r["chave"] for r in resultado["resultados"]]
+    assert [r["status"] for r in resultado["resultados"]] == ["criado", "criado"]
+    assert all(chave < LIMITE_IDS_API for chave in chaves)
+    assert len(set(chaves)) == 2
+
+
+def test_competencia_sem_particao_e_recusada(dados):
+    sincrono, assincrono = dados
+    if sincrono.dialect.name != "postgresql":
+        pytest.skip("Só o Postgres particiona as transferências")
+
+    resultado = gravar(
+        assincrono,
+        [ITEM, {**ITEM, "id": 2030010000001, "competencia": "2030-01-01"}],
+    )
+
+    assert [r["status"] for r in resultado["resultados"]] == ["criado", "invalido"]
+    assert "2030-01" in resultado["resultados"][1]["erros"][0]
+    with sincrono.connect() as connection:
+        assert (
+            connection.execute(
+                text("SELECT to_regclass('transferencia_2030_01')")
+            ).scalar()
+            is None
+        )
+    assert linhas(sincrono) == [(ITEM["id"], date(2024, 1, 1), Decimal("10.00"))]
+
+
+@pytest.mark.parametrize(
+    "modo, status, existente",
+    [
+        ("upsert", ["ignorado", "criado", "atualizado", "ignorado", "criado"], "21.00"),
+        ("inserir", ["ignorado", "criado", "existente", "ignorado", "criado"], "10.00"),
+    ],
+)
+def test_lote_com_chaves_novas_existentes_e_repetidas(dados, modo, status, existente):
+    sincrono, assincrono = dados
+    novo = {**ITEM, "id": 2024020000001, "competencia": "2024-02-01"}
+
+    gravar(assincrono, [ITEM])
+    resultado = gravar(
+        assincrono,
+        [
+            {**ITEM, "valor": "20.00"},
+            {**ITEM, "id": 2024010000003},
+            {**ITEM, "valor": "21.00"},
+            {**novo, "valor": "30.00"},
+            {**novo, "valor": "31.00"},
+        ],
+        modo,
+    )
+
+    # Das chaves repetidas vale o último item; os anteriores são ignorados
+    assert [r["status"] for r in resultado["resultados"]] == status
+    assert [r["indice"] for r in resultado["resultados"]] == list(range(5))
+    assert linhas(sincrono) == [
+        (ITEM["id"], date(2024, 1, 1), Decimal(existente)),
+        (2024010000003, date(2024, 1, 1), Decimal("10.00")),
+        (novo["id"], date(2024, 2, 1), Decimal("31.00")),
+    ]
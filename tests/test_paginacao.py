@@ -0,0 +1,81 @@
+import asyncio
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from src.models import Municipio
+from src.services.paginacao import contar, ler_cursor, paginar
+
+UFS = ["PB", "PE", "PB", "RN", "PE", "PB", "RN"]
+
+
+def contar_municipios(assincrono, query, contagem):
+    async def executar():
+        async with AsyncSession(assincrono) as session:
+            return await contar(session, query, contagem)
+
+    return asyncio.run(executar())
+
+
+def pagina(assincrono, ordem, cursor, limit=2):
+    async def executar():
+        async with AsyncSession(assincrono) as session:
+            municipios, proximo = await paginar(
+                session, select(Municipio), ordem, 0, limit, cursor
+            )
+            return [municipio.codigo for municipio in municipios], proximo
+
+    return asyncio.run(executar())
+
+
+def percorrer(assincrono, ordem, antes_de_cada_pagina=lambda: None):
+    codigos, cursor = [], None
+    while True:
+        antes_de_cada_pagina()
+        lidos, proximo = pagina(assincrono, ordem, cursor)
+        codigos += lidos
+        if proximo is None:
+            return codigos
+        cursor = ler_cursor(proximo)
+
+
+def inserir_municipios(sincrono, codigos):
+    with Session(sincrono) as session:
+        for codigo in codigos:
+            session.add(
+                Municipio(codigo=codigo, nome=f"M{codigo}", uf=UFS[codigo % len(UFS)])
+            )
+        session.commit()
+
+
+def test_contagem_estimada_mantem_os_filtros_como_parametros(dados):
+    _, assincrono = dados
+    query = select(Municipio).where(Municipio.nome.contains(" :x 'y' %"))
+
+    assert contar_municipios(assincrono, query, "estimada") >= 0
+    assert contar_municipios(assincrono, query, "exata") == 0
+
+
+def test_cursor_percorre_todas_as_linhas_uma_vez_com_empates(dados):
+    sincrono, assincrono = dados
+    inserir_municipios(sincrono, range(2, 12))
+    ordem = [Municipio.uf, Municipio.codigo]
+    with Session(sincrono) as session:
+        esperado = [m.codigo for m in session.exec(select(Municipio).order_by(*ordem))]
+
+    assert percorrer(assincrono, ordem) == esperado
+    assert len(esperado) == 11
+
+
+def test_cursor_nao_repete_nem_pula_linhas_inseridas_antes_dele(dados):
+    sincrono, assincrono = dados
+    inserir_municipios(sincrono, range(10, 20))
+    anteriores = iter(range(-1, -10, -1))
+
+    codigos = percorrer(
+        assincrono,
+        [Municipio.codigo],
+        lambda: inserir_municipios(sincrono, [next(anteriores)]),
+    )
+
+    # Cada página começa depois da última linha lida, mesmo com inserções
+    # antes dela entre uma página e outra
+    assert codigos == [-1, 1] + list(range(10, 20))
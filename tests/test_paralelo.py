@@ -0,0 +1,70 @@
+import pandas as pd
+import pytest
+from sqlalchemy import func, inspect, select
+from src.database import paralelo
+from src.database.paralelo import carregar_em_paralelo
+from src.database.populate import CARGAS
+from src.models import Transferencia
+
+COLUNAS = next(colunas for modelo, _, colunas in CARGAS if modelo is Transferencia)
+
+
+def escrever(caminho, quantidade):
+    pd.DataFrame(
+        {
+            "id": [2024010000001 + i for i in range(quantidade)],
+            "competencia": "2024-01-01",
+            "tipo": "Legal",
+            "valor": "10.00",
+            "unidade_gestora_codigo": 1,
+            "favorecido_codigo": "1",
+        }
+    ).to_csv(caminho, index=False)
+
+
+def carregar(sincrono, caminho):
+    return list(
+        carregar_em_paralelo(
+            sincrono,
+            [(Transferencia.__table__, str(caminho), COLUNAS, None)],
+            trabalhadores=2,
+            tamanho_lote=2,
+        )
+    )
+
+
+def situacao(sincrono):
+    with sincrono.connect() as connection:
+        linhas = connection.execute(select(func.count(Transferencia.id))).scalar()
+    return linhas, inspect(sincrono).has_table("carga_transferencia")
+
+
+def test_carga_paralela_grava_todos_os_lotes(dados, tmp_path):
+    sincrono, _ = dados
+    escrever(tmp_path / "transferencias.csv", 5)
+
+    [(nome, linhas, _)] = carregar(sincrono, tmp_path / "transferencias.csv")
+
+    assert (nome, linhas) == ("transferencia", 5)
+    assert situacao(sincrono) == (5, False)
+
+
+def test_lote_com_falha_nao_deixa_a_tabela_pela_metade(dados, tmp_path, monkeypatch):
+    sincrono, _ = dados
+    escrever(tmp_path / "transferencias.csv", 5)
+    gravar_lote = paralelo.gravar_lote
+    chamadas = []
+
+    def falhar_no_segundo(connection, tabela, df):
+        chamadas.append(len(df))
+        if len(chamadas) == 2:
+            raise RuntimeError("falha no lote")
+        gravar_lote(connection, tabela, df)
+
+    monkeypatch.setattr(paralelo, "gravar_lote", falhar_no_segundo)
+
+    with pytest.raises(RuntimeError, match="falha no lote"):
+        carregar(sincrono, tmp_path / "transferencias.csv")
+
+    assert len(chamadas) == 3
+    assert situacao(sincrono) == (0, False)
@@ -0,0 +1,31 @@
+import asyncio
+import time
+from sqlalchemy import make_url
+from src.database import replicas
+from src.database.replicas import Replica
+
+
+def test_verificacao_limita_a_abertura_da_conexao(monkeypatch):
+    monkeypatch.setattr(replicas, "REPLICA_TIMEOUT_VERIFICACAO", 0.2)
+
+    async def executar():
+        # Aceita a conexão e nunca responde ao handshake
+        servidor = await asyncio.start_server(
+            lambda leitor, escritor: None, "127.0.0.1", 0
+        )
+        porta = servidor.sockets[0].getsockname()[1]
+        replica = Replica(
+            make_url(f"postgresql+asyncpg://postgres@127.0.0.1:{porta}/teste")
+        )
+        inicio = time.monotonic()
+        try:
+            return await replica.verificar(), time.monotonic() - inicio, replica
+        finally:
+            await replica.engine.dispose()
+            servidor.close()
+
+    saudavel, duracao, replica = asyncio.run(executar())
+
+    assert not saudavel and not replica.saudavel
+    assert replica.falhas == 1
+    assert duracao < 2